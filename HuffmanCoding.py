@@ -1,6 +1,14 @@
 import huffman_compression_tools
+import huffman_blocks
+import huffman_decoder
+import huffman_adaptive
+import huffman_metrics
+import huffman_lz77
+import huffman_buffer
 import tree
-import os, _io
+import os, _io, io
+import concurrent.futures
+import contextlib
 
 
 class HuffmanFile(huffman_compression_tools.HuffmanTools):
@@ -8,19 +16,87 @@ class HuffmanFile(huffman_compression_tools.HuffmanTools):
     Inherits the huffman_compression_tools.HuffmanTools class, to use the functions in a more useable way
     """
 
-    HUFFMAN_FILE_MODES = ["rb", "wb"]
+    HUFFMAN_FILE_MODES = ["rb", "wb", "ab"]
+    # Number of characters decoded at a time when reading lazily with read(size), readline() or read_to_file()
+    READ_CHUNK_SIZE = 1 << 16
 
-    def __init__(self, file_path: str, mode='rb', diagnostics=False):
+    def __init__(self, file_path: str, mode='rb', diagnostics=False, version=huffman_compression_tools.HuffmanTools.BLOCK_VERSION,
+                 block_size=huffman_blocks.HuffmanBlockWriter.DEFAULT_BLOCK_SIZE, workers=1, index=True, dictionary=None,
+                 max_code_length=None, metrics=None, context=False, lz77_level=None):
         """
-        :param file_path: string, path to compressed binary file
-        :param mode: rb - read or wb - write to select the mode you wish to open the file in
+        :param file_path: string, path to compressed binary file. It may instead be a binary file object, i.e a BytesIO
+                          or socket file, or a bytes-like object - the compressed data to read, or a writable buffer
+                          such as a bytearray that the compressed data is written into. These are used as they are,
+                          without being opened or closed
+        :param mode: rb - read, wb - write or ab - append to select the mode you wish to open the file in. Appending
+                     adds blocks to the end of an existing BLOCK_VERSION file, or creates the file if it does not exist
         :param diagnostics: If True displays information to the command line as tasks are executed
+        :param version: File format version to write - BLOCK_VERSION streams the text in blocks of canonical codes,
+                        CANONICAL_VERSION stores one table of canonical code lengths in the header, LEGACY_VERSION
+                        stores the postorder huffman tree and ADAPTIVE_VERSION compresses in a single pass with
+                        adaptive huffman codes. Files of any version can be read
+        :param block_size: Number of characters compressed in each block when writing BLOCK_VERSION files
+        :param workers: Number of processes to spread the blocks of BLOCK_VERSION files across when compressing and
+                        decompressing - the output is the same for any number of workers
+        :param index: If True BLOCK_VERSION files of more than one block are written with an index of their blocks,
+                      so ranges of the text can be found without reading every block header. Files written with a
+                      dictionary never have an index
+        :param dictionary: huffman_dictionary.HuffmanDictionary that blocks of BLOCK_VERSION files may be encoded with
+                           instead of storing a table. It must be registered, or saved in a registered directory,
+                           wherever the file is read
+        :param max_code_length: Longest code length allowed, i.e 12 or 15, so that codes are decoded with a small
+                                table even for very skewed text. None for no limit
+        :param metrics: Function called with a huffman_metrics.CompressionMetrics after each compress or decompress
+                        call, i.e huffman_metrics.print_metrics. Peak memory is measured if the function has a true
+                        track_memory attribute, as huffman_metrics.MetricsCollector(track_memory=True) does
+        :param context: If True blocks of BLOCK_VERSION files are tried with an order-1 context model, a code table
+                        for each common preceding symbol. It is only used for blocks it makes smaller, so it turns
+                        itself off when the extra tables cost more than they save
+        :param lz77_level: Compression level from 1 - fastest to 9 - smallest that blocks of BLOCK_VERSION files are
+                           searched for repeated strings with, which are then stored as LZ77 matches before huffman
+                           coding like DEFLATE. It is only used for blocks it makes smaller. None to not search
         """
         super().__init__()
 
-        self.compressed_file = file_path
         self.mode = mode
+        # Binary file object, or bytes-like object, given in place of a path
+        self.source = None
+        if isinstance(file_path, (str, os.PathLike)):
+            self.compressed_file = file_path
+        else:
+            self.__compressed_file = getattr(file_path, 'name', None)
+            self.source = huffman_buffer.check_source(file_path, mode)
+        self.file: _io.BufferedIOBase = None
         self.diagnostics = diagnostics
+        if version not in self.FORMAT_VERSIONS:
+            raise ValueError("Unsupported file format version " + str(version))
+        if mode == 'ab' and version != self.BLOCK_VERSION:
+            raise ValueError("Only block format files can be appended to")
+        self.version = version
+        if block_size < 1:
+            raise ValueError("Block size must be at least 1 character")
+        self.block_size = block_size
+        self.workers = self.check_workers(workers)
+        self.index = index
+        if dictionary is not None and version != self.BLOCK_VERSION:
+            raise ValueError("Dictionaries can only be used with the block format")
+        self.dictionary = dictionary
+        if max_code_length is not None:
+            if max_code_length < 1:
+                raise ValueError("Maximum code length must be at least 1 bit")
+            if version == self.ADAPTIVE_VERSION:
+                raise ValueError("Adaptive codes can not be length limited")
+        self.max_code_length = max_code_length
+        self.metrics_callback = metrics
+        if context and version != self.BLOCK_VERSION:
+            raise ValueError("Context modeling can only be used with the block format")
+        self.context = context
+        if lz77_level is not None:
+            if version != self.BLOCK_VERSION:
+                raise ValueError("LZ77 can only be used with the block format")
+            if lz77_level not in huffman_lz77.COMPRESSION_LEVELS:
+                raise ValueError("LZ77 level must be from 1 to 9")
+        self.lz77_level = lz77_level
 
         # Attributes for reducing time for multiple compressions
         self.huffman_tree: tree.Tree = None
@@ -28,6 +104,15 @@ class HuffmanFile(huffman_compression_tools.HuffmanTools):
 
         # Attributes for reducing time required for multiple decompressions
         self.decompressed_text: str = None
+        self.decoder: huffman_decoder.HuffmanDecoder = None
+        self.file_buffer: memoryview = None
+        self.block_reader: huffman_blocks.HuffmanBlockReader = None
+        # Position in the decompressed text for seek() and read(size)
+        self.position = 0
+        # Generator decoding the text lazily, and the chunk of text it last decoded with its position in the text
+        self.chunks = None
+        self.chunk = None
+        self.chunk_start = 0
 
 
     @property
@@ -62,16 +147,16 @@ class HuffmanFile(huffman_compression_tools.HuffmanTools):
             if new_mode in self.HUFFMAN_FILE_MODES:
                 self.__mode = new_mode
             else:
-                raise ValueError("Invalid file mode. Please select either \'rb\' or \'wb\'")
+                raise ValueError("Invalid file mode. Please select either \'rb\', \'wb\' or \'ab\'")
         else:
             raise _io.UnsupportedOperation("unable to change file mode")
 
     def wb(func):
         """
-        Function decorator for write only functions
+        Function decorator for write only functions - allowed when writing or appending
         """
         def function_wrapper(*args, **kwargs):
-            if args[0].mode == 'wb':
+            if args[0].mode in ('wb', 'ab'):
                 return_value = func(*args, **kwargs)
                 return return_value
             else:
@@ -90,20 +175,61 @@ class HuffmanFile(huffman_compression_tools.HuffmanTools):
                 raise _io.UnsupportedOperation("file not readable")
         return function_wrapper
 
+    def measured(operation):
+        """
+        Function decorator for calls that are measured when the object has a metrics callback
+        """
+        def decorator(func):
+            def function_wrapper(self, *args, **kwargs):
+                with self.measure(operation):
+                    return func(self, *args, **kwargs)
+            return function_wrapper
+        return decorator
+
+    @contextlib.contextmanager
+    def measure(self, operation: str):
+        """
+        Context manager measuring a call, giving its metrics to the metrics callback when it finishes. Calls made
+        inside a call that is already being measured are counted as part of it
+        :param operation: Name of the call, i.e compress
+        :return metrics: huffman_metrics.CompressionMetrics of the call, or None when it is not measured
+        """
+        if self.metrics_callback is None or self.metrics is not None:
+            yield self.metrics
+            return
+        self.metrics = huffman_metrics.CompressionMetrics(operation, self.compressed_file,
+                                                          getattr(self.metrics_callback, 'track_memory', False))
+        try:
+            self.metrics.start()
+            yield self.metrics
+            self.metrics.finish()
+            metrics = self.metrics
+        finally:
+            self.metrics = None
+        self.metrics_callback(metrics)
+
     def __enter__(self) -> object:
         """
         Function 1 or 2 to allow the object to work as a with statment
         Handles opening of file
         """
-        try:
+        if self.source is not None:
+            self.open_source()
+            return self
+        if self.mode != 'ab':
             self.file = open(self.__compressed_file, self.mode)
             if self.diagnostics:
-                print("File ready to read!")
+                print("File ready to " + ("read!" if self.mode == 'rb' else "write to!"))
+            return self
+        try:
+            # The end of the existing blocks is overwritten, so the file is opened for updating rather than appending
+            self.file = open(self.__compressed_file, "r+b")
+            if self.diagnostics:
+                print("File ready to append to!")
         except FileNotFoundError:
             if self.diagnostics:
                 print("File not found - creating new file...")
-            self.file = open(self.__compressed_file, "wb")
-            self.mode = "wb"
+            self.file = open(self.__compressed_file, "w+b")
             if self.diagnostics:
                 print("New file created - ready to write to!")
         return self
@@ -113,65 +239,435 @@ class HuffmanFile(huffman_compression_tools.HuffmanTools):
         Function 2 or 2 to allow the object to work as a with statment
         Handles closing of files
         """
-        self.file.close()
+        self.close_chunks()
+        self.block_reader = None
+        if self.file_buffer is not None:
+            if self.file is None:
+                # A view of the caller's buffer, which is left as it is
+                self.file_buffer.release()
+            else:
+                self.release_file_buffer(self.file_buffer)
+            self.file_buffer = None
+        # File objects given in place of a path belong to the caller, so are left open
+        if self.file is not None and self.file is not self.source:
+            self.file.close()
+
+    def open_source(self) -> None:
+        """
+        Sets the object up to use the file object or bytes-like object it was given in place of a path
+        """
+        if huffman_buffer.is_file_object(self.source):
+            self.file = self.source
+        elif self.mode == 'wb':
+            self.file = huffman_buffer.BufferWriter(self.source)
+        else:
+            # The compressed data is read straight from the buffer, without copying it
+            self.file_buffer = memoryview(self.source).cast('B')
 
     def __str__(self):
         return "<%s name=\'%s\' mode=\'%s\'>" % ("HuffmanFile", self.compressed_file, self.mode)
 
+    def check_workers(self, workers: int) -> int:
+        """
+        :param workers: Number of worker processes
+        :return workers: The number of worker processes, if valid
+        """
+        if workers < 1:
+            raise ValueError("Number of workers must be at least 1")
+        return workers
+
+    def open_executor(self, workers: int):
+        """
+        Context manager for the process pool blocks are spread across
+        :param workers: Number of worker processes
+        :return executor: ProcessPoolExecutor, or None when only 1 worker is used
+        """
+        if workers > 1:
+            return concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        return contextlib.nullcontext()
+
+    def set_input_type(self, text):
+        """
+        Sets whether text or binary data is being compressed
+        :param text: String of text, or a bytes-like object of binary data
+        :return text: The string of text, or a memoryview of the bytes of binary data
+        """
+        self.binary = not isinstance(text, str)
+        if not self.binary:
+            return text
+        if self.version == self.LEGACY_VERSION:
+            raise ValueError("Binary data can not be written in the original file format")
+        return memoryview(text).cast('B')
+
     @wb
-    def compress(self, text: str) -> bytes:
+    @measured('compress')
+    def compress(self, text: str, workers=None) -> bytes:
         """
         Method for compressing a string of text, returning a stream of bytes - a form selected
         for writing to a binary file
-        :param text: String of text that is to be compressed
+        :param text: String of text that is to be compressed, or a bytes-like object of binary data, which is
+                     compressed byte by byte without decoding it to a string
+        :param workers: Number of processes to compress blocks with, defaults to the object's workers
         :return bytestream: stream of bytes, ready to be written to a binary (.bin) file
         """
-        if self.huffman_tree is None:
-            frequency = self.generate_frequency_table(text)
-            huffman_forest = self.plant_forest(frequency)
-            self.huffman_tree = self.merge_trees(huffman_forest)
+        text = self.set_input_type(text)
+        if self.version in (self.BLOCK_VERSION, self.ADAPTIVE_VERSION):
+            output = io.BytesIO()
+            self.write_stream(output, self.split_blocks(text), workers)
+            self.file_bytestream = output.getvalue()
+            return self.file_bytestream
+
+        frequency = None
+        if self.huffman_tree is None and len(text) > 0:
+            with self.stage('frequency'):
+                frequency = self.generate_frequency_table(text)
+            with self.stage('tree'):
+                huffman_forest = self.plant_forest(frequency)
+                self.huffman_tree = self.merge_trees(huffman_forest)
+                if self.max_code_length is not None and max(self.get_code_lengths(self.huffman_tree).values()) > self.max_code_length:
+                    self.huffman_tree = self.build_canonical_tree(self.limit_code_lengths(frequency, self.max_code_length))
+
+                self.huffman_tree.depth = tree.tree_depth(self.huffman_tree) - 1
+
+        if self.version == self.LEGACY_VERSION:
+            with self.stage('codes'):
+                # One walk of the tree gives the postorder sequence for the header, the codes and the tree statistics
+                postorder, compression_codes, self.tree_stats = tree.walk_tree(self.huffman_tree)
+                if not self.compression_codes:
+                    self.compression_codes = compression_codes
+
+            with self.stage('header'):
+                header = self.generate_file_header(text, self.huffman_tree, postorder)
+            with self.stage('encode'):
+                bytestream = self.generate_file_bytestream(text, frequency)
+        else:
+            with self.stage('codes'):
+                # Canonical codes only need the code lengths, which are all the header stores
+                code_lengths = self.get_code_lengths(self.huffman_tree) if len(text) > 0 else {}
+                codes = self.get_cached_codes(code_lengths)
+            with self.stage('header'):
+                header = self.generate_canonical_file_header(len(text), code_lengths, self.get_flags())
+            with self.stage('encode'):
+                bytestream = self.pack_symbols(text, codes, frequency_table=frequency)
+        self.file_bytestream = bytes(header + bytestream)
+
+        if self.metrics is not None:
+            if frequency is None and len(text) > 0:
+                # The tree was kept from an earlier call, but the statistics need this text's frequencies
+                frequency = self.generate_frequency_table(text)
+            if self.version == self.LEGACY_VERSION:
+                code_lengths = {symbol: len(code) for symbol, code in self.compression_codes.items()} if len(text) > 0 else {}
+            self.metrics.text_size += len(text)
+            self.metrics.compressed_size += len(self.file_bytestream)
+            self.metrics.header_size += len(header)
+            self.metrics.add_table(len(text), code_lengths, frequency)
+        return self.file_bytestream
+
+    def split_blocks(self, text: str):
+        """
+        Generator splitting text into blocks of block_size characters
+        :param text: String of text to be split
+        :return block: String of at most block_size characters
+        """
+        for start in range(0, len(text), self.block_size):
+            yield text[start: start + self.block_size]
 
-            self.huffman_tree.depth = tree.tree_depth(self.huffman_tree) - 1
+    def write_blocks(self, file_object: _io.BufferedWriter, blocks, workers=None) -> None:
+        """
+        Compresses blocks of text in the block format and writes them to a binary file object as they are compressed
+        :param file_object: Binary file object to write to
+        :param blocks: Iterable of strings of text, each compressed as one block
+        :param workers: Number of processes to compress blocks with, defaults to the object's workers
+        """
+        workers = self.check_workers(workers or self.workers)
+        if not (self.mode == 'ab' and file_object is self.file):
+            writer = huffman_blocks.HuffmanBlockWriter(file_object, self.get_flags(), self.dictionary, self.max_code_length,
+                                                       self.metrics, self.context, self.lz77_level,
+                                                       use_numpy=self.use_numpy)
+            with self.open_executor(workers) as executor:
+                # A couple of blocks per worker keeps every process busy
+                writer.write_blocks(blocks, executor, batch_size=2 * workers)
+            writer.close(self.index)
+            return
 
-        if not self.compression_codes :
-            compression_codes = self.generate_compression_codes(self.huffman_tree, [None]*self.huffman_tree.depth)
+        writer, end, tail = self.open_append_writer()
+        try:
+            with self.open_executor(workers) as executor:
+                writer.write_blocks(blocks, executor, batch_size=2 * workers)
+            writer.close(self.index)
+        except BaseException:
+            # Put the end of the file back as it was, so a failed append leaves the existing blocks readable
+            self.file.seek(end)
+            self.file.truncate()
+            self.file.write(tail)
+            self.file.flush()
+            raise
 
-        header = self.generate_file_header(text, self.huffman_tree)
-        bytestream = self.generate_file_bytestream(text)
-        self.file_bytestream = header + bytestream
-        return header + bytestream
+    def open_append_writer(self) -> (huffman_blocks.HuffmanBlockWriter, int, bytes):
+        """
+        Gets a writer carrying on from the last block of the object's file, for appending. Only the index, or the
+        block headers when the file has no index, and the header of the last table are read - the end block and
+        index are then cut off, to be written again after the new blocks
+        :return writer: HuffmanBlockWriter positioned after the last block, or writing a new file if the file is empty
+        :return end: Byte offset the file was cut off at
+        :return tail: bytes of the end block and index that were cut off, for putting back if the append fails
+        """
+        self.file.flush()
+        if self.file.seek(0, io.SEEK_END) == 0:
+            return huffman_blocks.HuffmanBlockWriter(self.file, self.get_flags(), self.dictionary, self.max_code_length,
+                                                     self.metrics, self.context, self.lz77_level,
+                                                     use_numpy=self.use_numpy), 0, b""
+        self.file.seek(0)
+        file_buffer = self.map_file(self.file)
+        try:
+            if self.get_file_version(file_buffer) != self.BLOCK_VERSION:
+                raise ValueError("Only block format files can be appended to")
+            writer = huffman_blocks.HuffmanBlockWriter(self.file, self.get_flags(), self.dictionary, self.max_code_length,
+                                                       self.metrics, self.context, self.lz77_level,
+                                                       huffman_blocks.HuffmanBlockReader(file_buffer), self.use_numpy)
+            tail = bytes(file_buffer[writer.position:])
+        finally:
+            self.release_file_buffer(file_buffer)
+        self.file.seek(writer.position)
+        self.file.truncate()
+        return writer, writer.position, tail
+
+    def write_adaptive(self, file_object: _io.BufferedWriter, blocks) -> None:
+        """
+        Compresses blocks of text in a single pass with adaptive huffman codes, writing each block as it is compressed
+        :param file_object: Binary file object to write to
+        :param blocks: Iterable of strings of text, or bytes-like objects of binary data
+        """
+        text_size = 0
+        with huffman_adaptive.AdaptiveHuffmanWriter(file_object, self.binary) as writer:
+            for block in blocks:
+                with self.stage('encode'):
+                    writer.write(block)
+                text_size += len(block)
+        if self.metrics is not None:
+            # Adaptive codes change with every symbol, so there is no table to add - only the sizes are known
+            header_size = len(writer.get_header())
+            self.metrics.text_size += text_size
+            self.metrics.compressed_size += writer.position
+            self.metrics.header_size += header_size
+            self.metrics.add_table(text_size, {}, encoded_bits=8 * (writer.position - header_size))
+
+    def write_stream(self, file_object: _io.BufferedWriter, blocks, workers=None) -> None:
+        """
+        Compresses blocks of text as they are given, for the versions that can stream - BLOCK_VERSION and ADAPTIVE_VERSION
+        :param file_object: Binary file object to write to
+        :param blocks: Iterable of strings of text, or bytes-like objects of binary data
+        :param workers: Number of processes to compress blocks with, defaults to the object's workers
+        """
+        if self.version == self.ADAPTIVE_VERSION:
+            self.write_adaptive(file_object, blocks)
+        else:
+            self.write_blocks(file_object, blocks, workers)
+
+    def get_version(self) -> int:
+        """
+        Maps the object's file, if it has not been already, and returns its format version
+        :return version: Format version of the file
+        """
+        if self.file_buffer is None:
+            self.file_buffer = self.map_file(self.file)
+        return self.get_file_version(self.file_buffer)
+
+    def get_block_reader(self) -> huffman_blocks.HuffmanBlockReader:
+        """
+        :return block_reader: HuffmanBlockReader of the object's file, kept so its index and decoders are reused
+        """
+        if self.block_reader is None:
+            self.get_version()
+            self.block_reader = huffman_blocks.HuffmanBlockReader(self.file_buffer)
+            self.set_flags(self.block_reader.flags)
+        return self.block_reader
+
+    def read_flags(self) -> None:
+        """
+        Sets whether the object's file holds text or binary data from its header, without decoding any of it, so
+        that empty reads give the right type
+        """
+        version = self.get_version()
+        if version == self.BLOCK_VERSION:
+            self.get_block_reader()
+        elif version != self.LEGACY_VERSION:
+            # Canonical and adaptive files have their flags straight after the version
+            offset = len(self.VERSION_MARKER) + 1
+            if len(self.file_buffer) <= offset:
+                raise ValueError("Unexpected end of compressed data")
+            self.set_flags(self.file_buffer[offset])
 
     @rb
-    def decompress(self) -> str:
+    @measured('decompress')
+    def decompress(self, workers=None) -> str:
         """
         Function for decompressing text of the objects compressed file
-        :return decompressed_text: Decompressed text in a string
+        :param workers: Number of processes to decompress the blocks of BLOCK_VERSION files with, defaults to the
+                        object's workers
+        :return decompressed_text: Decompressed text in a string, or bytes for a file of binary data
         """
         if self.decompressed_text is None:
-            file_bitstream = self.extract_file_bitstream(self.file)
+            version = self.get_version()
+            if version == self.BLOCK_VERSION:
+                workers = self.check_workers(workers or self.workers)
+                block_reader = self.get_block_reader()
+                block_reader.metrics = self.metrics
+                try:
+                    with self.open_executor(workers) as executor:
+                        self.decompressed_text = self.join_text(block_reader.decode_blocks(executor, batch_size=2 * workers))
+                finally:
+                    block_reader.metrics = None
+            elif version == self.ADAPTIVE_VERSION:
+                reader = huffman_adaptive.AdaptiveHuffmanReader()
+                with self.stage('decode'):
+                    self.decompressed_text = reader.feed(self.file_buffer)
+                if not reader.finished:
+                    raise ValueError("Unexpected end of compressed data")
+                self.set_flags(reader.get_flags())
+                if self.metrics is not None:
+                    self.metrics.add_table(len(self.decompressed_text), {},
+                                           encoded_bits=8 * (len(self.file_buffer) - reader.header_length))
+            else:
+                text_length, body = self.read_body(version)
+                with self.stage('decode'):
+                    self.decompressed_text = self.decompress_bytes(self.decoder, text_length, body) if text_length > 0 else self.join_text([])
+                if self.metrics is not None:
+                    code_lengths = {symbol: length for symbol, (code, length) in self.decoder.codes.items()} if text_length > 0 else {}
+                    self.metrics.add_table(text_length, code_lengths, encoded_bits=8 * len(body))
+                body.release()
+
+            if self.metrics is not None:
+                self.metrics.text_size += len(self.decompressed_text)
+                self.metrics.compressed_size += len(self.file_buffer)
+                # Everything that is not the encoded symbols, rounded to whole bytes
+                self.metrics.header_size += len(self.file_buffer) - self.metrics.encoded_bits // 8
 
-            text_length, postorder_tree_list = self.extract_header_from_bitstream(file_bitstream)
+        return self.decompressed_text
 
-            if self.huffman_tree is None:
-                self.huffman_tree = tree.construct_tree_from_postorder(postorder_tree_list)
+    def read_body(self, version: int) -> (int, memoryview):
+        """
+        Reads the header of a LEGACY_VERSION or CANONICAL_VERSION file, getting the decoder for its codes
+        :param version: Format version of the file
+        :return text_length: Number of characters in the body of the file
+        :return body: memoryview of the compressed body - release it once it has been decoded
+        """
+        if version == self.LEGACY_VERSION:
+            with self.stage('header'):
+                text_length, postorder_tree_list = self.extract_header_from_bitstream(self.file_buffer)
 
-            binary_text = self.get_file_body(file_bitstream, self.calculate_binary_tree_header_length(postorder_tree_list))
-            self.decompressed_text = self.decompress_bitstream(self.huffman_tree, text_length, binary_text)
+            with self.stage('build_decoder'):
+                if self.decoder is None:
+                    self.decoder = self.get_cached_tree_decoder(postorder_tree_list)
 
-        return self.decompressed_text
+            return text_length, self.get_file_body(self.file_buffer, self.calculate_binary_tree_header_length(postorder_tree_list))
+
+        with self.stage('header'):
+            text_length, code_lengths, flags, body_offset = self.extract_canonical_file_header(self.file_buffer)
+
+        with self.stage('build_decoder'):
+            # Codes are derived from the code lengths, so no tree needs to be built
+            if self.decoder is None and len(code_lengths) > 0:
+                self.decoder = self.get_cached_decoder(code_lengths)
+
+        return text_length, self.file_buffer[body_offset:]
+
+    def iter_chunks(self, start: int):
+        """
+        Generator decoding the object file's text lazily, a chunk at a time. BLOCK_VERSION files start from the block
+        holding the position, other versions are decoded from the start of the text
+        :param start: Position in the decompressed text to start from
+        :return text_start: Position in the decompressed text of the first character of the chunk
+        :return text: Decompressed text of the chunk, or bytes for a file of binary data
+        """
+        if self.decompressed_text is not None:
+            for text_start in range(start, len(self.decompressed_text), self.READ_CHUNK_SIZE):
+                yield text_start, self.decompressed_text[text_start: text_start + self.READ_CHUNK_SIZE]
+            return
+
+        version = self.get_version()
+        if version == self.BLOCK_VERSION:
+            yield from self.get_block_reader().decode_from(start, self.READ_CHUNK_SIZE)
+            return
+
+        text_start = 0
+        if version == self.ADAPTIVE_VERSION:
+            reader = huffman_adaptive.AdaptiveHuffmanReader()
+            for offset in range(0, len(self.file_buffer), self.READ_CHUNK_SIZE):
+                text = reader.feed(self.file_buffer[offset: offset + self.READ_CHUNK_SIZE])
+                self.set_flags(reader.get_flags())
+                if text:
+                    yield text_start, text
+                    text_start += len(text)
+            if not reader.finished:
+                raise ValueError("Unexpected end of compressed data")
+            return
+
+        text_length, body = self.read_body(version)
+        for text in self.decompress_chunks(self.decoder, text_length, body, self.READ_CHUNK_SIZE):
+            yield text_start, text
+            text_start += len(text)
+        body.release()
+
+    def get_chunk(self):
+        """
+        Decodes as far as the current position, only keeping the chunk of text that holds it
+        :return chunk: Decompressed text of the chunk holding the current position, empty at the end of the text
+        :return offset: Offset of the current position in the chunk
+        """
+        chunk_end = self.chunk_start + len(self.chunk) if self.chunk is not None else 0
+        if self.chunk_start <= self.position < chunk_end:
+            return self.chunk, self.position - self.chunk_start
+
+        # Decoding starts again after seeking backwards, or after seeking past the chunk in a BLOCK_VERSION file,
+        # where it can start from the block holding the position
+        if (self.chunks is None or self.position < self.chunk_start or
+                (self.position > chunk_end and self.decompressed_text is None and self.get_version() == self.BLOCK_VERSION)):
+            self.close_chunks()
+            self.chunks = self.iter_chunks(self.position)
+        for self.chunk_start, self.chunk in self.chunks:
+            if self.position < self.chunk_start + len(self.chunk):
+                return self.chunk, self.position - self.chunk_start
+        self.chunk_start, self.chunk = self.position, self.join_text([])
+        return self.chunk, 0
+
+    def close_chunks(self) -> None:
+        """
+        Stops decoding lazily, releasing the parts of the file the generator holds on to
+        """
+        if self.chunks is not None:
+            self.chunks.close()
+        self.chunks = self.chunk = None
+        self.chunk_start = 0
 
     @wb
+    @measured('compress')
     def write_from_file(self, file: str) -> None:
         """
         Compress text from a text file to the object's binary file
-        :param file: File path to a text file (.txt) that will be compressed and written to binary file
+        :param file: Open text file (.txt) that will be compressed and written to binary file, or any file opened
+                     in binary mode, which is compressed byte by byte
         """
+        if isinstance(file, (io.RawIOBase, io.BufferedIOBase)):
+            self.set_input_type(b"")
+            if self.version in (self.BLOCK_VERSION, self.ADAPTIVE_VERSION):
+                self.write_stream(self.file, iter(lambda: file.read(self.block_size), b''))
+            else:
+                self.file.write(self.compress(file.read()))
+            if self.diagnostics:
+                print("File Compressed Successfully!")
+            return
+
         filename, file_extension = os.path.splitext(file.name)
         if file_extension == '.txt':
-            file_bytestream = self.compress(file.read())
+            self.set_input_type("")
+            if self.version in (self.BLOCK_VERSION, self.ADAPTIVE_VERSION):
+                # Stream the text file through one block at a time
+                self.write_stream(self.file, iter(lambda: file.read(self.block_size), ''))
+            else:
+                self.file.write(self.compress(file.read()))
             if self.diagnostics:
                 print("File Compressed Successfully!")
-            self.file.write(file_bytestream)
             if self.diagnostics:
                 print("File written to " + file.name + " successfully!")
             
@@ -179,34 +675,241 @@ class HuffmanFile(huffman_compression_tools.HuffmanTools):
             raise ValueError("Please give the path to a text file, not a " + file_extension + " file")
         
     @wb
+    @measured('compress')
     def write_from_string(self, text: str) -> None:
         """
         Compress text from a string to the object's binary file
         :param text: String of text to be compressed and then written to binary file
         """
-        file_bytestream = self.compress(text)
+        if self.version in (self.BLOCK_VERSION, self.ADAPTIVE_VERSION):
+            text = self.set_input_type(text)
+            self.write_stream(self.file, self.split_blocks(text))
+        else:
+            self.file.write(self.compress(text))
         if self.diagnostics:
             print("Text Compressed Successfully!")
-        self.file.write(file_bytestream)
         if self.diagnostics:
             print("File written to " + file.name + " successfully!")
 
+    @wb
+    def write_from_bytes(self, data: bytes) -> None:
+        """
+        Compress binary data to the object's binary file, byte by byte
+        :param data: bytes, bytearray or memoryview to be compressed and then written to binary file
+        """
+        self.write_from_string(data)
+
     @rb
-    def read_to_file(self, file: _io.TextIOWrapper) -> str:
+    def read_to_file(self, file: _io.TextIOWrapper) -> int:
         """
-        Decompress the object file and write to text file and return the text
-        :param file: Open text file object for writing decompressed text to
-        :return text: Returns the decompressed text as a string
+        Decompress the object file from the current position and write it to a text file a chunk at a time, so
+        memory use does not grow with the size of the file
+        :param file: Open text file object for writing decompressed text to - or a file opened in binary mode for
+                     a file of binary data
+        :return length: Number of characters written
         """
-        text = self.decompress()
-        file.write(text)
-        return text
+        length = 0
+        chunk, offset = self.get_chunk()
+        while chunk:
+            file.write(chunk[offset:] if offset else chunk)
+            length += len(chunk) - offset
+            self.position += len(chunk) - offset
+            chunk, offset = self.get_chunk()
+        return length
+
+    @rb
+    def read(self, size=-1) -> str:
+        """
+        Read the decompressed text from the current position, decoding it lazily like a file
+        :param size: Number of characters to read, or all of the remaining text if negative. Only as much of the
+                     file as is needed is decoded, and BLOCK_VERSION files start from the block holding the position
+        :return text: Decompressed text - empty at the end of the text
+        """
+        self.read_flags()
+        if size is None or size < 0:
+            if self.position == 0:
+                # Reading the whole text decompresses it in one go, with the object's workers
+                text = self.decompress()
+                self.position = len(text)
+                return text
+            size = -1
+        parts = []
+        while size != 0:
+            chunk, offset = self.get_chunk()
+            if not chunk:
+                break
+            end = len(chunk) if size < 0 else min(len(chunk), offset + size)
+            parts.append(chunk[offset: end])
+            self.position += end - offset
+            if size > 0:
+                size -= end - offset
+        return self.join_text(parts)
 
     @rb
-    def read(self) -> str:
+    def readline(self, size=-1) -> str:
         """
-        Decompress the object file and return the string of decompressed text
-        :return text: Decompressed text 
+        Read up to and including the next newline from the current position, decoding lazily
+        :param size: If not negative, the most characters to read
+        :return line: Line of decompressed text - empty at the end of the text
         """
-        text = self.decompress()
+        self.read_flags()
+        parts = []
+        while size != 0:
+            chunk, offset = self.get_chunk()
+            if not chunk:
+                break
+            end = chunk.find(b"\n" if self.binary else "\n", offset)
+            found = end >= 0
+            end = end + 1 if found else len(chunk)
+            if 0 < size < end - offset:
+                end, found = offset + size, False
+            parts.append(chunk[offset: end])
+            self.position += end - offset
+            if found:
+                break
+            if size > 0:
+                size -= end - offset
+        return self.join_text(parts)
+
+    @rb
+    def __iter__(self):
+        return self
+
+    @rb
+    def __next__(self) -> str:
+        """
+        :return line: Next line of decompressed text, read lazily
+        """
+        line = self.readline()
+        if not line:
+            raise StopIteration
+        return line
+
+    @rb
+    @measured('read_range')
+    def read_range(self, start: int, length: int) -> str:
+        """
+        Decompress a range of the object file's text. For BLOCK_VERSION files only the blocks the range
+        covers are decoded. Other versions can only be decoded from the start, so they are decoded a chunk at a time
+        up to the end of the range, without keeping the text before it
+        :param start: Position of the first character of the range in the decompressed text
+        :param length: Number of characters to read
+        :return text: Decompressed text of the range - shorter than length if the range passes the end of the text
+        """
+        if start < 0 or length < 0:
+            raise ValueError("Start and length of a range must not be negative")
+        self.read_flags()
+        if self.decompressed_text is not None:
+            return self.decompressed_text[start: start + length]
+        with self.stage('decode'):
+            if self.get_version() == self.BLOCK_VERSION:
+                text = self.get_block_reader().decode_range(start, length)
+            else:
+                text = self.decode_prefix_range(start, length)
+        if self.metrics is not None:
+            self.metrics.text_size += len(text)
         return text
+
+    def decode_prefix_range(self, start: int, length: int):
+        """
+        Decode a range of a file that is not in the block format, stopping at the end of the range
+        :param start: Position of the first character of the range in the decompressed text
+        :param length: Number of characters to read
+        :return text: Decompressed text of the range
+        """
+        end = start + length
+        parts = []
+        chunks = self.iter_chunks(0)
+        try:
+            for text_start, text in chunks:
+                if text_start + len(text) > start:
+                    parts.append(text[max(start - text_start, 0): end - text_start])
+                if text_start + len(text) >= end:
+                    break
+        finally:
+            chunks.close()
+        return self.join_text(parts)
+
+    @rb
+    def seek(self, offset: int, whence=io.SEEK_SET) -> int:
+        """
+        Move the position that read(size) reads from
+        :param offset: Number of characters to move by
+        :param whence: io.SEEK_SET - from the start, io.SEEK_CUR - from the current position or
+                       io.SEEK_END - from the end of the decompressed text
+        :return position: New position in the decompressed text
+        """
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self.position + offset
+        elif whence == io.SEEK_END:
+            position = self.get_text_length() + offset
+        else:
+            raise ValueError("Invalid whence value")
+        if position < 0:
+            raise ValueError("Negative seek position " + str(position))
+        self.position = position
+        return self.position
+
+    @rb
+    def tell(self) -> int:
+        """
+        :return position: Current position in the decompressed text
+        """
+        return self.position
+
+    def get_text_length(self) -> int:
+        """
+        :return text_length: Number of characters in the decompressed text of the object's file
+        """
+        if self.decompressed_text is None and self.get_version() == self.BLOCK_VERSION:
+            return self.get_block_reader().get_text_length()
+        return len(self.decompress())
+
+
+def compress(data, output=None, **options):
+    """
+    Compress text or binary data in memory, without a file on disk
+    :param data: String of text, bytes-like object of binary data, or a binary file object that is read to the end
+                 and compressed byte by byte, i.e a BytesIO or socket file
+    :param output: Writable buffer, i.e a bytearray, to write the compressed data into from the start, or a binary
+                   file object to write it to. None to return the compressed data
+    :param options: Keyword arguments of HuffmanFile, i.e version, block_size or lz77_level
+    :return compressed: bytes of the compressed data, or the number of bytes written when given an output
+    """
+    if output is None:
+        output = io.BytesIO()
+        compress(data, output, **options)
+        return output.getvalue()
+    if huffman_buffer.is_file_object(output):
+        output = huffman_buffer.CountingWriter(output)
+    with HuffmanFile(output, 'wb', **options) as huffman_file:
+        if isinstance(data, (io.RawIOBase, io.BufferedIOBase)):
+            huffman_file.write_from_file(data)
+        else:
+            huffman_file.write_from_string(data)
+        return huffman_file.file.tell()
+
+
+def decompress(data, output=None, **options):
+    """
+    Decompress compressed data in memory, without a file on disk
+    :param data: bytes-like object of the compressed data, which is read without copying it, or a binary file object
+                 to read it from, i.e a BytesIO or socket file
+    :param output: Writable buffer, i.e a bytearray, to write the decompressed data into from the start, or a binary
+                   file object to write it to, a chunk at a time. Text is written as utf-8. None to return the
+                   decompressed text
+    :param options: Keyword arguments of HuffmanFile, i.e workers
+    :return text: Decompressed text, or bytes for binary data - the number of bytes written when given an output
+    """
+    with HuffmanFile(data, 'rb', **options) as huffman_file:
+        if output is None:
+            return huffman_file.read()
+        writer = huffman_buffer.CountingWriter(output) if huffman_buffer.is_file_object(output) else huffman_buffer.BufferWriter(output)
+        with writer:
+            text = huffman_file.read(huffman_file.READ_CHUNK_SIZE)
+            while text:
+                writer.write(text.encode(huffman_buffer.TEXT_ENCODING, huffman_buffer.TEXT_ERRORS) if isinstance(text, str) else text)
+                text = huffman_file.read(huffman_file.READ_CHUNK_SIZE)
+            return writer.tell()
@@ -0,0 +1,175 @@
+class BitWriter:
+    """
+    Object for packing integer codes into bytes, most significant bit first. Bits are collected in an
+    integer accumulator and flushed to the buffer as whole bytes, so no string of 0's and 1's is ever built
+    """
+
+    # Number of bits the accumulator may hold before whole bytes are flushed to the buffer
+    FLUSH_BITS = 64
+
+    def __init__(self, size=0):
+        """
+        :param size: Number of bytes to preallocate in the output buffer - the buffer grows if it is exceeded
+        """
+        self.buffer = bytearray(size)
+        self.position = 0
+        self.accumulator = 0
+        self.bit_count = 0
+
+    def __len__(self):
+        """
+        :return int: Number of bits written so far
+        """
+        return self.position * 8 + self.bit_count
+
+    def flush(self) -> None:
+        """
+        Moves all whole bytes from the accumulator into the buffer
+        """
+        whole_bytes = self.bit_count >> 3
+        remaining = self.bit_count & 7
+        self.buffer[self.position: self.position + whole_bytes] = (self.accumulator >> remaining).to_bytes(whole_bytes, 'big')
+        self.position += whole_bytes
+        self.accumulator &= (1 << remaining) - 1
+        self.bit_count = remaining
+
+    def write(self, value: int, length: int) -> None:
+        """
+        Write the lowest length bits of value
+        :param value: Integer value of the bits to write
+        :param length: Number of bits to write
+        """
+        self.accumulator = (self.accumulator << length) | value
+        self.bit_count += length
+        if self.bit_count >= self.FLUSH_BITS:
+            self.flush()
+
+    def write_symbols(self, symbols, codes: dict) -> None:
+        """
+        Write the code of every symbol in an iterable of symbols
+        :param symbols: Iterable of symbols, i.e a string of text
+        :param codes: Dictionary of symbol to (code, length) pairs
+        """
+        buffer = self.buffer
+        position, accumulator, bit_count = self.position, self.accumulator, self.bit_count
+        flush_bits = self.FLUSH_BITS
+        for symbol in symbols:
+            code, length = codes[symbol]
+            accumulator = (accumulator << length) | code
+            bit_count += length
+            if bit_count >= flush_bits:
+                remaining = bit_count & 7
+                whole_bytes = bit_count >> 3
+                buffer[position: position + whole_bytes] = (accumulator >> remaining).to_bytes(whole_bytes, 'big')
+                position += whole_bytes
+                accumulator &= (1 << remaining) - 1
+                bit_count = remaining
+        self.position, self.accumulator, self.bit_count = position, accumulator, bit_count
+
+    def pad(self, full_byte_when_aligned=False) -> None:
+        """
+        Applies padding of 0's up to the next byte boundary
+        :param full_byte_when_aligned: If True a whole byte of padding is added when the bits are already
+                                       byte aligned, the same as HuffmanTools.pad_bitstream
+        """
+        padding = 8 - self.bit_count % 8
+        if padding < 8 or full_byte_when_aligned:
+            self.write(0, padding)
+
+    def take_bytes(self) -> bytes:
+        """
+        Removes and returns the whole bytes written so far, keeping the bits of an unfinished byte - for writing
+        the output as it is produced
+        :return data: bytes written since the last call
+        """
+        self.flush()
+        data = bytes(self.buffer[:self.position])
+        del self.buffer[:]
+        self.position = 0
+        return data
+
+    def getvalue(self) -> bytearray:
+        """
+        Returns the packed bytes - the bits must be padded to a byte boundary first
+        :return buffer: bytearray of all bytes written
+        """
+        if self.bit_count % 8:
+            raise ValueError("Bits must be padded to a byte boundary before getting the bytes")
+        self.flush()
+        del self.buffer[self.position:]
+        return self.buffer
+
+
+class BitReader:
+    """
+    Object for reading bits from a bytes-like object, most significant bit first, by keeping track of a bit
+    offset into the data rather than slicing it
+    """
+
+    def __init__(self, data, bit_offset=0):
+        """
+        :param data: bytes-like object to read from, i.e a memoryview of a memory mapped file
+        :param bit_offset: Bit position in data to start reading from
+        """
+        self.data = data
+        self.bit_offset = bit_offset
+
+    @property
+    def byte_offset(self) -> int:
+        """
+        Offset of the next whole byte after the bits that have been read
+        """
+        return (self.bit_offset + 7) >> 3
+
+    def read(self, length: int) -> int:
+        """
+        Read length bits as an integer
+        :param length: Number of bits to read
+        :return value: Integer value of the bits read
+        """
+        start = self.bit_offset >> 3
+        end = (self.bit_offset + length + 7) >> 3
+        if end > len(self.data):
+            raise ValueError("Unexpected end of compressed data")
+        value = int.from_bytes(self.data[start: end], 'big') >> (end * 8 - self.bit_offset - length)
+        self.bit_offset += length
+        return value & ((1 << length) - 1)
+
+    def align(self) -> None:
+        """
+        Skip any remaining bits up to the next byte boundary
+        """
+        self.bit_offset = self.byte_offset * 8
+
+
+def write_varint(buffer: bytearray, value: int) -> None:
+    """
+    Appends an unsigned integer to a buffer 7 bits per byte, least significant group first, with the top
+    bit of each byte set when more bytes follow
+    :param buffer: bytearray to append to
+    :param value: Unsigned integer to write
+    """
+    while value > 0x7f:
+        buffer.append(0x80 | (value & 0x7f))
+        value >>= 7
+    buffer.append(value)
+
+
+def read_varint(data, offset: int) -> (int, int):
+    """
+    Reads an unsigned integer written by write_varint
+    :param data: bytes-like object to read from
+    :param offset: Byte offset of the integer in data
+    :return value: Integer read
+    :return offset: Byte offset directly after the integer
+    """
+    value = shift = 0
+    while True:
+        if offset >= len(data):
+            raise ValueError("Unexpected end of compressed data")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
@@ -0,0 +1,391 @@
+import huffman_compression_tools
+import bit_io
+import _io
+
+
+class AdaptiveNode:
+    """
+    Node of an adaptive huffman tree. Nodes are kept in a list in order of decreasing node number, and index is
+    the node's position in that list
+    """
+
+    __slots__ = ('symbol', 'weight', 'parent', 'left', 'right', 'index')
+
+    def __init__(self, symbol=None, parent=None, index=0):
+        self.symbol = symbol
+        self.weight = 0
+        self.parent = parent
+        self.left = None
+        self.right = None
+        self.index = index
+
+    def __repr__(self):
+        return "<%s symbol=%r weight=%d>" % ("AdaptiveNode", self.symbol, self.weight)
+
+
+class AdaptiveHuffmanTree:
+    """
+    Huffman tree updated after every symbol with the FGK algorithm, so the encoder and decoder can build identical
+    trees from the symbols seen so far without any frequency table being stored. The tree starts with a single
+    not yet transmitted (NYT) node - a symbol seen for the first time is sent as the NYT code followed by its value,
+    and the NYT node is split into a new NYT node and a leaf for the symbol
+    """
+
+    def __init__(self):
+        self.root = AdaptiveNode()
+        self.nyt = self.root
+        # Nodes in order of decreasing node number - the weights never increase along the list (sibling property)
+        self.nodes = [self.root]
+        self.leaves = {}
+
+    def get_code(self, node: AdaptiveNode) -> (int, int):
+        """
+        :param node: Node of the tree, i.e a leaf or the NYT node
+        :return code: Integer value of the code of the node - left is 0 and right is 1
+        :return length: Number of bits in the code
+        """
+        code = length = 0
+        while node.parent is not None:
+            if node.parent.right is node:
+                code |= 1 << length
+            length += 1
+            node = node.parent
+        return code, length
+
+    def get_leader(self, node: AdaptiveNode) -> AdaptiveNode:
+        """
+        :param node: Node of the tree
+        :return leader: Highest numbered node with the same weight as node, found with a binary search of the nodes
+        """
+        weight = node.weight
+        low, high = 0, node.index
+        while low < high:
+            middle = (low + high) >> 1
+            if self.nodes[middle].weight > weight:
+                low = middle + 1
+            else:
+                high = middle
+        return self.nodes[low]
+
+    def swap(self, a: AdaptiveNode, b: AdaptiveNode) -> None:
+        """
+        Swap the positions of two nodes, and the subtrees below them, in the tree and the node list
+        :param a: Node that is not an ancestor of b
+        :param b: Node that is not an ancestor of a
+        """
+        parent_a, parent_b = a.parent, b.parent
+        if parent_a is parent_b:
+            parent_a.left, parent_a.right = parent_a.right, parent_a.left
+        else:
+            if parent_a.left is a:
+                parent_a.left = b
+            else:
+                parent_a.right = b
+            if parent_b.left is b:
+                parent_b.left = a
+            else:
+                parent_b.right = a
+            a.parent, b.parent = parent_b, parent_a
+        self.nodes[a.index], self.nodes[b.index] = b, a
+        a.index, b.index = b.index, a.index
+
+    def update(self, symbol) -> None:
+        """
+        Add one to the weight of a symbol, adding it to the tree if it is new, and restore the sibling property
+        :param symbol: Symbol that was just encoded or decoded
+        """
+        node = self.leaves.get(symbol)
+        if node is None:
+            # The NYT node becomes the parent of a new NYT node and a leaf for the symbol
+            parent = self.nyt
+            node = parent.right = AdaptiveNode(symbol, parent, len(self.nodes))
+            self.nyt = parent.left = AdaptiveNode(None, parent, len(self.nodes) + 1)
+            self.nodes += [node, self.nyt]
+            self.leaves[symbol] = node
+
+        while node is not None:
+            leader = self.get_leader(node)
+            if leader is not node and leader is not node.parent:
+                self.swap(node, leader)
+            node.weight += 1
+            node = node.parent
+
+
+class AdaptiveHuffmanCoder(huffman_compression_tools.HuffmanTools):
+    """
+    Shared parts of the adaptive writer and reader. After the NYT code a new symbol's value is written with
+    escape_bits bits. The two highest values are not symbols - flush_value pads to a byte boundary so everything
+    written so far can be decoded, and end_value marks the end of the stream
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.tree = AdaptiveHuffmanTree()
+        # Bit length of the value of a new symbol after the NYT code - enough for every unicode character, or
+        # every byte value, plus the flush and end values
+        self.escape_info = {'text': 21, 'binary': 9}
+
+    @property
+    def escape_bits(self) -> int:
+        return self.escape_info['binary' if self.binary else 'text']
+
+    @property
+    def end_value(self) -> int:
+        return (1 << self.escape_bits) - 1
+
+    @property
+    def flush_value(self) -> int:
+        return (1 << self.escape_bits) - 2
+
+    def join_symbols(self, symbols: list):
+        """
+        :param symbols: List of decoded symbols
+        :return text: String of the symbols, or bytes for binary data
+        """
+        return bytes(symbols) if self.binary else "".join(symbols)
+
+    def get_header(self) -> bytes:
+        """
+        :return header: Version marker, format version and flags that start an adaptive stream
+        """
+        return self.VERSION_MARKER + bytes([self.ADAPTIVE_VERSION, self.get_flags()])
+
+
+class AdaptiveHuffmanWriter(AdaptiveHuffmanCoder):
+    """
+    Compresses text in a single pass as it arrives, i.e from a socket or pipe. No frequency table is needed, so each
+    call to write() outputs every whole byte of the codes straight away - at most 7 bits are held back until more
+    text is written or the stream is flushed
+    """
+
+    def __init__(self, file_object: _io.BufferedWriter, binary=False):
+        """
+        :param file_object: Binary file object the compressed stream is written to
+        :param binary: True to compress bytes-like objects byte by byte, False to compress strings of text
+        """
+        super().__init__()
+        self.file = file_object
+        self.binary = binary
+        self.closed = False
+        self.writer = bit_io.BitWriter()
+        # Number of bytes written to the file object so far
+        self.position = 0
+        self.write_bytes(self.get_header())
+
+    def __enter__(self) -> object:
+        return self
+
+    def __exit__(self, type, value, traceback) -> None:
+        if not self.closed:
+            self.close()
+
+    def write_bytes(self, data) -> None:
+        """
+        Write bytes to the file, keeping track of the position in the file
+        :param data: bytes-like object to be written
+        """
+        self.file.write(data)
+        self.position += len(data)
+
+    def write_escape(self, value: int) -> None:
+        """
+        Write the NYT code followed by a value
+        :param value: Value of a new symbol, flush_value or end_value
+        """
+        code, length = self.tree.get_code(self.tree.nyt)
+        self.writer.write(code, length)
+        self.writer.write(value, self.escape_bits)
+
+    def write(self, text) -> None:
+        """
+        Compress text and write every whole byte of its codes to the file
+        :param text: String of text, or a bytes-like object when writing binary data
+        """
+        if self.closed:
+            raise ValueError("Write to a closed adaptive stream")
+        if isinstance(text, str) == self.binary:
+            raise TypeError("Stream expects " + ("a bytes-like object" if self.binary else "a string of text"))
+        if self.binary:
+            text = memoryview(text).cast('B')
+        tree, writer = self.tree, self.writer
+        for symbol in text:
+            node = tree.leaves.get(symbol)
+            if node is None:
+                self.write_escape(self.get_symbol_value(symbol))
+            else:
+                writer.write(*tree.get_code(node))
+            tree.update(symbol)
+        self.write_bytes(writer.take_bytes())
+
+    def flush(self) -> None:
+        """
+        Write a flush code padded to a byte boundary, so the reader can decode all of the text written so far, and
+        flush the file object
+        """
+        self.write_escape(self.flush_value)
+        self.writer.pad()
+        self.write_bytes(self.writer.take_bytes())
+        if hasattr(self.file, 'flush'):
+            self.file.flush()
+
+    def close(self) -> None:
+        """
+        Write the end code and the last partial byte - the file object is left open
+        """
+        if not self.closed:
+            self.write_escape(self.end_value)
+            self.writer.pad()
+            self.write_bytes(self.writer.take_bytes())
+            self.closed = True
+
+
+class AdaptiveHuffmanReader(AdaptiveHuffmanCoder):
+    """
+    Decompresses an adaptive stream as its bytes arrive. Data can be pushed with feed(), or pulled from a file object
+    with read() or by iterating over the reader. Decoding walks the tree one bit at a time, so it can stop at any
+    point in the stream and carry on when more bytes arrive
+    """
+
+    # Number of bytes asked of the file object at once - read1 is used when available, so fewer bytes may come back
+    READ_SIZE = 1 << 12
+
+    def __init__(self, file_object: _io.BufferedReader = None):
+        """
+        :param file_object: Binary file object to read the compressed stream from, None to only use feed()
+        """
+        super().__init__()
+        self.file = file_object
+        self.header = bytearray()
+        self.header_length = len(self.VERSION_MARKER) + 2
+        self.finished = False
+        # Decoded symbols not yet returned by read()
+        self.pending = []
+        # Decoding state between calls - the node reached so far, or the bits left of an escape value
+        self.node = self.tree.root
+        self.escape_remaining = 0
+        self.escape_value = 0
+
+    def __iter__(self):
+        """
+        Generator over the decompressed text as it is decoded, for as long as the file object gives data
+        :return text: Decompressed text of the data read, or bytes for binary data
+        """
+        if self.pending:
+            yield self.join_symbols(self.pending)
+            self.pending = []
+        while not self.finished:
+            data = self.read_data()
+            if not data:
+                raise ValueError("Unexpected end of compressed data")
+            symbols = self.decode(data)
+            if symbols:
+                yield self.join_symbols(symbols)
+
+    def read_data(self) -> bytes:
+        """
+        :return data: The next bytes of the file object, or b'' at the end of the file
+        """
+        if self.file is None:
+            raise ValueError("Reader has no file object to read from")
+        return getattr(self.file, 'read1', self.file.read)(self.READ_SIZE)
+
+    def read(self, size=-1):
+        """
+        Read decompressed text from the file object
+        :param size: If not negative the maximum number of characters to read, otherwise everything up to the end
+                     of the stream is read
+        :return text: Decompressed text, or bytes for binary data - empty once the stream has ended
+        """
+        while not self.finished and (size < 0 or len(self.pending) < size):
+            data = self.read_data()
+            if not data:
+                if size < 0:
+                    raise ValueError("Unexpected end of compressed data")
+                break
+            self.pending += self.decode(data)
+        if size < 0:
+            size = len(self.pending)
+        text = self.join_symbols(self.pending[:size])
+        del self.pending[:size]
+        return text
+
+    def feed(self, data):
+        """
+        Decode the next bytes of the stream
+        :param data: bytes-like object of the compressed stream, continuing from the last data given
+        :return text: Text decoded from the data, or bytes for binary data
+        """
+        return self.join_symbols(self.decode(data))
+
+    def read_header(self, data) -> memoryview:
+        """
+        Collect the header from the start of the stream
+        :param data: bytes-like object of the compressed stream
+        :return data: The data after the header, empty if the header is not complete yet
+        """
+        data = memoryview(data).cast('B')
+        needed = self.header_length - len(self.header)
+        self.header += data[:needed]
+        if len(self.header) == self.header_length:
+            if self.get_file_version(self.header) != self.ADAPTIVE_VERSION:
+                raise ValueError("Stream is not in the adaptive format")
+            self.set_flags(self.header[-1])
+        return data[needed:]
+
+    def decode(self, data) -> list:
+        """
+        Decode as many symbols as the data completes, keeping the state of any partly decoded code
+        :param data: bytes-like object of the compressed stream, continuing from the last data given
+        :return symbols: List of decoded symbols
+        """
+        if len(self.header) < self.header_length:
+            data = self.read_header(data)
+            if len(self.header) < self.header_length:
+                return []
+        tree = self.tree
+        escape_bits, end_value, flush_value = self.escape_bits, self.end_value, self.flush_value
+        node, escape_remaining, escape_value = self.node, self.escape_remaining, self.escape_value
+        if node is tree.nyt and not escape_remaining:
+            # The tree is empty, so the first symbol starts with its escape value
+            escape_remaining, escape_value = escape_bits, 0
+
+        output = []
+        for byte in data:
+            if self.finished:
+                break
+            mask = 0x80
+            while mask:
+                bit = byte & mask
+                mask >>= 1
+                if escape_remaining:
+                    escape_value = (escape_value << 1) | (1 if bit else 0)
+                    escape_remaining -= 1
+                    if escape_remaining:
+                        continue
+                    if escape_value == end_value:
+                        self.finished = True
+                        break
+                    if escape_value == flush_value:
+                        # The rest of the byte is padding
+                        mask = 0
+                    else:
+                        symbol = self.get_symbol_from_value(escape_value)
+                        output.append(symbol)
+                        tree.update(symbol)
+                else:
+                    node = node.right if bit else node.left
+                    if node is None:
+                        raise ValueError("Invalid code found in compressed data")
+                    if node is tree.nyt:
+                        escape_remaining, escape_value = escape_bits, 0
+                        continue
+                    if node.left is not None:
+                        continue
+                    output.append(node.symbol)
+                    tree.update(node.symbol)
+                # A symbol, or a flush, is complete - the next code starts from the root
+                node = tree.root
+                if node is tree.nyt:
+                    escape_remaining, escape_value = escape_bits, 0
+        self.node, self.escape_remaining, self.escape_value = node, escape_remaining, escape_value
+        return output
@@ -0,0 +1,252 @@
+import HuffmanCoding
+import asyncio
+import functools
+import _io
+
+
+class AsyncHuffmanFile:
+    """
+    asyncio version of HuffmanFile for use in an event loop. Reading and writing the file is done in the event loop's
+    default thread pool, and compressing and decompressing in a configurable executor, so the loop is never blocked.
+    A concurrent.futures.ProcessPoolExecutor spreads the compression of many files over every core - with the default
+    thread pool the work does not run in parallel, but the loop is still free while it runs. In read mode a
+    HuffmanFile is opened in the thread pool, and read(size), readline and read_range are each sent to it there, so
+    the file is decoded lazily a call at a time rather than read whole
+    """
+
+    # Appending reads the end of the file while it writes, so is only supported by HuffmanFile
+    HUFFMAN_FILE_MODES = ['rb', 'wb']
+
+    def __init__(self, file_path: str, mode='rb', executor=None, **options):
+        """
+        :param file_path: string, path to compressed binary file
+        :param mode: rb - read or wb - write to select the mode you wish to open the file in
+        :param executor: concurrent.futures.Executor to compress and decompress in, None for the event loop's default
+                         thread pool
+        :param options: Keyword arguments of HuffmanFile, i.e version, block_size or max_code_length
+        """
+        # Check the path, mode and options straight away, the same as HuffmanFile
+        if mode not in self.HUFFMAN_FILE_MODES:
+            raise ValueError("Invalid file mode. Please select either \'rb\' or \'wb\'")
+        HuffmanCoding.HuffmanFile(file_path, mode, **options)
+        self.file_path = file_path
+        self.mode = mode
+        self.executor = executor
+        self.options = options
+        self.file: _io.BufferedIOBase = None
+        # HuffmanFile the file is read through in read mode
+        self.huffman_file: HuffmanCoding.HuffmanFile = None
+        # The HuffmanFile keeps its position and decoding state between calls, so they are made one at a time
+        self.lock = asyncio.Lock()
+        self.decompressed_text = None
+
+    def __str__(self):
+        return "<%s name=\'%s\' mode=\'%s\'>" % ("AsyncHuffmanFile", self.file_path, self.mode)
+
+    async def __aenter__(self) -> object:
+        """
+        Opens the file - in read mode through a HuffmanFile, without reading any of it yet
+        """
+        if self.mode == 'rb':
+            self.huffman_file = await self.run_io(open_huffman_file, self.file_path, self.options)
+        else:
+            self.file = await self.run_io(open, self.file_path, self.mode)
+        return self
+
+    async def __aexit__(self, type, value, traceback) -> None:
+        """
+        Closes the file
+        """
+        if self.huffman_file is not None:
+            async with self.lock:
+                await self.run_io(self.huffman_file.__exit__, None, None, None)
+            self.huffman_file = None
+        else:
+            await self.run_io(self.file.close)
+
+    async def run_io(self, function, *args):
+        """
+        Run a blocking file operation in the event loop's default thread pool
+        :param function: Function to run
+        :param args: Arguments of the function
+        :return value: Return value of the function
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(function, *args))
+
+    async def run_file(self, function, *args):
+        """
+        Run a method of the object's HuffmanFile in the event loop's default thread pool, once any call already
+        running on it has finished
+        :param function: Method of the HuffmanFile to run
+        :param args: Arguments of the method
+        :return value: Return value of the method
+        """
+        async with self.lock:
+            return await self.run_io(function, *args)
+
+    async def run_cpu(self, function, *args):
+        """
+        Run compression or decompression in the object's executor
+        :param function: Module level function to run, so it can be sent to another process
+        :param args: Arguments of the function
+        :return value: Return value of the function
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(function, *args))
+
+    def check_mode(self, mode: str) -> None:
+        """
+        :param mode: Mode the operation needs
+        """
+        if self.mode != mode:
+            raise _io.UnsupportedOperation("file not writable" if mode == 'wb' else "file not readable")
+        if self.file is None and self.huffman_file is None:
+            raise ValueError("File is not open - use async with")
+
+    async def compress(self, text) -> bytes:
+        """
+        Compress text in the executor, without writing it to the file
+        :param text: String of text, or a bytes-like object of binary data
+        :return bytestream: Compressed bytes, ready to be written to a binary (.bin) file
+        """
+        self.check_mode('wb')
+        if isinstance(text, memoryview):
+            # memoryviews can not be sent to other processes
+            text = bytes(text)
+        return await self.run_cpu(compress_text, self.file_path, text, self.options)
+
+    async def write_from_string(self, text) -> int:
+        """
+        Compress text and write it to the object's binary file
+        :param text: String of text to be compressed, or a bytes-like object of binary data
+        :return length: Number of compressed bytes written
+        """
+        return await self.run_io(self.file.write, await self.compress(text))
+
+    async def write_from_bytes(self, data: bytes) -> int:
+        """
+        Compress binary data, byte by byte, and write it to the object's binary file
+        :param data: bytes, bytearray or memoryview to be compressed
+        :return length: Number of compressed bytes written
+        """
+        return await self.write_from_string(data)
+
+    async def decompress(self):
+        """
+        Decompress the whole file in the executor, which reads the file itself
+        :return decompressed_text: Decompressed text in a string, or bytes for a file of binary data
+        """
+        self.check_mode('rb')
+        if self.decompressed_text is None:
+            self.decompressed_text = await self.run_cpu(decompress_path, self.file_path, self.options)
+        return self.decompressed_text
+
+    async def read(self, size=-1):
+        """
+        Read the decompressed text from the current position, like HuffmanFile.read
+        :param size: Number of characters to read, decoding only as much of the file as is needed, or all of the
+                     remaining text if negative
+        :return text: Decompressed text, or bytes for a file of binary data - empty at the end of the text
+        """
+        self.check_mode('rb')
+        if size is None or size < 0:
+            size = -1
+            async with self.lock:
+                if self.huffman_file.position == 0:
+                    # Reading the whole text from the start decompresses it in one go in the executor
+                    text = await self.decompress()
+                    # The HuffmanFile carries on from the end, reading the text already decompressed
+                    self.huffman_file.decompressed_text = text
+                    self.huffman_file.position = len(text)
+                    return text
+        return await self.run_file(self.huffman_file.read, size)
+
+    async def readline(self, size=-1):
+        """
+        Read up to and including the next newline from the current position, decoding lazily
+        :param size: If not negative, the most characters to read
+        :return line: Line of decompressed text, or bytes for a file of binary data - empty at the end of the text
+        """
+        self.check_mode('rb')
+        return await self.run_file(self.huffman_file.readline, size)
+
+    async def read_range(self, start: int, length: int):
+        """
+        :param start: Position of the first character of the range in the decompressed text
+        :param length: Number of characters to read
+        :return text: Decompressed text of the range - shorter than length if the range passes the end of the text
+        """
+        if start < 0 or length < 0:
+            raise ValueError("Start and length of a range must not be negative")
+        if self.decompressed_text is not None:
+            return self.decompressed_text[start: start + length]
+        self.check_mode('rb')
+        return await self.run_file(self.huffman_file.read_range, start, length)
+
+def compress_text(file_path: str, text, options: dict) -> bytes:
+    """
+    Compress text as HuffmanFile would - run in the executor of an AsyncHuffmanFile
+    :param file_path: Path of the file being written, to check it the same as HuffmanFile
+    :param text: String of text, or a bytes-like object of binary data
+    :param options: Keyword arguments of HuffmanFile
+    :return bytestream: Compressed bytes
+    """
+    return HuffmanCoding.HuffmanFile(file_path, 'wb', **options).compress(text)
+
+
+def open_huffman_file(file_path: str, options: dict) -> HuffmanCoding.HuffmanFile:
+    """
+    Open a HuffmanFile for reading - run in the event loop's default thread pool by AsyncHuffmanFile
+    :param file_path: Path of the compressed binary file
+    :param options: Keyword arguments of HuffmanFile
+    :return huffman_file: The opened HuffmanFile, closed by calling its __exit__
+    """
+    return HuffmanCoding.HuffmanFile(file_path, 'rb', **options).__enter__()
+
+
+def decompress_path(file_path: str, options: dict):
+    """
+    Read and decompress a compressed file as HuffmanFile would - run in the executor of an AsyncHuffmanFile
+    :param file_path: Path of the compressed binary file
+    :param options: Keyword arguments of HuffmanFile
+    :return text: Decompressed text, or bytes for a file of binary data
+    """
+    with HuffmanCoding.HuffmanFile(file_path, 'rb', **options) as huffman_file:
+        return huffman_file.decompress()
+
+
+async def compress_files(files, max_concurrency=16, executor=None, **options) -> list:
+    """
+    Compress many files concurrently, with at most max_concurrency open at once
+    :param files: Iterable of (file_path, text) pairs, where text is a string or a bytes-like object of binary data
+    :param max_concurrency: Maximum number of files being compressed at once
+    :param executor: concurrent.futures.Executor to compress in, None for the event loop's default thread pool
+    :param options: Keyword arguments of HuffmanFile
+    :return lengths: List of the number of compressed bytes written to each file, in the order given
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def compress_file(file_path, text):
+        async with semaphore:
+            async with AsyncHuffmanFile(file_path, 'wb', executor, **options) as huffman_file:
+                return await huffman_file.write_from_string(text)
+
+    return await asyncio.gather(*(compress_file(file_path, text) for file_path, text in files))
+
+
+async def decompress_files(file_paths, max_concurrency=16, executor=None, **options) -> list:
+    """
+    Decompress many files concurrently, with at most max_concurrency open at once
+    :param file_paths: Iterable of paths to compressed binary files
+    :param max_concurrency: Maximum number of files being decompressed at once
+    :param executor: concurrent.futures.Executor to decompress in, None for the event loop's default thread pool
+    :param options: Keyword arguments of HuffmanFile
+    :return texts: List of the decompressed text of each file, in the order given
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def decompress_file(file_path):
+        async with semaphore:
+            async with AsyncHuffmanFile(file_path, 'rb', executor, **options) as huffman_file:
+                return await huffman_file.read()
+
+    return await asyncio.gather(*(decompress_file(file_path) for file_path in file_paths))
@@ -0,0 +1,281 @@
+"""
+Benchmark of each stage of the compression and decompression, for telling whether a change made things faster or
+slower
+
+    python -m huffman_benchmark --sizes 1K 1M 100M --save baseline.json
+    python -m huffman_benchmark --sizes 1K 1M 100M --compare baseline.json --threshold 0.1
+
+Each stage is timed on its own, best of --repeat runs, on synthetic corpora of each size and on any text files given
+with --corpus. Results are saved as JSON, and comparing against a saved baseline lists every stage that got slower
+by more than the threshold - the exit status is 1 if any did.
+"""
+import huffman_compression_tools
+import huffman_decoder
+import HuffmanCoding
+import tree
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+
+# Stages of the original file format pipeline, in order, followed by the table driven decoder and whole files
+STAGES = ['generate_frequency_table', 'plant_forest', 'merge_trees', 'generate_compression_codes', 'generate_file_header',
+          'generate_file_bytestream', 'extract_file_bitstream', 'decompress_bitstream', 'decompress_bytes',
+          'HuffmanFile.compress', 'HuffmanFile.decompress']
+SYNTHETIC_CORPORA = ['words', 'uniform', 'skewed']
+DEFAULT_SIZES = ['1K', '64K', '1M']
+# Changes in time smaller than this are treated as noise rather than regressions
+NOISE_SECONDS = 0.001
+
+
+def parse_size(size: str) -> int:
+    """
+    :param size: Number of bytes, with an optional K, M or G suffix i.e 64K
+    :return size: Number of bytes
+    """
+    multipliers = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    size = size.strip().upper()
+    if size and size[-1] in multipliers:
+        return int(size[:-1]) * multipliers[size[-1]]
+    return int(size)
+
+
+def generate_corpus(name: str, size: int, seed=0) -> str:
+    """
+    Generates repeatable synthetic 7bit ascii text, so every stage of the original format can run on it
+    :param name: words - english like text with word frequencies following Zipf's law, uniform - random printable
+                 characters, skewed - letters with Fibonacci frequencies, which gives the deepest trees
+    :param size: Number of characters
+    :param seed: Seed of the random number generator
+    :return text: String of text
+    """
+    generator = random.Random(seed)
+    if name == 'uniform':
+        alphabet = [chr(i) for i in range(32, 127)]
+        return "".join(generator.choices(alphabet, k=size))
+    if name == 'skewed':
+        alphabet = [chr(ord('a') + i) for i in range(26)]
+        weights = [1, 1]
+        while len(weights) < len(alphabet):
+            weights.append(weights[-1] + weights[-2])
+        return "".join(generator.choices(alphabet, weights, k=size))
+    if name == 'words':
+        letters = "etaoinshrdlcumwfgypbvkjxqz"
+        vocabulary = ["".join(generator.choices(letters, [26 - i for i in range(26)], k=generator.randint(1, 9)))
+                      for i in range(2000)]
+        weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+        parts = []
+        length = 0
+        while length < size:
+            words = generator.choices(vocabulary, weights, k=12)
+            line = " ".join(words).capitalize() + ".\n"
+            parts.append(line)
+            length += len(line)
+        return "".join(parts)[:size]
+    raise ValueError("Unknown corpus " + name)
+
+
+def time_stage(function, repeat: int):
+    """
+    :param function: Function taking no arguments to time
+    :param repeat: Number of times to run the function
+    :return seconds: Shortest time taken
+    :return value: Return value of the last run
+    """
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        value = function()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, value
+
+
+def benchmark_text(text: str, stages: list, repeat: int) -> dict:
+    """
+    Times each stage on a text. Every stage runs, as later stages need the output of earlier ones, but only the
+    selected stages are timed more than once. The stages of the original file format's header are left out for text
+    that can not be stored in it, i.e text that is not 7bit ascii
+    :param text: String of text
+    :param stages: List of names of stages to record
+    :param repeat: Number of runs of each stage
+    :return results: Dictionary of stage name to seconds
+    """
+    results = {}
+
+    def run(stage, function):
+        seconds, value = time_stage(function, repeat if stage in stages else 1)
+        if stage in stages:
+            results[stage] = seconds
+        return value
+
+    tools = huffman_compression_tools.HuffmanTools()
+    frequency = run('generate_frequency_table', lambda: tools.generate_frequency_table(text))
+    forest = run('plant_forest', lambda: tools.plant_forest(frequency))
+    huffman_tree = run('merge_trees', lambda: tools.merge_trees(forest))
+    huffman_tree.depth = tree.tree_depth(huffman_tree) - 1
+
+    def generate_compression_codes():
+        tools.compression_codes = {}
+        return tools.generate_compression_codes(huffman_tree, [None] * huffman_tree.depth)
+    run('generate_compression_codes', generate_compression_codes)
+    try:
+        header = run('generate_file_header', lambda: tools.generate_file_header(text, huffman_tree))
+    except ValueError:
+        header = None
+    body = run('generate_file_bytestream', lambda: tools.generate_file_bytestream(text))
+
+    # The remaining stages only run when they are selected, as the string based ones are very slow on large texts
+    if header is not None and {'extract_file_bitstream', 'decompress_bitstream'} & set(stages):
+        compressed = io.BytesIO(header + body)
+
+        def extract_file_bitstream():
+            compressed.seek(0)
+            return tools.extract_file_bitstream(compressed)
+        bitstream = run('extract_file_bitstream', extract_file_bitstream)
+        text_length, postorder = tools.extract_header_from_bitstream(bitstream)
+        body_bits = tools.get_file_body(bitstream, tools.calculate_binary_tree_header_length(postorder))
+        decompression_tree = tree.construct_tree_from_postorder(postorder)
+        run('decompress_bitstream', lambda: tools.decompress_bitstream(decompression_tree, text_length, body_bits))
+    if 'decompress_bytes' in stages:
+        decoder = huffman_decoder.HuffmanDecoder.from_tree(huffman_tree)
+        run('decompress_bytes', lambda: tools.decompress_bytes(decoder, len(text), body))
+
+    if {'HuffmanFile.compress', 'HuffmanFile.decompress'} & set(stages):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'benchmark.bin')
+
+            def compress():
+                with HuffmanCoding.HuffmanFile(path, 'wb') as huffman_file:
+                    huffman_file.write_from_string(text)
+
+            def decompress():
+                with HuffmanCoding.HuffmanFile(path, 'rb') as huffman_file:
+                    return huffman_file.read()
+            run('HuffmanFile.compress', compress)
+            run('HuffmanFile.decompress', decompress)
+    return results
+
+
+def get_corpora(corpora: list, sizes: list, corpus_files: list):
+    """
+    Generator over the texts to benchmark
+    :param corpora: List of names of synthetic corpora
+    :param sizes: List of sizes of the synthetic corpora, in bytes
+    :param corpus_files: List of paths of text files
+    :return name: Name of the corpus and its size, i.e words-64K
+    :return text: String of text
+    """
+    for name in corpora:
+        for size in sizes:
+            yield "%s-%s" % (name, format_size(size)), generate_corpus(name, size)
+    for path in corpus_files:
+        with open(path, 'r', encoding='utf-8', newline='') as file:
+            yield os.path.basename(path), file.read()
+
+
+def format_size(size: int) -> str:
+    """
+    :param size: Number of bytes
+    :return size: Size with a K, M or G suffix when it is a whole number of them
+    """
+    for suffix, multiplier in (('G', 1 << 30), ('M', 1 << 20), ('K', 1 << 10)):
+        if size >= multiplier and size % multiplier == 0:
+            return str(size // multiplier) + suffix
+    return str(size)
+
+
+def find_regressions(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    :param results: Results in the format saved by main
+    :param baseline: Results saved from an earlier run
+    :param threshold: Fraction a stage may get slower by before it is a regression, i.e 0.1 for 10%
+    :return regressions: List of (corpus, stage, baseline seconds, seconds) of each stage that got slower
+    """
+    regressions = []
+    for corpus, stages in results['results'].items():
+        for stage, result in stages.items():
+            previous = baseline['results'].get(corpus, {}).get(stage)
+            if previous is None:
+                continue
+            if result['seconds'] > previous['seconds'] * (1 + threshold) + NOISE_SECONDS:
+                regressions.append((corpus, stage, previous['seconds'], result['seconds']))
+    return regressions
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """
+    :return parser: Parser of the command line arguments
+    """
+    parser = argparse.ArgumentParser(prog="python -m huffman_benchmark", description="Time each stage of compression")
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES, help="Sizes of the synthetic corpora, i.e 1K 1M 200M")
+    parser.add_argument('--corpora', nargs='*', default=SYNTHETIC_CORPORA, choices=SYNTHETIC_CORPORA,
+                        help="Synthetic corpora to generate")
+    parser.add_argument('--corpus', nargs='+', default=[], help="Text files to benchmark as well")
+    parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES, help="Stages to time")
+    parser.add_argument('--repeat', type=int, default=3, help="Number of runs of each stage, the fastest is kept")
+    parser.add_argument('--save', help="Path to save the results to as JSON")
+    parser.add_argument('--compare', help="Path of saved results to compare against")
+    parser.add_argument('--threshold', type=float, default=0.1, help="Fraction slower that counts as a regression")
+    return parser
+
+
+def main(argv=None) -> int:
+    """
+    :param argv: List of command line arguments, None for sys.argv
+    :return status: Exit status - 1 if any stage regressed
+    """
+    args = get_parser().parse_args(argv)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+
+    results = {'python': platform.python_version(), 'platform': platform.platform(),
+               'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'repeat': args.repeat, 'results': {}}
+    print("%-20s %-28s %12s %12s %10s" % ("corpus", "stage", "seconds", "MB/s", "change"))
+    for name, text in get_corpora(args.corpora, [parse_size(size) for size in args.sizes], args.corpus):
+        try:
+            stage_seconds = benchmark_text(text, args.stages, args.repeat)
+        except ValueError as error:
+            print("%-20s skipped - %s" % (name, error))
+            continue
+        # Rates are of the utf-8 encoded text, the same bytes the command line reads from a text file
+        size = len(text.encode('utf-8', 'surrogatepass'))
+        corpus_results = results['results'][name] = {}
+        for stage in STAGES:
+            if stage not in stage_seconds:
+                continue
+            seconds = stage_seconds[stage]
+            corpus_results[stage] = {'seconds': seconds, 'bytes': size}
+            change = ""
+            previous = baseline['results'].get(name, {}).get(stage) if baseline else None
+            if previous:
+                change = "%+.1f%%" % (100 * (seconds - previous['seconds']) / previous['seconds'])
+            rate = "%.2f" % (size / 1e6 / seconds) if seconds > 0 else "-"
+            print("%-20s %-28s %12.6f %12s %10s" % (name, stage, seconds, rate, change))
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=2)
+        print("Results saved to " + args.save)
+
+    if baseline is not None:
+        regressions = find_regressions(results, baseline, args.threshold)
+        for corpus, stage, previous, seconds in regressions:
+            print("REGRESSION %s %s: %.6fs -> %.6fs (%+.1f%%)" % (corpus, stage, previous, seconds,
+                                                                 100 * (seconds - previous) / previous))
+        if regressions:
+            return 1
+        print("No regressions beyond %.0f%%" % (100 * args.threshold))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,585 @@
+import huffman_compression_tools
+import huffman_decoder
+import huffman_dictionary
+import huffman_context
+import huffman_lz77
+import _io
+import bisect
+
+
+class HuffmanBlockWriter(huffman_compression_tools.HuffmanTools):
+    """
+    Writes text to a binary file object in the block format (version 2) as it is given, so only one block of text
+    and its compressed bytes are ever held in memory. Each block carries its own code length table, reuses the
+    table of the block before it or refers to a shared dictionary, whichever gives the smallest block. With context
+    modeling a block may instead carry a table for each common context, and with an LZ77 level it may instead hold
+    LZ77 literals and matches, when that is smaller still
+    """
+
+    # Number of characters read into each block when streaming from a file
+    DEFAULT_BLOCK_SIZE = 1 << 20
+
+    def __init__(self, file_object: _io.BufferedWriter, flags=0, dictionary=None, max_code_length=None, metrics=None,
+                 context=False, lz77_level=None, block_reader=None, use_numpy=True):
+        """
+        :param file_object: Binary file object the compressed blocks are written to
+        :param flags: Integer of bit flags describing the blocks
+        :param dictionary: HuffmanDictionary that blocks may be encoded with, registered with the dictionary registry
+        :param max_code_length: Longest code length of the tables generated for blocks, None for no limit
+        :param metrics: huffman_metrics.CompressionMetrics to add the stages and statistics of the blocks to
+        :param context: If True blocks are tried with an order-1 context model, which is only used for a block when
+                        it makes the block smaller
+        :param lz77_level: Compression level from 1 to 9 that repeated strings are searched for with before blocks
+                           are huffman coded, only used for a block when it makes the block smaller. None to not search
+        :param block_reader: HuffmanBlockReader of a file being appended to, which file_object must be positioned at
+                             the end of the blocks of. The writer carries on from its last block, so new blocks may
+                             reuse its last table, rather than starting a new file. None to start a new file
+        :param use_numpy: If False the NumPy engine is not used to count or encode blocks, here or in worker
+                          processes, even when NumPy is installed
+        """
+        super().__init__()
+        self.use_numpy = self.use_numpy and use_numpy
+        if lz77_level is not None and lz77_level not in huffman_lz77.COMPRESSION_LEVELS:
+            raise ValueError("LZ77 level must be from 1 to 9")
+        self.max_code_length = max_code_length
+        self.metrics = metrics
+        self.context = context
+        self.lz77_level = lz77_level
+        self.file = file_object
+        self.flags = flags
+        self.set_flags(flags)
+        self.dictionary = dictionary
+        if dictionary is not None:
+            if dictionary.binary != self.binary:
+                raise ValueError("Dictionary was trained on " + ("binary data" if dictionary.binary else "text"))
+            huffman_dictionary.registry.register(dictionary)
+        # Code lengths of the most recent table, which the next block may reuse
+        self.code_lengths: dict = None
+        self.codes: dict = None
+        # Entries of the block index and the number of bytes written, for writing the index on close
+        self.index_entries = []
+        self.table_block: int = None
+        self.position = 0
+
+        if block_reader is None:
+            self.write_bytes(self.VERSION_MARKER + bytes([self.BLOCK_VERSION, flags]), header=True)
+        else:
+            self.resume(block_reader)
+
+    def resume(self, block_reader) -> None:
+        """
+        Carries on from the last block of an existing file, only reading its index and the header of its last table
+        :param block_reader: HuffmanBlockReader of the file being appended to
+        """
+        if block_reader.flags != self.flags:
+            raise ValueError("Can not append binary data to a file of text" if self.binary else
+                             "Can not append text to a file of binary data")
+        index = block_reader.get_index()
+        self.index_entries = list(block_reader.index_entries)
+        self.position = block_reader.blocks_end - block_reader.offset
+        # The most recent table that later blocks may reuse - context and LZ77 blocks, which hold their own tables, are skipped
+        for block in range(len(index) - 1, -1, -1):
+            table_distance = self.index_entries[block][2]
+            if table_distance:
+                block -= table_distance
+            block_type, symbol_count, table = self.extract_block_header(block_reader.file_buffer, index[block][2])[:3]
+            if block_type == self.TABLE_BLOCK:
+                self.code_lengths = table
+                self.codes = self.get_cached_codes(table)
+            elif block_type == self.DICTIONARY_BLOCK:
+                dictionary = block_reader.get_dictionary(table)
+                self.code_lengths, self.codes = dictionary.code_lengths, dictionary.codes
+            else:
+                continue
+            self.table_block = block
+            break
+
+    def write_bytes(self, data, header=False) -> None:
+        """
+        Write bytes to the file, keeping track of the position in the file
+        :param data: bytes-like object to be written
+        :param header: True if the bytes are not a block body, for the header size of the metrics
+        """
+        with self.stage('write'):
+            self.file.write(data)
+        self.position += len(data)
+        if self.metrics is not None:
+            self.metrics.compressed_size += len(data)
+            if header:
+                self.metrics.header_size += len(data)
+
+    def write_compressed_block(self, block_type: int, symbol_count: int, code_lengths: dict, body: bytearray) -> None:
+        """
+        Write the header and body of a compressed block to the file and add it to the block index
+        :param block_type: TABLE_BLOCK, REUSE_BLOCK, DICTIONARY_BLOCK, CONTEXT_BLOCK or LZ77_BLOCK
+        :param symbol_count: Number of symbols encoded in the block
+        :param code_lengths: Code lengths the block is encoded with, the ContextTable of a CONTEXT_BLOCK or the
+                             LZ77Table of an LZ77_BLOCK
+        :param body: bytearray of the packed codes
+        """
+        if block_type not in (self.REUSE_BLOCK, self.CONTEXT_BLOCK, self.LZ77_BLOCK):
+            self.table_block = len(self.index_entries)
+        table = self.dictionary.table_id if block_type == self.DICTIONARY_BLOCK else code_lengths
+        start = self.position
+        self.write_bytes(self.generate_block_header(block_type, symbol_count, table, len(body)), header=True)
+        self.write_bytes(body)
+        # Context and LZ77 blocks hold their own tables, and later blocks can still reuse the table from before them
+        table_distance = 0 if block_type in (self.CONTEXT_BLOCK, self.LZ77_BLOCK) else len(self.index_entries) - self.table_block
+        self.index_entries.append((symbol_count, self.position - start, table_distance))
+
+    def write_block(self, text: str) -> None:
+        """
+        Compress a block of text and write it to the file
+        :param text: String of text to be compressed as one block, or a bytes-like object when writing binary data
+        """
+        if len(text) == 0:
+            return
+        with self.stage('frequency'):
+            frequency = self.generate_frequency_table(text)
+        tokens = None
+        if self.lz77_level is not None:
+            with self.stage('lz77'):
+                tokens = tokenize_block(text, self.lz77_level)
+        block_type, code_lengths = self.choose_block(text, frequency, tokens)
+        with self.stage('table'):
+            if block_type not in (self.REUSE_BLOCK, self.CONTEXT_BLOCK, self.LZ77_BLOCK):
+                self.code_lengths = code_lengths
+                self.codes = self.dictionary.codes if block_type == self.DICTIONARY_BLOCK else self.get_cached_codes(code_lengths)
+        with self.stage('encode'):
+            if block_type == self.CONTEXT_BLOCK:
+                body = self.pack_context_symbols(text, code_lengths)
+            elif block_type == self.LZ77_BLOCK:
+                body = self.pack_lz77_tokens(tokens, code_lengths)
+            else:
+                body = self.pack_symbols(text, self.codes, frequency_table=frequency)
+        self.add_block_metrics(text, frequency, block_type, code_lengths, body)
+        self.write_compressed_block(block_type, len(text), code_lengths, body)
+
+    def add_block_metrics(self, text, frequency_table: dict, block_type: int, code_lengths, body: bytearray) -> None:
+        """
+        Add a block to the metrics, if they are enabled
+        :param text: String of text of the block, or a bytes-like object of binary data
+        :param frequency_table: Dictionary of the frequency of each symbol in the block
+        :param block_type: Type of the block
+        :param code_lengths: Code lengths, ContextTable or LZ77Table the block is encoded with
+        :param body: bytearray of the packed codes
+        """
+        if self.metrics is None:
+            return
+        self.metrics.text_size += len(text)
+        self.metrics.add_table(len(text), code_lengths, frequency_table,
+                               8 * len(body) if block_type in (self.CONTEXT_BLOCK, self.LZ77_BLOCK) else None)
+
+    def choose_table(self, frequency_table: dict) -> (int, dict):
+        """
+        Decides which table the next block is encoded with
+        :param frequency_table: Dictionary of the frequency of each symbol in the block
+        :return block_type: TABLE_BLOCK, REUSE_BLOCK or DICTIONARY_BLOCK
+        :return code_lengths: Code lengths the block is encoded with
+        """
+        dictionary_code_lengths = self.dictionary.code_lengths if self.dictionary is not None else None
+        return self.choose_block_table(frequency_table, self.code_lengths, dictionary_code_lengths)
+
+    def choose_block(self, text, frequency_table: dict, tokens=None) -> (int, dict):
+        """
+        Decides how a block is encoded - with the table from choose_table, an order-1 context model when context
+        modeling is enabled or LZ77 when the block has been tokenized, whichever gives the smallest block
+        :param text: String of text of the block, or a bytes-like object of binary data
+        :param frequency_table: Dictionary of the frequency of each symbol in the block
+        :param tokens: LZ77 tokens of the block from tokenize_block, None to not try LZ77
+        :return block_type: TABLE_BLOCK, REUSE_BLOCK, DICTIONARY_BLOCK, CONTEXT_BLOCK or LZ77_BLOCK
+        :return code_lengths: Code lengths, ContextTable or LZ77Table the block is encoded with
+        """
+        with self.stage('table'):
+            block_type, code_lengths = self.choose_table(frequency_table)
+        if not self.context and tokens is None:
+            return block_type, code_lengths
+        bit_length = self.get_block_bit_length(block_type, frequency_table, code_lengths)
+        if self.context:
+            with self.stage('context'):
+                table, bit_length = self.choose_context_table(text, frequency_table, bit_length)
+            if table is not None:
+                block_type, code_lengths = self.CONTEXT_BLOCK, table
+        if tokens is not None:
+            with self.stage('lz77'):
+                table = self.choose_lz77_table(tokens, bit_length)
+            if table is not None:
+                block_type, code_lengths = self.LZ77_BLOCK, table
+        return block_type, code_lengths
+
+    def write_blocks(self, blocks, executor=None, batch_size=1) -> None:
+        """
+        Compress blocks of text and write them to the file. When given an executor, batches of blocks have their
+        frequencies counted and their bodies encoded in parallel, while the tables are still chosen in order, so
+        the output is identical to writing the blocks one at a time
+        :param blocks: Iterable of strings of text, each compressed as one block
+        :param executor: concurrent.futures.Executor to spread the blocks across, None to compress in this process
+        :param batch_size: Number of blocks held in memory and handed to the executor at once
+        """
+        if executor is None:
+            for block in blocks:
+                self.write_block(block)
+            return
+
+        batch = []
+        for block in blocks:
+            if len(block) > 0:
+                batch.append(block)
+            if len(batch) >= batch_size:
+                self.write_batch(batch, executor)
+                batch = []
+        if batch:
+            self.write_batch(batch, executor)
+
+    def write_batch(self, blocks: list, executor) -> None:
+        """
+        Compress a batch of blocks in parallel and write them to the file in order
+        :param blocks: List of non-empty strings of text, each compressed as one block
+        :param executor: concurrent.futures.Executor to spread the blocks across
+        """
+        # Blocks are sent to other processes, so memoryviews have to be copied
+        blocks = [bytes(block) if isinstance(block, memoryview) else block for block in blocks]
+        block_tables = []
+        with self.stage('frequency'):
+            frequencies = list(executor.map(count_block, blocks, [self.use_numpy] * len(blocks)))
+        block_tokens = [None] * len(blocks)
+        if self.lz77_level is not None:
+            with self.stage('lz77'):
+                block_tokens = list(executor.map(tokenize_block, blocks, [self.lz77_level] * len(blocks)))
+        for block, frequency, tokens in zip(blocks, frequencies, block_tokens):
+            block_type, code_lengths = self.choose_block(block, frequency, tokens)
+            if block_type not in (self.CONTEXT_BLOCK, self.LZ77_BLOCK):
+                self.code_lengths = code_lengths
+            block_tables.append((block_type, code_lengths))
+        if self.code_lengths is not None:
+            self.codes = self.get_cached_codes(self.code_lengths)
+
+        # LZ77 blocks are encoded from their tokens rather than their text
+        inputs = [tokens if block_type == self.LZ77_BLOCK else block
+                  for block, tokens, (block_type, code_lengths) in zip(blocks, block_tokens, block_tables)]
+        with self.stage('encode'):
+            bodies = list(executor.map(encode_block, inputs, [code_lengths for block_type, code_lengths in block_tables],
+                                       frequencies, [self.use_numpy] * len(blocks)))
+        for block, frequency, (block_type, code_lengths), body in zip(blocks, frequencies, block_tables, bodies):
+            self.add_block_metrics(block, frequency, block_type, code_lengths, body)
+            self.write_compressed_block(block_type, len(block), code_lengths, body)
+
+    def close(self, index=False) -> None:
+        """
+        Marks the end of the blocks - must be called once all blocks have been written
+        :param index: If True an index of the blocks is written after them, for reading ranges of the text
+                      without decoding every block. It is left out of files of a single block, whose header is found
+                      straight away, and of files written with a dictionary, which are short records where the index
+                      would often be larger than the compressed text
+        """
+        if index and len(self.index_entries) > 1 and self.dictionary is None:
+            self.write_bytes(self.generate_block_index(self.index_entries, self.position), header=True)
+        else:
+            self.write_bytes(bytes([self.END_BLOCK]), header=True)
+
+
+class HuffmanBlockReader(huffman_compression_tools.HuffmanTools):
+    """
+    Reads the blocks of a block format (version 2) file from a bytes-like object of the file
+    """
+
+    def __init__(self, file_buffer, offset=0, registry=None):
+        """
+        :param file_buffer: bytes-like object of the file, i.e from map_file
+        :param offset: Byte offset of the start of the block format file in file_buffer
+        :param registry: DictionaryRegistry that dictionaries referenced by the file are found in, None for the
+                         shared huffman_dictionary.registry
+        """
+        super().__init__()
+        if self.get_file_version(memoryview(file_buffer)[offset:]) != self.BLOCK_VERSION:
+            raise ValueError("File is not in the block format")
+        self.file_buffer = file_buffer
+        self.flags = file_buffer[offset + len(self.VERSION_MARKER) + 1]
+        self.set_flags(self.flags)
+        self.offset = offset
+        self.start = offset + len(self.VERSION_MARKER) + 2
+        # Byte offset directly after the end block, or the index after it, known once all blocks have been read
+        self.end: int = None
+        # List of (text_start, symbol_count, block_offset, table_offset) of each block, built by get_index
+        self.index: list = None
+        # List of (symbol_count, block_length, table_distance) of each block, and the byte offset of the end block
+        # after them, also found by get_index
+        self.index_entries: list = None
+        self.blocks_end: int = None
+        self.text_starts: list = None
+        self.decoders = {}
+        self.registry = registry if registry is not None else huffman_dictionary.registry
+        # Dictionaries referenced by the file, by table id
+        self.dictionaries = {}
+
+    def get_dictionary(self, table_id: bytes) -> huffman_dictionary.HuffmanDictionary:
+        """
+        :param table_id: Table id stored in a dictionary block
+        :return dictionary: HuffmanDictionary with the table id, from the registry
+        """
+        if table_id not in self.dictionaries:
+            dictionary = self.registry.get(table_id)
+            if dictionary.binary != self.binary:
+                raise ValueError("Dictionary " + table_id.hex() + " does not match the type of data in the file")
+            self.dictionaries[table_id] = dictionary
+        return self.dictionaries[table_id]
+
+    def build_decoder(self, code_lengths: dict) -> huffman_decoder.HuffmanDecoder:
+        """
+        :param code_lengths: Code lengths a block is encoded with, or the ContextTable or LZ77Table of a block, as
+                             given by blocks()
+        :return decoder: HuffmanDecoder for the code lengths - the dictionary's own decoder if they belong to one - or
+                         a ContextDecoder or LZ77Decoder
+        """
+        for dictionary in self.dictionaries.values():
+            if dictionary.code_lengths is code_lengths:
+                return dictionary.get_decoder()
+        return self.get_table_decoder(code_lengths)
+
+    def blocks(self):
+        """
+        Generator over the blocks of the file
+        :return symbol_count: Number of symbols encoded in the block
+        :return code_lengths: Code lengths the block is encoded with, the ContextTable of a context block or the
+                              LZ77Table of an LZ77 block
+        :return body: memoryview of the block body - only valid until the next block is read
+        """
+        offset = self.start
+        code_lengths = None
+        while True:
+            block_type, symbol_count, table, body_offset, body_length = self.extract_block_header(self.file_buffer, offset)
+            if block_type == self.END_BLOCK:
+                self.end = body_offset
+                return
+            if block_type == self.INDEX_BLOCK:
+                self.end = self.extract_block_index(self.file_buffer, body_offset)[1]
+                return
+            if block_type == self.TABLE_BLOCK:
+                code_lengths = table
+            elif block_type == self.DICTIONARY_BLOCK:
+                code_lengths = self.get_dictionary(table).code_lengths
+            elif block_type == self.REUSE_BLOCK and code_lengths is None:
+                raise ValueError("First block does not contain a code length table")
+            body = memoryview(self.file_buffer)[body_offset: body_offset + body_length]
+            # Context and LZ77 blocks hold their own tables, leaving the table that later blocks may reuse as it is
+            yield symbol_count, table if block_type in (self.CONTEXT_BLOCK, self.LZ77_BLOCK) else code_lengths, body
+            body.release()
+            offset = body_offset + body_length
+
+    def decode_blocks(self, executor=None, batch_size=1):
+        """
+        Generator over the decompressed text of each block of the file
+        :param executor: concurrent.futures.Executor to decode batches of blocks in parallel, None to decode in this process
+        :param batch_size: Number of blocks handed to the executor at once
+        :return text: Decompressed text of the block, or bytes for binary data
+        """
+        if executor is not None:
+            batch = []
+            for symbol_count, code_lengths, body in self.blocks():
+                if self.metrics is not None:
+                    self.metrics.add_table(symbol_count, code_lengths, encoded_bits=8 * len(body))
+                # The body is copied, as it is sent to another process
+                batch.append((bytes(body), symbol_count, code_lengths, self.binary))
+                if len(batch) >= batch_size:
+                    with self.stage('decode'):
+                        texts = list(executor.map(decode_block, *zip(*batch)))
+                    yield from texts
+                    batch = []
+            if batch:
+                with self.stage('decode'):
+                    texts = list(executor.map(decode_block, *zip(*batch)))
+                yield from texts
+            return
+
+        decoder = decoder_code_lengths = None
+        for symbol_count, code_lengths, body in self.blocks():
+            if code_lengths is not decoder_code_lengths:
+                with self.stage('build_decoder'):
+                    decoder = self.build_decoder(code_lengths)
+                decoder_code_lengths = code_lengths
+            if self.metrics is not None:
+                self.metrics.add_table(symbol_count, code_lengths, encoded_bits=8 * len(body))
+            with self.stage('decode'):
+                text = self.decompress_bytes(decoder, symbol_count, body)
+            yield text
+
+    def find_index(self) -> list:
+        """
+        Reads the block index from the trailer at the end of the file, if the file has one
+        :return index_entries: List of (symbol_count, block_length, table_distance) of each block, or None
+        """
+        trailer_length = sum(self.trailer_info.values())
+        if len(self.file_buffer) - self.start < trailer_length:
+            return None
+        trailer = bytes(self.file_buffer[len(self.file_buffer) - trailer_length:])
+        if trailer[self.trailer_info['index_offset']:] != self.INDEX_MARKER:
+            return None
+        index_offset = self.offset + int.from_bytes(trailer[:self.trailer_info['index_offset']], 'big')
+        if index_offset >= len(self.file_buffer) or self.file_buffer[index_offset] != self.INDEX_BLOCK:
+            raise ValueError("Block index is corrupt")
+        index_entries, self.end = self.extract_block_index(self.file_buffer, index_offset + 1)
+        return index_entries
+
+    def get_index(self) -> list:
+        """
+        Locates every block of the file, from the block index when the file has one or otherwise by reading
+        only the block headers
+        :return index: List of (text_start, symbol_count, block_offset, table_offset) of each block, where
+                       text_start is the position of the block's first character in the decompressed text
+        """
+        if self.index is not None:
+            return self.index
+
+        index_entries = self.find_index()
+        if index_entries is None:
+            index_entries = []
+            offset = self.start
+            table_block = None
+            while True:
+                block_type, symbol_count, code_lengths, body_offset, body_length = self.extract_block_header(self.file_buffer, offset)
+                if block_type in (self.END_BLOCK, self.INDEX_BLOCK):
+                    break
+                if block_type in (self.CONTEXT_BLOCK, self.LZ77_BLOCK):
+                    index_entries.append((symbol_count, body_offset + body_length - offset, 0))
+                    offset = body_offset + body_length
+                    continue
+                if block_type != self.REUSE_BLOCK:
+                    table_block = len(index_entries)
+                elif table_block is None:
+                    raise ValueError("First block does not contain a code length table")
+                index_entries.append((symbol_count, body_offset + body_length - offset, len(index_entries) - table_block))
+                offset = body_offset + body_length
+
+        self.index = []
+        text_start, block_offset = 0, self.start
+        for symbol_count, block_length, table_distance in index_entries:
+            table_offset = self.index[-table_distance][2] if table_distance else block_offset
+            self.index.append((text_start, symbol_count, block_offset, table_offset))
+            text_start += symbol_count
+            block_offset += block_length
+        self.text_starts = [entry[0] for entry in self.index]
+        self.index_entries = index_entries
+        self.blocks_end = block_offset
+        return self.index
+
+    def get_text_length(self) -> int:
+        """
+        :return text_length: Number of characters in the decompressed text
+        """
+        index = self.get_index()
+        return index[-1][0] + index[-1][1] if index else 0
+
+    def get_decoder(self, table_offset: int) -> huffman_decoder.HuffmanDecoder:
+        """
+        Get the decoder for the code length table of the block at table_offset, building it the first time
+        :param table_offset: Byte offset of the block storing the code length table or dictionary id
+        :return decoder: HuffmanDecoder for the table
+        """
+        if table_offset not in self.decoders:
+            block_type, symbol_count, table = self.extract_block_header(self.file_buffer, table_offset)[:3]
+            if block_type == self.DICTIONARY_BLOCK:
+                self.decoders[table_offset] = self.get_dictionary(table).get_decoder()
+            else:
+                self.decoders[table_offset] = self.get_table_decoder(table)
+        return self.decoders[table_offset]
+
+    def decode_range(self, start: int, length: int) -> str:
+        """
+        Decompress a range of the text, only decoding the blocks that the range covers
+        :param start: Position of the first character of the range in the decompressed text
+        :param length: Number of characters in the range
+        :return text: Decompressed text of the range - shorter than length if the range passes the end of the text.
+                      bytes for binary data
+        """
+        if start < 0 or length < 0:
+            raise ValueError("Start and length of a range must not be negative")
+        index = self.get_index()
+        text = []
+        block = max(bisect.bisect_right(self.text_starts, start) - 1, 0)
+        while block < len(index) and length > 0:
+            text_start, symbol_count, block_offset, table_offset = index[block]
+            block_type, symbol_count, code_lengths, body_offset, body_length = self.extract_block_header(self.file_buffer, block_offset)
+            # Only decode as far into the block as the range goes
+            count = min(symbol_count, start + length - text_start)
+            block_text = self.decompress_bytes(self.get_decoder(table_offset), count,
+                                               memoryview(self.file_buffer)[body_offset: body_offset + body_length])
+            text.append(block_text[start - text_start:])
+            length -= len(text[-1])
+            start += len(text[-1])
+            block += 1
+        return self.join_text(text)
+
+    def decode_from(self, start: int, chunk_size: int):
+        """
+        Generator decoding the text lazily from a position to the end, starting at the block that holds the position
+        :param start: Position in the decompressed text to start from
+        :param chunk_size: Number of characters decoded at once, so a whole block is never held in memory
+        :return text_start: Position in the decompressed text of the first character of the chunk
+        :return text: Decompressed text of the chunk - it may start before the position asked for
+        """
+        index = self.get_index()
+        block = max(bisect.bisect_right(self.text_starts, start) - 1, 0)
+        for text_start, symbol_count, block_offset, table_offset in index[block:]:
+            body_offset, body_length = self.extract_block_header(self.file_buffer, block_offset)[3:]
+            body = memoryview(self.file_buffer)[body_offset: body_offset + body_length]
+            for text in self.decompress_chunks(self.get_decoder(table_offset), symbol_count, body, chunk_size):
+                yield text_start, text
+                text_start += len(text)
+            body.release()
+
+
+def count_block(text: str, use_numpy=True) -> dict:
+    """
+    Generates the frequency table of a block - run in a worker process when compressing in parallel
+    :param text: String of text of the block, or bytes of binary data
+    :param use_numpy: If False the NumPy engine is not used, as set on the writer
+    :return frequency: Dictionary of frequency of each character in the block
+    """
+    tools = huffman_compression_tools.HuffmanTools()
+    tools.use_numpy = tools.use_numpy and use_numpy
+    return tools.generate_frequency_table(text)
+
+
+def tokenize_block(text: str, level: int) -> tuple:
+    """
+    Finds the LZ77 literals and matches of a block - run in a worker process when compressing in parallel
+    :param text: String of text of the block, or bytes of binary data
+    :param level: LZ77 compression level from 1 to 9
+    :return tokens: (literal_symbols, distance_symbols, extra_bits) from huffman_lz77.tokenize
+    """
+    return huffman_lz77.tokenize(huffman_compression_tools.HuffmanTools().get_lz77_data(text), level)
+
+
+def encode_block(text: str, code_lengths: dict, frequency_table=None, use_numpy=True) -> bytearray:
+    """
+    Encodes the body of a block - run in a worker process when compressing in parallel
+    :param text: String of text of the block, bytes of binary data or the tokens of an LZ77 block
+    :param code_lengths: Code lengths the block is encoded with, the ContextTable of a context block or the
+                         LZ77Table of an LZ77 block
+    :param frequency_table: Dictionary of the frequency of each symbol of the block, from count_block
+    :param use_numpy: If False the NumPy engine is not used, as set on the writer
+    :return body: bytearray of the packed codes
+    """
+    tools = huffman_compression_tools.HuffmanTools()
+    tools.use_numpy = tools.use_numpy and use_numpy
+    tools.binary = not isinstance(text, str)
+    if isinstance(code_lengths, huffman_context.ContextTable):
+        return tools.pack_context_symbols(text, code_lengths)
+    if isinstance(code_lengths, huffman_lz77.LZ77Table):
+        return tools.pack_lz77_tokens(text, code_lengths)
+    return tools.pack_symbols(text, tools.get_cached_codes(code_lengths), frequency_table=frequency_table)
+
+
+def decode_block(body: bytes, symbol_count: int, code_lengths: dict, binary=False) -> str:
+    """
+    Decodes the body of a block - run in a worker process when decompressing in parallel
+    :param body: bytes of the block body
+    :param symbol_count: Number of symbols encoded in the block
+    :param code_lengths: Code lengths the block is encoded with, the ContextTable of a context block or the
+                         LZ77Table of an LZ77 block
+    :param binary: True if the block holds binary data
+    :return text: Decompressed text of the block, or bytes for binary data
+    """
+    tools = huffman_compression_tools.HuffmanTools()
+    tools.binary = binary
+    return tools.decompress_bytes(tools.get_table_decoder(code_lengths), symbol_count, body)
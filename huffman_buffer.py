@@ -0,0 +1,116 @@
+import io
+
+
+# Text decompressed into a buffer or binary file object is written as utf-8 - surrogates are let through so any
+# string that could be compressed can be written
+TEXT_ENCODING = 'utf-8'
+TEXT_ERRORS = 'surrogatepass'
+
+
+def is_file_object(source) -> bool:
+    """
+    :param source: Object given to HuffmanFile in place of a path
+    :return is_file_object: True if it is a file object rather than a bytes-like object
+    """
+    return hasattr(source, 'read') or hasattr(source, 'write')
+
+
+def check_source(source, mode: str):
+    """
+    Checks an object given to HuffmanFile in place of a path can be used in the mode
+    :param source: Binary file object, or bytes-like object
+    :param mode: rb - read, wb - write or ab - append
+    :return source: The object
+    """
+    if is_file_object(source):
+        if isinstance(source, io.TextIOBase):
+            raise ValueError("File object must be opened in binary mode")
+        return source
+    if mode == 'ab':
+        raise ValueError("Appending needs a path or a readable, seekable binary file object")
+    try:
+        view = memoryview(source)
+    except TypeError:
+        raise TypeError("Expected a path, binary file object or bytes-like object, not " + type(source).__name__) from None
+    if mode == 'wb' and view.readonly:
+        raise ValueError("Buffer to write to must be writable, i.e a bytearray")
+    view.release()
+    return source
+
+
+class BufferWriter(io.RawIOBase):
+    """
+    Binary file object writing into a buffer the caller provides, so compressed data goes straight into it without
+    any copies in between. Writing more than the buffer holds raises a ValueError
+    """
+
+    def __init__(self, buffer):
+        """
+        :param buffer: Writable bytes-like object, i.e a bytearray or a memoryview of one
+        """
+        super().__init__()
+        self.buffer = memoryview(buffer).cast('B')
+        if self.buffer.readonly:
+            raise ValueError("Buffer to write to must be writable, i.e a bytearray")
+        self.position = 0
+
+    def __str__(self):
+        return "<%s position=%d size=%d>" % ("BufferWriter", self.position, len(self.buffer))
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        """
+        :param data: bytes-like object to write
+        :return length: Number of bytes written
+        """
+        data = memoryview(data).cast('B')
+        end = self.position + len(data)
+        if end > len(self.buffer):
+            raise ValueError("Output buffer is too small - %d bytes are needed, it holds %d" % (end, len(self.buffer)))
+        self.buffer[self.position: end] = data
+        self.position = end
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def close(self) -> None:
+        """
+        Releases the view of the buffer, leaving the buffer itself as it is
+        """
+        if not self.closed:
+            self.buffer.release()
+        super().close()
+
+
+class CountingWriter(io.RawIOBase):
+    """
+    Binary file object passing writes on to another one, counting the bytes written - for file objects that
+    can not tell their position, i.e socket files
+    """
+
+    def __init__(self, file_object):
+        """
+        :param file_object: Binary file object to write to
+        """
+        super().__init__()
+        self.file = file_object
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        """
+        :param data: bytes-like object to write
+        :return length: Number of bytes written
+        """
+        self.file.write(data)
+        length = memoryview(data).nbytes
+        self.position += length
+        return length
+
+    def tell(self) -> int:
+        return self.position
@@ -0,0 +1,94 @@
+import collections
+import hashlib
+import threading
+
+
+class TableCache:
+    """
+    Thread safe least recently used cache of compression codes and decoders, keyed by a fingerprint of the
+    serialized code length table or header tree they were built from. Shared by every file in the process, so
+    files with the same symbol statistics only build their codes and decoder tables once
+    """
+
+    DEFAULT_MAX_SIZE = 256
+    FINGERPRINT_LENGTH = 16
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        """
+        :param max_size: Maximum number of entries kept, 0 to disable the cache
+        """
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @classmethod
+    def fingerprint(cls, table: bytes) -> bytes:
+        """
+        :param table: bytes-like object of a serialized table or tree, including anything that changes its meaning
+        :return fingerprint: Hash of the table used as a cache key
+        """
+        return hashlib.blake2b(table, digest_size=cls.FINGERPRINT_LENGTH).digest()
+
+    def get(self, key, build):
+        """
+        Get an entry, building and adding it if it is not in the cache. Entries are built outside of the lock, so
+        two threads missing at once may both build the same entry
+        :param key: Hashable key of the entry, i.e ('decoder', fingerprint)
+        :param build: Function taking no arguments which builds the entry
+        :return value: The cached or newly built entry
+        """
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+
+        value = build()
+        with self.lock:
+            if self.max_size > 0:
+                value = self.entries.setdefault(key, value)
+                self.entries.move_to_end(key)
+                self.evict()
+        return value
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used entries until the cache is within its size limit - the lock must be held
+        """
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def set_max_size(self, max_size: int) -> None:
+        """
+        :param max_size: Maximum number of entries kept, 0 to disable the cache
+        """
+        if max_size < 0:
+            raise ValueError("Cache size must not be negative")
+        with self.lock:
+            self.max_size = max_size
+            self.evict()
+
+    def clear(self) -> None:
+        """
+        Remove every entry and reset the hit and miss counters
+        """
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+    def get_stats(self) -> dict:
+        """
+        :return stats: Dictionary of the number of hits, misses, entries and the size limit
+        """
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries), 'max_size': self.max_size}
+
+
+# Cache shared by everything in the process
+cache = TableCache()
@@ -0,0 +1,286 @@
+"""
+Command line entry point for compressing and decompressing many files at once
+
+    python -m huffman_cli compress notes/ "logs/*.txt" --output archive/ --workers 4
+    python -m huffman_cli decompress archive/ --output restored/
+
+Compressed files are named after the original file with .bin added, and decompressing removes it again. Text
+files (.txt) are compressed as text and any other file as binary data. Files whose output is newer than the input
+are skipped unless --force is given.
+"""
+import HuffmanCoding
+import argparse
+import concurrent.futures
+import contextlib
+import glob
+import os
+import sys
+import time
+
+
+COMPRESSED_EXTENSION = '.bin'
+TEXT_EXTENSION = '.txt'
+# Text files are read and written as utf-8 with newlines left as they are, so they decompress to the same bytes
+TEXT_ENCODING = 'utf-8'
+
+
+def find_files(patterns: list, compressed: bool) -> list:
+    """
+    Expands directories and glob patterns into the files to process
+    :param patterns: List of paths of files or directories, or glob patterns
+    :param compressed: True to find compressed (.bin) files in directories, False to find every other file
+    :return files: List of (path, root) pairs where the file's output keeps its path relative to root
+    """
+    files = {}
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            paths = glob.glob(pattern, recursive=True)
+            root = get_glob_root(pattern)
+        else:
+            paths = [pattern]
+            root = os.path.dirname(pattern)
+        for path in sorted(paths):
+            if os.path.isdir(path):
+                for directory, directories, file_names in os.walk(path):
+                    directories.sort()
+                    for file_name in sorted(file_names):
+                        if file_name.endswith(COMPRESSED_EXTENSION) == compressed:
+                            files.setdefault(os.path.join(directory, file_name), path)
+            elif os.path.isfile(path):
+                files.setdefault(path, root)
+            else:
+                raise FileNotFoundError("No such file or directory: " + path)
+    return list(files.items())
+
+
+def get_glob_root(pattern: str) -> str:
+    """
+    :param pattern: Glob pattern
+    :return root: The directories at the start of the pattern before any wildcards, i.e logs for logs/**/*.txt
+    """
+    parts = []
+    for part in os.path.normpath(pattern).split(os.sep):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return os.sep.join(parts)
+
+
+def get_output_path(path: str, root: str, output_directory: str, compress: bool) -> str:
+    """
+    :param path: Path of the input file
+    :param root: Directory the output keeps its relative path from
+    :param output_directory: Directory to write the output to, None to write it next to the input
+    :param compress: True if the file is being compressed, False if it is being decompressed
+    :return output_path: Path of the output file
+    """
+    if output_directory is not None:
+        path = os.path.join(output_directory, os.path.relpath(path, root))
+    if compress:
+        return path + COMPRESSED_EXTENSION
+    if not path.endswith(COMPRESSED_EXTENSION):
+        raise ValueError("Compressed files must end with " + COMPRESSED_EXTENSION + ": " + path)
+    return path[:-len(COMPRESSED_EXTENSION)]
+
+
+def is_up_to_date(path: str, output_path: str) -> bool:
+    """
+    :param path: Path of the input file
+    :param output_path: Path of the output file
+    :return up_to_date: True if the output exists and was modified after the input
+    """
+    return os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(path)
+
+
+@contextlib.contextmanager
+def replace_on_success(output_path: str):
+    """
+    Gives a temporary path next to the output to write to, which replaces the output only once writing has
+    finished. A failed job leaves no partial output behind, which would otherwise look up to date on the next run
+    :param output_path: Path of the output file
+    :return temporary_path: Path to write the output to - it keeps the output's extension
+    """
+    directory, name = os.path.split(output_path)
+    os.makedirs(directory or '.', exist_ok=True)
+    # Named by the process writing it, as each output is only written by one job at a time
+    temporary_path = os.path.join(directory, '.%s.%d%s' % (name, os.getpid(), os.path.splitext(name)[1]))
+    try:
+        yield temporary_path
+        os.replace(temporary_path, output_path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.unlink(temporary_path)
+        raise
+
+
+def compress_file(path: str, output_path: str, options: dict) -> (int, int, float):
+    """
+    Compress one file - run in a worker process
+    :param path: Path of the file to compress
+    :param output_path: Path of the compressed (.bin) file to write
+    :param options: Keyword arguments of HuffmanFile
+    :return original_size: Number of bytes in the input file
+    :return compressed_size: Number of bytes in the compressed file
+    :return seconds: Time taken
+    """
+    start = time.perf_counter()
+    if path.endswith(TEXT_EXTENSION):
+        source = open(path, 'r', encoding=TEXT_ENCODING, newline='')
+    else:
+        source = open(path, 'rb')
+    with source, replace_on_success(output_path) as temporary_path:
+        with HuffmanCoding.HuffmanFile(temporary_path, 'wb', **options) as huffman_file:
+            huffman_file.write_from_file(source)
+    return os.path.getsize(path), os.path.getsize(output_path), time.perf_counter() - start
+
+
+def decompress_file(path: str, output_path: str, options: dict) -> (int, int, float):
+    """
+    Decompress one file - run in a worker process
+    :param path: Path of the compressed (.bin) file
+    :param output_path: Path of the file to write the decompressed text to
+    :param options: Keyword arguments of HuffmanFile
+    :return original_size: Number of bytes in the decompressed file
+    :return compressed_size: Number of bytes in the compressed file
+    :return seconds: Time taken
+    """
+    start = time.perf_counter()
+    with HuffmanCoding.HuffmanFile(path, 'rb', **options) as huffman_file, replace_on_success(output_path) as temporary_path:
+        # The first chunk shows whether the file holds text or binary data, and is then written from where it is kept
+        chunk, offset = huffman_file.get_chunk()
+        if isinstance(chunk, str):
+            output = open(temporary_path, 'w', encoding=TEXT_ENCODING, newline='')
+        else:
+            output = open(temporary_path, 'wb')
+        with output:
+            huffman_file.read_to_file(output)
+    return os.path.getsize(output_path), os.path.getsize(path), time.perf_counter() - start
+
+
+def format_sizes(original_size: int, compressed_size: int, compress: bool) -> str:
+    """
+    :param original_size: Number of uncompressed bytes
+    :param compressed_size: Number of compressed bytes
+    :param compress: True if the files were compressed, False if they were decompressed
+    :return sizes: Input and output sizes in bytes
+    """
+    if compress:
+        return "%d -> %d bytes" % (original_size, compressed_size)
+    return "%d -> %d bytes" % (compressed_size, original_size)
+
+
+def format_rate(size: int, seconds: float) -> str:
+    """
+    :param size: Number of uncompressed bytes processed
+    :param seconds: Time taken
+    :return rate: Throughput in MB/s
+    """
+    return "%.2f MB/s" % (size / 1e6 / seconds) if seconds > 0 else "- MB/s"
+
+
+def format_ratio(original_size: int, compressed_size: int) -> str:
+    """
+    :param original_size: Number of uncompressed bytes
+    :param compressed_size: Number of compressed bytes
+    :return ratio: Compressed size as a percentage of the original size
+    """
+    return "%.1f%%" % (100 * compressed_size / original_size) if original_size else "-"
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """
+    :return parser: Parser of the command line arguments
+    """
+    parser = argparse.ArgumentParser(prog="python -m huffman_cli", description="Compress or decompress files in bulk")
+    parser.add_argument('command', choices=['compress', 'decompress'])
+    parser.add_argument('paths', nargs='+', help="Files, directories or glob patterns (** matches any directories)")
+    parser.add_argument('-o', '--output', help="Directory to write to, keeping the layout of given directories. "
+                                               "By default files are written next to their input")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="Number of files processed at once (default: number of cpus)")
+    parser.add_argument('-f', '--force', action='store_true', help="Process files even if their output is up to date")
+    parser.add_argument('--version', type=int, default=HuffmanCoding.HuffmanFile.BLOCK_VERSION,
+                        choices=HuffmanCoding.HuffmanFile.FORMAT_VERSIONS, help="File format version to write")
+    parser.add_argument('--block-size', type=int, help="Characters per block of block format files")
+    parser.add_argument('--max-code-length', type=int, help="Longest code length allowed")
+    parser.add_argument('--context', action='store_true',
+                        help="Try an order-1 context model for each block of block format files")
+    parser.add_argument('--level', type=int, choices=range(1, 10), metavar='{1-9}',
+                        help="Search block format files for repeated strings (LZ77) with this effort level")
+    parser.add_argument('-q', '--quiet', action='store_true', help="Only print the summary")
+    return parser
+
+
+def main(argv=None) -> int:
+    """
+    :param argv: List of command line arguments, None for sys.argv
+    :return status: Exit status - 1 if any file failed
+    """
+    args = get_parser().parse_args(argv)
+    if args.workers < 1:
+        print("Number of workers must be at least 1", file=sys.stderr)
+        return 2
+    compress = args.command == 'compress'
+    options = {}
+    if compress:
+        options['version'] = args.version
+        if args.block_size is not None:
+            options['block_size'] = args.block_size
+        if args.max_code_length is not None:
+            options['max_code_length'] = args.max_code_length
+        if args.context:
+            options['context'] = True
+        if args.level is not None:
+            options['lz77_level'] = args.level
+
+    # Every file is handled on its own, so a file that can not be found, read or written only counts as failed
+    files = {}
+    failed = 0
+    for pattern in args.paths:
+        try:
+            for path, root in find_files([pattern], compressed=not compress):
+                files.setdefault(path, root)
+        except Exception as error:
+            failed += 1
+            print("%s: failed - %s" % (pattern, error), file=sys.stderr)
+    jobs, skipped = [], []
+    for path, root in files.items():
+        try:
+            output_path = get_output_path(path, root, args.output, compress)
+            up_to_date = not args.force and is_up_to_date(path, output_path)
+        except Exception as error:
+            failed += 1
+            print("%s: failed - %s" % (path, error), file=sys.stderr)
+            continue
+        (skipped if up_to_date else jobs).append((path, output_path))
+
+    function = compress_file if compress else decompress_file
+    total_original = total_compressed = done = 0
+    start = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(function, path, output_path, options): (path, output_path) for path, output_path in jobs}
+        for future in concurrent.futures.as_completed(futures):
+            path, output_path = futures[future]
+            try:
+                original_size, compressed_size, seconds = future.result()
+            except Exception as error:
+                failed += 1
+                print("%s: failed - %s" % (path, error), file=sys.stderr)
+                continue
+            done += 1
+            total_original += original_size
+            total_compressed += compressed_size
+            if not args.quiet:
+                print("%s -> %s  %s  %s  %s" % (path, output_path, format_sizes(original_size, compressed_size, compress),
+                                                format_ratio(original_size, compressed_size), format_rate(original_size, seconds)))
+    seconds = time.perf_counter() - start
+
+    print("%s %d files, skipped %d up to date, %d failed  %s  %s  %s" % (
+        "Compressed" if compress else "Decompressed", done, len(skipped), failed,
+        format_sizes(total_original, total_compressed, compress),
+        format_ratio(total_original, total_compressed), format_rate(total_original, seconds)))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
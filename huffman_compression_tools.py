@@ -1,7 +1,18 @@
 import tree
+import bit_io
+import huffman_decoder
+import huffman_numpy
+import huffman_cache
+import huffman_metrics
+import huffman_context
+import huffman_lz77
 import os
 import _io
 import sys
+import collections
+import heapq
+import math
+import mmap
 
 
 class HuffmanTools:
@@ -10,17 +21,73 @@ class HuffmanTools:
     Inherited by another class to make more userfrieldly and allows for more flexability if ever want to use
     this algorithm to compress files other than text.
     """
+    # Files that start with a text length of 0 are followed by a format version byte. The original format
+    # (version 0) never stores a length of 0, as an empty text has no huffman tree to store
+    VERSION_MARKER = bytes(4)
+    LEGACY_VERSION = 0
+    CANONICAL_VERSION = 1
+    BLOCK_VERSION = 2
+    ADAPTIVE_VERSION = 3
+    FORMAT_VERSIONS = [LEGACY_VERSION, CANONICAL_VERSION, BLOCK_VERSION, ADAPTIVE_VERSION]
+    # Types of block in a block format (version 2) file
+    END_BLOCK = 0
+    TABLE_BLOCK = 1
+    REUSE_BLOCK = 2
+    # End block followed by an index of the blocks and a trailer locating the index from the end of the file
+    INDEX_BLOCK = 3
+    INDEX_MARKER = b'HIDX'
+    # Block encoded with a shared dictionary, stored as its table id
+    DICTIONARY_BLOCK = 4
+    DICTIONARY_ID_LENGTH = 4
+    # Block encoded with an order-1 context model - a code length table for each common context
+    CONTEXT_BLOCK = 5
+    # Contexts seen fewer times than this in a block are left in the fallback table without being tried
+    MIN_CONTEXT_COUNT = 32
+    # Block of LZ77 literals and matches, with a code length table for the literal/length symbols and one for the
+    # distance symbols
+    LZ77_BLOCK = 6
+    # Flags stored in the header of canonical and block format files
+    BINARY_FLAG = 0x01
+    # Inputs of at least this many symbols are counted and encoded with NumPy when it is installed
+    NUMPY_MIN_SYMBOLS = 1 << 12
+
     def __init__(self):
         self.compression_codes = {}
+        # Statistics of the last tree codes were generated from, see tree.walk_tree
+        self.tree_stats: dict = None
+        # True when the symbols are byte values (ints) rather than characters
+        self.binary = False
+        self.use_numpy = huffman_numpy.numpy is not None
+        # Longest code length allowed when generating codes, None for no limit
+        self.max_code_length: int = None
+        # huffman_metrics.CompressionMetrics of the call being measured, None when metrics are disabled
+        self.metrics: huffman_metrics.CompressionMetrics = None
         # Information regarding bit length of each part of the header - if 0 then length is undefined
         self.header_info = {'text_length': 32, 'tree_leaves': 16, 'postorder_tree': 0}
+        # Bit length of the fixed size fields of a code length table
+        self.table_info = {'max_length': 6, 'width': 5}
+        # Byte length of the fields of the trailer after a block index
+        self.trailer_info = {'index_offset': 8, 'marker': len(self.INDEX_MARKER)}
+
+    def stage(self, name: str):
+        """
+        :param name: Name of a stage of compression or decompression, i.e encode
+        :return timer: Context manager timing the stage when metrics are enabled, otherwise one that does nothing
+        """
+        if self.metrics is None:
+            return huffman_metrics.NULL_STAGE
+        return self.metrics.stage(name)
 
     def generate_frequency_table(self, text: str) -> dict:
         """
         Generates a dictionary of the frequencies of each character in the provided string
-        :param text: String to gather frequencies
+        :param text: String to gather frequencies, or a bytes-like object to gather the frequencies of its byte values
         :return frequency: Dictionary of frequency of each character in string
         """
+        if not isinstance(text, str):
+            return self.generate_byte_frequency_table(text)
+        if self.numpy_enabled(text):
+            return huffman_numpy.generate_frequency_table(text)
         frequency = {}
         for char in text:
             if not char in frequency:
@@ -28,6 +95,25 @@ class HuffmanTools:
             frequency[char] += 1
         return frequency
 
+    def numpy_enabled(self, symbols) -> bool:
+        """
+        :param symbols: Symbols about to be counted or encoded
+        :return bool: True if the NumPy engine should be used - NumPy is installed and there are enough symbols
+                      to outweigh the cost of converting them to an array
+        """
+        return (self.use_numpy and isinstance(symbols, (str, bytes, bytearray, memoryview))
+                and len(symbols) >= self.NUMPY_MIN_SYMBOLS)
+
+    def generate_byte_frequency_table(self, data) -> dict:
+        """
+        Generates a dictionary of the frequencies of each byte value (0 - 255) in a bytes-like object
+        :param data: bytes, bytearray or memoryview to gather frequencies
+        :return frequency: Dictionary of frequency of each byte value in data
+        """
+        if self.numpy_enabled(data):
+            return huffman_numpy.generate_frequency_table(memoryview(data).cast('B'))
+        return dict(collections.Counter(memoryview(data).cast('B')))
+
     def plant_forest(self, frequency_table: dict) -> list:
         """
         Generates a list of Tree objects in increasing order of frequency from frequency
@@ -42,29 +128,29 @@ class HuffmanTools:
         """
         Merges all trees in a forest until there is only 1 root tree with pointers
         to all sub roots in the forest - This is the formation of the huffman compression
-        tree
+        tree. The two lowest frequency trees are taken from a priority queue on each merge, with
+        ties going to the tree that entered the queue first
         :param forest: list of tree.Tree objects returned from plant_forest method
         :return new_tree: tree.Tree objects as the huffman compression tree
         """
+        if len(forest) == 0:
+            raise ValueError("Unable to build a huffman tree from an empty forest")
         if len(forest) == 1:
             # Only 1 tree in the forest
-            new_tree = tree.Tree(None, forest[0].frequency, forest[0])
+            return tree.Tree(None, forest[0].frequency, forest[0])
 
         # Multiple trees to merge in the forest
-        while len(forest) > 1:
-            new_tree = tree.Tree(None, forest[0].frequency + forest[1].frequency, forest[0], forest[1])
-            del forest[:2]
+        queue = [(tree_node.frequency, order, tree_node) for order, tree_node in enumerate(forest)]
+        heapq.heapify(queue)
+        order = len(queue)
+        while len(queue) > 1:
+            left_frequency, _, left = heapq.heappop(queue)
+            right_frequency, _, right = heapq.heappop(queue)
+            new_tree = tree.Tree(None, left_frequency + right_frequency, left, right)
+            heapq.heappush(queue, (new_tree.frequency, order, new_tree))
+            order += 1
 
-            for index, tree_node in enumerate(forest):
-                if new_tree.frequency < tree_node.frequency:
-                    forest = forest[:index] + [new_tree] + forest[index:]
-                    break
-
-                elif index == len(forest) - 1:
-                    forest.append(new_tree)
-                    break
-            
-        return new_tree
+        return queue[0][2]
 
     def get_binary_code(self, binary_list: list) -> str:
         """
@@ -80,31 +166,21 @@ class HuffmanTools:
                 bits += str(bit)
         return bits 
 
-    def generate_compression_codes(self, tree: tree.Tree, code=[], top=0) -> dict:
+    def generate_compression_codes(self, huffman_tree: tree.Tree, code=None, top=0) -> dict:
         """
         Traverses tree and generates comrpession codes for each leaf in
-        the huffman tree
-        :param tree: The tree that will be traversed
-        :param code: Input list of None values of length of tree.depth -1. Use param - [None] * self.huffman_tree.depth after
-                     calculating tree depth - 1.
-        :param top: Leave blank - for method computation only
+        the huffman tree, in a single pass without recursion. The depth and code length statistics of the tree
+        are kept in self.tree_stats
+        :param huffman_tree: The tree that will be traversed
+        :param code: No longer needed - kept so existing calls still work
+        :param top: No longer needed - kept so existing calls still work
         :return self.compression_codes: Dictionary of key character and item of code
             i.e {'a': '010'}, used for getting the compression codes of each character
             without the need for the huffman compression tree
         """
-        if tree.left:
-            code[top] = 0
-            self.generate_compression_codes(tree.left, code, top+1)
-        if tree.right:
-            code[top] = 1
-            self.generate_compression_codes(tree.right, code, top+1)
-
-        if not tree.left and not tree.right:
-            self.compression_codes[tree.symbol] = self.get_binary_code(code)
-        code[top-1] = None
-
-        if all(bit is None for bit in code):
-            return self.compression_codes
+        postorder, codes, self.tree_stats = tree.walk_tree(huffman_tree)
+        self.compression_codes.update(codes)
+        return self.compression_codes
 
     def format_postorder_tree_for_header(self, postorder):
         """
@@ -123,45 +199,94 @@ class HuffmanTools:
         bitstream += '0'
         return bitstream
 
-    def generate_file_header(self, text, huffman_tree):
+    def get_integer_codes(self, compression_codes: dict) -> dict:
         """
+        Converts compression codes from strings of binary into integers for packing into bytes
+        :param compression_codes: Dictionary of key character and item of code i.e {'a': '010'}
+        :return integer_codes: Dictionary of key character and item of (code, length) i.e {'a': (2, 3)}
         """
-        header = ""
+        return {symbol: (int(code, 2), len(code)) for symbol, code in compression_codes.items()}
+
+    def write_postorder_tree(self, writer: bit_io.BitWriter, postorder: str) -> None:
+        """
+        Writes a postorder tree to a BitWriter in the header format - the packed equivalent
+        of format_postorder_tree_for_header
+        :param writer: BitWriter the header is being written to
+        :param postorder: String of the tree in postorder from tree.get_tree_postorder
+        """
+        i = 0
+        while i < len(postorder):
+            if postorder[i] == '0':
+                writer.write(0, 1)
+            elif postorder[i] == '1':
+                symbol = ord(postorder[i+1])
+                if symbol > 0x7f:
+                    raise ValueError("Only 7bit ascii characters can be stored in the file header")
+                writer.write(0x80 | symbol, 8)
+                i += 1
+            i += 1
+        # To indicate the end of the tree
+        writer.write(0, 1)
+
+    def generate_file_header(self, text, huffman_tree, postorder=None):
+        """
+        Generates the file header - length of the text and the postorder huffman tree - packed into bytes
+        :param text: String of text that is being compressed
+        :param huffman_tree: Huffman tree used to compress the text
+        :param postorder: String of the tree in postorder if it is already known, i.e from tree.walk_tree
+        :return header: bytearray of the header, padded to a whole number of bytes
+        """
+        writer = bit_io.BitWriter()
         # integer sating the length of the text
-        try:
-            bit_format = "{0:0" + str(self.header_info['text_length']) + "b}"
-            header += bit_format.format(len(text))
-        except:
-            raise UnicodeEncodeError("Text is too long to be represent in file header - need to increase header size")
+        if len(text) >= 1 << self.header_info['text_length']:
+            raise ValueError("Text is too long to be represent in file header - need to increase header size")
+        writer.write(len(text), self.header_info['text_length'])
         # Get postorder sequence
-        postorder = tree.get_tree_postorder(huffman_tree)
+        if postorder is None:
+            postorder = tree.get_tree_postorder(huffman_tree)
         # integer stating the number of nodes in the postorder sequence
         if len(postorder) > 0:
-            bit_format = "{0:0" + str(self.header_info["tree_leaves"]) + "b}"
-            header += bit_format.format(len(postorder) + 1)   # +1 as that has been added to indicate the end of the sequence
+            writer.write(len(postorder) + 1, self.header_info["tree_leaves"])   # +1 as that has been added to indicate the end of the sequence
         else:
             sys.exit("Compression Failed: Please generate compression codes before running this function, by running - \n generate_frequency_table(), plant_forest(), merge_trees(), generate_compression_codes()")
         # Add the actual postorder tree
-        header += self.format_postorder_tree_for_header(postorder)
-        # Binary postorder string with padding so that len() % 8 == 0
-        header = self.pad_bitstream(header)
-        header = self.get_byte_array(header)
-        return header
+        self.write_postorder_tree(writer, postorder)
+        # Padding so that the header is a whole number of bytes
+        writer.pad(full_byte_when_aligned=True)
+        return writer.getvalue()
 
-    def generate_file_bytestream(self, text: str) -> bytes:
+    def generate_file_bytestream(self, text: str, frequency_table=None) -> bytes:
         """
         Converts text that is being compressed into bytestream for adding to the binary compression file
         :param text: String of text that is being compressed
+        :param frequency_table: Dictionary of the frequency of each character of the text if it has already been
+                                counted, to size the output with. None to let the output grow as it is written
         :return bytestream: String converted into bytes - a form that will work when inserting into binary file
         """
-        bitstream = ''
-        # Encodes each character in the text
-        for char in text:
-            bitstream += str(self.compression_codes[char])
-        bitstream = self.pad_bitstream(bitstream)
-        # Converts string into byte array
-        bytestream = self.get_byte_array(bitstream)
-        return bytes(bytestream)
+        codes = self.get_integer_codes(self.compression_codes)
+        return bytes(self.pack_symbols(text, codes, full_byte_when_aligned=True, frequency_table=frequency_table))
+
+    def pack_symbols(self, symbols, codes: dict, full_byte_when_aligned=False, frequency_table=None) -> bytearray:
+        """
+        Encodes each symbol with its code and packs the codes into bytes, padded to a byte boundary
+        :param symbols: Iterable of symbols being compressed, i.e a string of text
+        :param codes: Dictionary of symbol to (code, length) pairs
+        :param full_byte_when_aligned: Pad with a whole byte when the codes end on a byte boundary, as in the
+                                       original file format
+        :param frequency_table: Dictionary of the frequency of each symbol, already counted by the caller, giving
+                                the exact size of the output so the buffer only needs allocating once. None to
+                                let the buffer grow as it is written, rather than counting the symbols again
+        :return bytestream: bytearray of the packed codes
+        """
+        if self.numpy_enabled(symbols):
+            return huffman_numpy.pack_symbols(symbols, codes, full_byte_when_aligned)
+        size = 0
+        if frequency_table is not None:
+            size = sum(count * codes[symbol][1] for symbol, count in frequency_table.items()) // 8 + 1
+        writer = bit_io.BitWriter(size)
+        writer.write_symbols(symbols, codes)
+        writer.pad(full_byte_when_aligned)
+        return writer.getvalue()
 
     def pad_bitstream(self, bitstream: str) -> str:
         """
@@ -191,21 +316,44 @@ class HuffmanTools:
     def extract_file_bitstream(self, file_object: _io.BufferedReader) -> str:
         """
         Converts a file object into a string of 0's and 1's for easy processing down the road
-        :param file_object:
-        :return bitstream:
+        :param file_object: Binary file object opened for reading
+        :return bitstream: String of binary of the whole file
         """
-        bitstream = ""
-        while (byte := file_object.read(1)):
-            bitstream += "{0:08b}".format(int.from_bytes(byte, byteorder='big'))
-        return bitstream
+        return "".join("{0:08b}".format(byte) for byte in file_object.read())
+
+    def map_file(self, file_object: _io.BufferedReader) -> memoryview:
+        """
+        Memory maps a file object so that the header and body can be read without copying the file into memory.
+        Falls back to a single bulk read when the file cannot be mapped, i.e an empty file or a pipe
+        :param file_object: Binary file object opened for reading
+        :return file_buffer: memoryview of the entire file's bytes - release with release_file_buffer()
+        """
+        try:
+            return memoryview(mmap.mmap(file_object.fileno(), 0, access=mmap.ACCESS_READ))
+        except (AttributeError, OSError, ValueError, _io.UnsupportedOperation):
+            return memoryview(file_object.read())
 
-    def extract_header_from_bitstream(self, bitstream: str) -> (int, list):
+    def release_file_buffer(self, file_buffer: memoryview) -> None:
+        """
+        Releases a memoryview returned from map_file, closing the memory map behind it
+        :param file_buffer: memoryview returned from map_file
+        """
+        mapping = file_buffer.obj
+        file_buffer.release()
+        if isinstance(mapping, mmap.mmap):
+            mapping.close()
+
+    def extract_header_from_bitstream(self, bitstream) -> (int, list):
         """
         Extract the header information from a file bitstream - length of text and postorder huffman tree
-        :param bitstream: String of binary extracted from binary file - full file
+        :param bitstream: String of binary extracted from binary file - full file, or a bytes-like object of the
+                          file, i.e from map_file, which is read by bit offset without any slicing
         :return file_length: Integer: number of characters in the body of the file
         :return postorder_huffman_tree: list of nodes of huffman decompression tree in postorder format
         """
+        if not isinstance(bitstream, str):
+            return self.extract_header_from_bytes(bitstream)
+
         file_length = int(bitstream[:self.header_info['text_length']], base=2)
         tree_size = int(bitstream[self.header_info['text_length']: self.header_info['text_length'] + self.header_info['tree_leaves']], base=2)
 
@@ -230,6 +378,30 @@ class HuffmanTools:
 
         return file_length, postorder_huffman_tree
 
+    def extract_header_from_bytes(self, file_buffer) -> (int, list):
+        """
+        Extract the header information from the bytes of a file by bit offset - length of text and postorder huffman tree
+        :param file_buffer: bytes-like object of the full file, i.e from map_file
+        :return file_length: Integer: number of characters in the body of the file
+        :return postorder_huffman_tree: list of nodes of huffman decompression tree in postorder format
+        """
+        reader = bit_io.BitReader(file_buffer)
+        file_length = reader.read(self.header_info['text_length'])
+        tree_size = reader.read(self.header_info['tree_leaves'])
+
+        # Extract the tree from header
+        postorder_huffman_tree = []
+        current_tree_index = 0
+        while current_tree_index < tree_size:
+            if reader.read(1):
+                postorder_huffman_tree.append(chr(reader.read(7)))
+                current_tree_index += 1
+            else:
+                postorder_huffman_tree.append(None)
+            current_tree_index += 1
+
+        return file_length, postorder_huffman_tree
+
     def calculate_binary_tree_header_length(self, postorder_tree_list: list) -> int:
         """
         Calculates the bit length of the binary tree stored in the file header from a given postorder list
@@ -248,15 +420,19 @@ class HuffmanTools:
             length += 1
         return length
 
-    def get_file_body(self, bitstream: str, binary_tree_length: int) -> str:
+    def get_file_body(self, bitstream, binary_tree_length: int):
         """
         Returns the body of a file given sizes of header information
-        :param bitstream: Binary stream of entire compressed file to extract the body from
+        :param bitstream: Binary stream of entire compressed file to extract the body from, either a string of
+                          binary or a bytes-like object of the file
         :param binary_tree_length: length of the binary tree stored in the file header - get by running
                                    calculate_binary_tree_header_length()
-        :return bitstream_body: Returns the body of a given bitstream
+        :return bitstream_body: Returns the body of a given bitstream - a zero copy memoryview when given bytes
         """
-        return bitstream[self.header_info['text_length'] + self.header_info['tree_leaves'] + binary_tree_length:]
+        body_offset = self.header_info['text_length'] + self.header_info['tree_leaves'] + binary_tree_length
+        if isinstance(bitstream, str):
+            return bitstream[body_offset:]
+        return memoryview(bitstream)[body_offset // 8:]
 
     def decompress_bitstream(self, decomression_tree: tree.Tree, text_length: int, bitstream: str) -> str:
         """
@@ -279,3 +455,715 @@ class HuffmanTools:
 
             current_bit += 1
         return text
+
+    def decompress_bytes(self, decoder: huffman_decoder.HuffmanDecoder, text_length: int, byte_stream: bytes,
+                         bit_offset=0) -> str:
+        """
+        Function for converting compressed file body back into human readable text using a table driven decoder,
+        working directly on the packed bytes rather than a string of binary
+        :param decoder: HuffmanDecoder built from the decompression tree - HuffmanDecoder.from_tree(tree)
+        :param text_length: integer - number of characters in the body of the file
+        :param byte_stream: bytes containing the compressed body
+        :param bit_offset: bit position in byte_stream where the body starts
+        :return text: decompressed text, or bytes when decompressing binary data
+        """
+        if self.binary:
+            return decoder.decode_bytes(byte_stream, text_length, bit_offset)
+        return decoder.decode_text(byte_stream, text_length, bit_offset)
+
+    def decompress_chunks(self, decoder: huffman_decoder.HuffmanDecoder, text_length: int, byte_stream: bytes,
+                          chunk_size: int, bit_offset=0):
+        """
+        Generator decoding a compressed body a chunk at a time, so the whole text never has to be held in memory
+        :param decoder: HuffmanDecoder for the codes of the body
+        :param text_length: integer - number of characters in the body
+        :param byte_stream: bytes containing the compressed body
+        :param chunk_size: Number of characters decoded in each chunk
+        :param bit_offset: bit position in byte_stream where the body starts
+        :return text: Decompressed text of the chunk, or bytes when decompressing binary data
+        """
+        if isinstance(decoder, huffman_lz77.LZ77Decoder):
+            # Matches reach back anywhere in an LZ77 block, so it is decoded whole and then split into chunks
+            text = self.decompress_bytes(decoder, text_length, byte_stream, bit_offset)
+            for start in range(0, text_length, chunk_size):
+                yield text[start: start + chunk_size]
+            return
+        previous = None
+        for start in range(0, text_length, chunk_size):
+            symbols, bit_offset = decoder.decode(byte_stream, min(chunk_size, text_length - start), bit_offset, previous)
+            # Context decoders carry on from the last symbol of the chunk before
+            previous = symbols[-1]
+            yield bytes(symbols) if self.binary else "".join(symbols)
+
+    def join_text(self, parts: list):
+        """
+        :param parts: List of decompressed strings, or bytes when decompressing binary data
+        :return text: The parts joined together
+        """
+        return (b"" if self.binary else "").join(parts)
+
+    def get_flags(self) -> int:
+        """
+        :return flags: Flags describing the symbols being compressed, for the file header
+        """
+        return self.BINARY_FLAG if self.binary else 0
+
+    def set_flags(self, flags: int) -> None:
+        """
+        Set up the object for decompressing symbols described by the flags of a file header
+        :param flags: Flags read from the file header
+        """
+        self.binary = bool(flags & self.BINARY_FLAG)
+
+    def get_code_lengths(self, huffman_tree: tree.Tree) -> dict:
+        """
+        Finds the length of the code for each leaf of a huffman tree - all that is needed to generate canonical codes
+        :param huffman_tree: Root of the huffman tree
+        :return code_lengths: Dictionary of key symbol and item of code length i.e {'a': 3}
+        """
+        code_lengths = {}
+        stack = [(huffman_tree, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if node.left is None and node.right is None:
+                code_lengths[node.symbol] = depth
+            for child in (node.left, node.right):
+                if child is not None:
+                    stack.append((child, depth + 1))
+        return code_lengths
+
+    def generate_code_lengths(self, frequency_table: dict) -> dict:
+        """
+        Builds a huffman tree from a frequency table and returns the length of each symbol's code
+        :param frequency_table: Dictionary returned from generate_frequency_table method
+        :return code_lengths: Dictionary of key symbol and item of code length - empty for an empty frequency table
+        """
+        if len(frequency_table) == 0:
+            return {}
+        code_lengths = self.get_code_lengths(self.merge_trees(self.plant_forest(frequency_table)))
+        if self.max_code_length is not None and max(code_lengths.values()) > self.max_code_length:
+            code_lengths = self.limit_code_lengths(frequency_table, self.max_code_length)
+        return code_lengths
+
+    def limit_code_lengths(self, frequency_table: dict, max_length: int) -> dict:
+        """
+        Generates the optimal code lengths where no code is longer than max_length, with the package-merge algorithm.
+        Each level, from the longest code length up, merges the symbols with packages of pairs of the items of the
+        level below, in order of frequency. The 2n - 2 lowest frequency items of the top level decide the code
+        lengths - a symbol's code length is the number of levels it is taken from, which only needs the number of
+        symbols taken from each level as the lowest frequency symbols are always taken first
+        :param frequency_table: Dictionary of key symbol and item of frequency
+        :param max_length: Longest code length allowed
+        :return code_lengths: Dictionary of key symbol and item of code length
+        """
+        symbols = [symbol for symbol, frequency in sorted(frequency_table.items(), key=lambda item: item[1])]
+        if len(symbols) > 1 << max_length:
+            raise ValueError("%d symbols can not all have codes of at most %d bits" % (len(symbols), max_length))
+        if len(symbols) == 1:
+            return {symbols[0]: 1}
+
+        # Each level is a list of (frequency, is_package) in ascending order of frequency, deepest level first
+        leaves = [(frequency_table[symbol], False) for symbol in symbols]
+        levels = [leaves]
+        for level in range(max_length - 1):
+            below = levels[-1]
+            packages = [(below[i][0] + below[i + 1][0], True) for i in range(0, len(below) - 1, 2)]
+            # Symbols go before packages of equal frequency
+            levels.append(list(heapq.merge(leaves, packages, key=lambda item: item[0])))
+
+        lengths = [0] * len(symbols)
+        count = 2 * len(symbols) - 2
+        for items in reversed(levels):
+            taken_leaves = sum(1 for frequency, is_package in items[:count] if not is_package)
+            for i in range(taken_leaves):
+                lengths[i] += 1
+            # Every package taken is made of 2 items of the level below
+            count = 2 * (count - taken_leaves)
+        return dict(zip(symbols, lengths))
+
+    def build_canonical_tree(self, code_lengths: dict) -> tree.Tree:
+        """
+        Builds the huffman tree of the canonical codes of code lengths, i.e for code lengths that are limited and so
+        do not come from merge_trees
+        :param code_lengths: Dictionary of key symbol and item of code length
+        :return huffman_tree: Root tree object of a tree with each symbol at the depth of its code length
+        """
+        root = tree.Tree(None)
+        for symbol, (code, length) in self.generate_canonical_codes(code_lengths).items():
+            node = root
+            for shift in range(length - 1, 0, -1):
+                if (code >> shift) & 1:
+                    node.right = node.right or tree.Tree(None)
+                    node = node.right
+                else:
+                    node.left = node.left or tree.Tree(None)
+                    node = node.left
+            if code & 1:
+                node.right = tree.Tree(symbol)
+            else:
+                node.left = tree.Tree(symbol)
+        return root
+
+    def get_encoded_bit_length(self, frequency_table: dict, code_lengths: dict) -> int:
+        """
+        Calculates the number of bits the symbols of a frequency table take when encoded with the given code lengths
+        :param frequency_table: Dictionary of key symbol and item of frequency
+        :param code_lengths: Dictionary of key symbol and item of code length
+        :return bit_length: Number of bits, or None if a symbol has no code
+        """
+        if any(symbol not in code_lengths for symbol in frequency_table):
+            return None
+        return sum(frequency * code_lengths[symbol] for symbol, frequency in frequency_table.items())
+
+    def get_entropy_bit_length(self, frequency_table: dict) -> float:
+        """
+        Calculates the entropy of a frequency table in bits - no code built from the frequencies can encode
+        them in fewer bits
+        :param frequency_table: Dictionary of key symbol and item of frequency
+        :return bit_length: Entropy of all symbols in the frequency table
+        """
+        total = sum(frequency_table.values())
+        return sum(frequency * math.log2(total / frequency) for frequency in frequency_table.values())
+
+    def choose_block_table(self, frequency_table: dict, previous_code_lengths: dict, dictionary_code_lengths=None) -> (int, dict):
+        """
+        Decides whether a block should carry its own code length table, reuse the table of the block before it
+        or use a shared dictionary, by whichever gives the smaller block
+        :param frequency_table: Dictionary of the frequency of each symbol in the block
+        :param previous_code_lengths: Code lengths of the previous table, None for the first block
+        :param dictionary_code_lengths: Code lengths of the shared dictionary, None if there is no dictionary
+        :return block_type: TABLE_BLOCK, REUSE_BLOCK or DICTIONARY_BLOCK
+        :return code_lengths: Code lengths the block is encoded with
+        """
+        # Candidates of (bits, block_type, code_lengths) - on a tie the earliest candidate is used
+        candidates = []
+        if previous_code_lengths is not None:
+            reuse_bits = self.get_encoded_bit_length(frequency_table, previous_code_lengths)
+            if reuse_bits is not None:
+                candidates.append((reuse_bits, self.REUSE_BLOCK, previous_code_lengths))
+        if dictionary_code_lengths is not None:
+            dictionary_bits = self.get_encoded_bit_length(frequency_table, dictionary_code_lengths)
+            if dictionary_bits is not None:
+                candidates.append((dictionary_bits + 8 * self.DICTIONARY_ID_LENGTH, self.DICTIONARY_BLOCK, dictionary_code_lengths))
+
+        # A new table can not do better than the entropy, so there is no need to build one if a table
+        # that is already known does at least as well
+        if candidates and min(candidate[0] for candidate in candidates) <= self.get_entropy_bit_length(frequency_table):
+            bits, block_type, code_lengths = min(candidates, key=lambda candidate: candidate[0])
+            return block_type, code_lengths
+
+        code_lengths = self.generate_code_lengths(frequency_table)
+        table_bits = 8 * len(self.generate_code_length_table(code_lengths))
+        candidates.append((self.get_encoded_bit_length(frequency_table, code_lengths) + table_bits, self.TABLE_BLOCK, code_lengths))
+        bits, block_type, code_lengths = min(candidates, key=lambda candidate: candidate[0])
+        return block_type, code_lengths
+
+    def get_block_bit_length(self, block_type: int, frequency_table: dict, code_lengths: dict) -> int:
+        """
+        :param block_type: TABLE_BLOCK, REUSE_BLOCK or DICTIONARY_BLOCK, as chosen by choose_block_table
+        :param frequency_table: Dictionary of the frequency of each symbol in the block
+        :param code_lengths: Code lengths the block is encoded with
+        :return bit_length: Number of bits of the block's table and body, leaving out the parts every block has
+        """
+        bit_length = self.get_encoded_bit_length(frequency_table, code_lengths)
+        if block_type == self.TABLE_BLOCK:
+            bit_length += 8 * len(self.generate_code_length_table(code_lengths))
+        elif block_type == self.DICTIONARY_BLOCK:
+            bit_length += 8 * self.DICTIONARY_ID_LENGTH
+        return bit_length
+
+    def choose_context_table(self, text, frequency_table: dict, block_bit_length: int) -> huffman_context.ContextTable:
+        """
+        Builds an order-1 context model of a block. Contexts are tried from the most common down, and each one is
+        given a table of its own when that saves more than the table costs, against the fallback table the rest
+        of the contexts share. Rare contexts stay clustered in the fallback table
+        :param text: String of text of the block, or a bytes-like object of binary data
+        :param frequency_table: Dictionary of the frequency of each symbol in the block
+        :param block_bit_length: Bits the block takes without a context model, from get_block_bit_length
+        :return table: ContextTable for the block, or None if it would not make the block smaller
+        :return bit_length: Estimated bits of the block's tables and body with the context model, or block_bit_length
+                            if there is no model
+        """
+        if len(text) < 2:
+            return None, block_bit_length
+        context_frequencies = {}
+        for (context, symbol), count in collections.Counter(zip(text, text[1:])).items():
+            context_frequencies.setdefault(context, {})[symbol] = count
+
+        fallback = dict(frequency_table)
+        fallback_total = len(text)
+        tables = {}
+        table_bit_length = 0
+        for context, frequency in sorted(context_frequencies.items(), key=lambda item: sum(item[1].values()), reverse=True):
+            count = sum(frequency.values())
+            if count < self.MIN_CONTEXT_COUNT:
+                break
+            code_lengths = self.generate_code_lengths(frequency)
+            # The table and the context's symbol value are stored in the block header
+            table_bits = 8 * (len(self.generate_code_length_table(code_lengths)) + 3)
+            own_bits = self.get_encoded_bit_length(frequency, code_lengths) + table_bits
+            # Estimated bits of the context's symbols if they stay in the fallback table
+            shared_bits = sum(symbol_count * math.log2(fallback_total / fallback[symbol]) for symbol, symbol_count in frequency.items())
+            if own_bits < shared_bits:
+                tables[context] = code_lengths
+                table_bit_length += own_bits
+                for symbol, symbol_count in frequency.items():
+                    fallback[symbol] -= symbol_count
+                    if fallback[symbol] == 0:
+                        del fallback[symbol]
+                fallback_total -= count
+        if not tables:
+            return None, block_bit_length
+
+        fallback_code_lengths = self.generate_code_lengths(fallback)
+        table_bit_length += (self.get_encoded_bit_length(fallback, fallback_code_lengths)
+                             + 8 * len(self.generate_code_length_table(fallback_code_lengths)))
+        # The model turns itself off when its tables cost more than they save
+        if table_bit_length >= block_bit_length:
+            return None, block_bit_length
+        return huffman_context.ContextTable(fallback_code_lengths, tables), table_bit_length
+
+    def pack_context_symbols(self, symbols, table: huffman_context.ContextTable) -> bytearray:
+        """
+        Encodes each symbol with its code from the table of the symbol before it, packing the codes into bytes
+        padded to a byte boundary
+        :param symbols: String of text being compressed, or a memoryview of binary data
+        :param table: ContextTable the symbols are encoded with
+        :return bytestream: bytearray of the packed codes
+        """
+        writer = bit_io.BitWriter()
+        if len(symbols) > 0:
+            # Codes of every (context, symbol) pair, so the codes are written in a single pass. The fallback codes
+            # are only generated once, and shared by every context without a table of its own
+            fallback_codes = self.get_cached_codes(table.fallback)
+            pair_codes = huffman_context.ContextCodes(fallback_codes, {context: self.get_cached_codes(code_lengths)
+                                                                       for context, code_lengths in table.tables.items()})
+            writer.write(*fallback_codes[symbols[0]])
+            writer.write_symbols(zip(symbols, symbols[1:]), pair_codes)
+        writer.pad()
+        return writer.getvalue()
+
+    def generate_context_table(self, table: huffman_context.ContextTable) -> bytearray:
+        """
+        Serializes the tables of a context block - the number of contexts, the fallback table, then the symbol value
+        and table of each context
+        :param table: ContextTable to serialize
+        :return context_table: bytearray of the serialized tables
+        """
+        context_table = bytearray()
+        bit_io.write_varint(context_table, len(table.tables))
+        context_table += self.generate_code_length_table(table.fallback)
+        for context in sorted(table.tables, key=self.get_symbol_value):
+            bit_io.write_varint(context_table, self.get_symbol_value(context))
+            context_table += self.generate_code_length_table(table.tables[context])
+        return context_table
+
+    def extract_context_table(self, file_buffer, offset: int) -> (huffman_context.ContextTable, int):
+        """
+        Reads the tables of a context block serialized by generate_context_table
+        :param file_buffer: bytes-like object of the file
+        :param offset: Byte offset of the tables in file_buffer
+        :return table: ContextTable of the block
+        :return offset: Byte offset directly after the tables
+        """
+        context_count, offset = bit_io.read_varint(file_buffer, offset)
+        fallback, offset = self.extract_code_length_table(file_buffer, offset)
+        tables = {}
+        for i in range(context_count):
+            value, offset = bit_io.read_varint(file_buffer, offset)
+            tables[self.get_symbol_from_value(value)], offset = self.extract_code_length_table(file_buffer, offset)
+        return huffman_context.ContextTable(fallback, tables), offset
+
+    def get_lz77_tools(self):
+        """
+        :return tools: HuffmanTools for the tables of LZ77 blocks, whose symbols are always integers whether the
+                       block holds text or binary data
+        """
+        tools = HuffmanTools()
+        tools.binary = True
+        tools.max_code_length = self.max_code_length
+        return tools
+
+    def get_lz77_data(self, text) -> bytes:
+        """
+        :param text: String of text of a block, or a bytes-like object of binary data
+        :return data: bytes LZ77 matches are found in - text is encoded as utf-8
+        """
+        if isinstance(text, str):
+            return text.encode(huffman_lz77.TEXT_ENCODING, huffman_lz77.TEXT_ERRORS)
+        return bytes(text)
+
+    def choose_lz77_table(self, tokens: tuple, block_bit_length: int) -> huffman_lz77.LZ77Table:
+        """
+        Builds the tables of an LZ77 block from its literals and matches, if that makes the block smaller
+        :param tokens: (literal_symbols, distance_symbols, extra_bits) of the block from huffman_lz77.tokenize
+        :param block_bit_length: Bits the block takes without LZ77, from get_block_bit_length
+        :return table: LZ77Table for the block, or None if it would not make the block smaller
+        """
+        literal_symbols, distance_symbols, extra_bits = tokens
+        lz77_tools = self.get_lz77_tools()
+        literal_frequency = collections.Counter(literal_symbols)
+        distance_frequency = collections.Counter(distance_symbols)
+        if self.max_code_length is not None and len(literal_frequency) > 1 << self.max_code_length:
+            return None
+        table = huffman_lz77.LZ77Table(lz77_tools.generate_code_lengths(literal_frequency),
+                                       lz77_tools.generate_code_lengths(distance_frequency))
+        token_count = bytearray()
+        bit_io.write_varint(token_count, len(literal_symbols))
+        bit_length = (lz77_tools.get_encoded_bit_length(literal_frequency, table.literal_lengths)
+                      + lz77_tools.get_encoded_bit_length(distance_frequency, table.distance_lengths)
+                      + sum(length for value, length in extra_bits)
+                      + 8 * (len(self.generate_lz77_table(table)) + len(token_count)))
+        if bit_length >= block_bit_length:
+            return None
+        return table
+
+    def pack_lz77_tokens(self, tokens: tuple, table: huffman_lz77.LZ77Table) -> bytearray:
+        """
+        Encodes the literals and matches of an LZ77 block - the number of tokens, the code of every literal/length
+        symbol, the code of every distance symbol, then the extra bits of every match, padded to a byte boundary
+        :param tokens: (literal_symbols, distance_symbols, extra_bits) of the block from huffman_lz77.tokenize
+        :param table: LZ77Table the tokens are encoded with
+        :return bytestream: bytearray of the packed codes
+        """
+        literal_symbols, distance_symbols, extra_bits = tokens
+        lz77_tools = self.get_lz77_tools()
+        body = bytearray()
+        bit_io.write_varint(body, len(literal_symbols))
+        writer = bit_io.BitWriter()
+        writer.write_symbols(literal_symbols, lz77_tools.get_cached_codes(table.literal_lengths))
+        if distance_symbols:
+            writer.write_symbols(distance_symbols, lz77_tools.get_cached_codes(table.distance_lengths))
+        # The extra bits are already (value, length) pairs, so each is its own code
+        writer.write_symbols(extra_bits, {bits: bits for bits in set(extra_bits)})
+        writer.pad()
+        body += writer.getvalue()
+        return body
+
+    def generate_lz77_table(self, table: huffman_lz77.LZ77Table) -> bytearray:
+        """
+        Serializes the tables of an LZ77 block - the literal/length table then the distance table
+        :param table: LZ77Table to serialize
+        :return lz77_table: bytearray of the serialized tables
+        """
+        lz77_tools = self.get_lz77_tools()
+        return lz77_tools.generate_code_length_table(table.literal_lengths) + lz77_tools.generate_code_length_table(table.distance_lengths)
+
+    def extract_lz77_table(self, file_buffer, offset: int) -> (huffman_lz77.LZ77Table, int):
+        """
+        Reads the tables of an LZ77 block serialized by generate_lz77_table
+        :param file_buffer: bytes-like object of the file
+        :param offset: Byte offset of the tables in file_buffer
+        :return table: LZ77Table of the block
+        :return offset: Byte offset directly after the tables
+        """
+        lz77_tools = self.get_lz77_tools()
+        literal_lengths, offset = lz77_tools.extract_code_length_table(file_buffer, offset)
+        distance_lengths, offset = lz77_tools.extract_code_length_table(file_buffer, offset)
+        return huffman_lz77.LZ77Table(literal_lengths, distance_lengths), offset
+
+    def generate_block_header(self, block_type: int, symbol_count: int, table, body_length: int) -> bytearray:
+        """
+        Generates the header of a block in a block format file - the block type, the number of symbols in the block,
+        the code length table for TABLE_BLOCKs, the dictionary's table id for DICTIONARY_BLOCKs or the tables of
+        each context for CONTEXT_BLOCKs or both tables of LZ77_BLOCKs, and the byte length of the block body
+        :param block_type: TABLE_BLOCK, REUSE_BLOCK, DICTIONARY_BLOCK, CONTEXT_BLOCK or LZ77_BLOCK
+        :param symbol_count: Number of symbols encoded in the block
+        :param table: Code lengths the block is encoded with, the table id of the dictionary for DICTIONARY_BLOCKs,
+                      a ContextTable for CONTEXT_BLOCKs or an LZ77Table for LZ77_BLOCKs
+        :param body_length: Number of bytes in the block body
+        :return header: bytearray of the block header
+        """
+        header = bytearray([block_type])
+        bit_io.write_varint(header, symbol_count)
+        if block_type == self.TABLE_BLOCK:
+            header += self.generate_code_length_table(table)
+        elif block_type == self.DICTIONARY_BLOCK:
+            header += table
+        elif block_type == self.CONTEXT_BLOCK:
+            header += self.generate_context_table(table)
+        elif block_type == self.LZ77_BLOCK:
+            header += self.generate_lz77_table(table)
+        bit_io.write_varint(header, body_length)
+        return header
+
+    def extract_block_header(self, file_buffer, offset: int) -> (int, int, dict, int):
+        """
+        Extract the header of a block in a block format file
+        :param file_buffer: bytes-like object of the file
+        :param offset: Byte offset of the block in file_buffer
+        :return block_type: END_BLOCK, INDEX_BLOCK, TABLE_BLOCK, REUSE_BLOCK, DICTIONARY_BLOCK, CONTEXT_BLOCK or
+                            LZ77_BLOCK
+        :return symbol_count: Number of symbols encoded in the block
+        :return table: Code lengths stored in a TABLE_BLOCK, the table id of a DICTIONARY_BLOCK, the ContextTable of a
+                       CONTEXT_BLOCK, the LZ77Table of an LZ77_BLOCK or None
+        :return body_offset: Byte offset of the block body in file_buffer - directly after the block type for end blocks
+        :return body_length: Number of bytes in the block body
+        """
+        if offset >= len(file_buffer):
+            raise ValueError("Unexpected end of compressed data")
+        block_type = file_buffer[offset]
+        if block_type in (self.END_BLOCK, self.INDEX_BLOCK):
+            return block_type, 0, None, offset + 1, 0
+        if block_type not in (self.TABLE_BLOCK, self.REUSE_BLOCK, self.DICTIONARY_BLOCK, self.CONTEXT_BLOCK, self.LZ77_BLOCK):
+            raise ValueError("Unknown block type " + str(block_type))
+        symbol_count, offset = bit_io.read_varint(file_buffer, offset + 1)
+        table = None
+        if block_type == self.TABLE_BLOCK:
+            table, offset = self.extract_code_length_table(file_buffer, offset)
+        elif block_type == self.DICTIONARY_BLOCK:
+            table = bytes(file_buffer[offset: offset + self.DICTIONARY_ID_LENGTH])
+            offset += self.DICTIONARY_ID_LENGTH
+        elif block_type == self.CONTEXT_BLOCK:
+            table, offset = self.extract_context_table(file_buffer, offset)
+        elif block_type == self.LZ77_BLOCK:
+            table, offset = self.extract_lz77_table(file_buffer, offset)
+        body_length, offset = bit_io.read_varint(file_buffer, offset)
+        if offset + body_length > len(file_buffer):
+            raise ValueError("Unexpected end of compressed data")
+        return block_type, symbol_count, table, offset, body_length
+
+    def generate_block_index(self, index_entries: list, index_offset: int) -> bytearray:
+        """
+        Generates the index written after the last block of a block format file, which starts with an INDEX_BLOCK in
+        place of the END_BLOCK. Each block has an entry of its symbol count, its byte length and how many blocks
+        back its code length table is stored. The trailer holds the offset of the INDEX_BLOCK from the start of the
+        file and INDEX_MARKER, so the index can be found from the end of the file
+        :param index_entries: List of (symbol_count, block_length, table_distance) of each block in order
+        :param index_offset: Byte offset of the INDEX_BLOCK from the start of the block format file
+        :return index: bytearray of the INDEX_BLOCK, index and trailer
+        """
+        index = bytearray([self.INDEX_BLOCK])
+        bit_io.write_varint(index, len(index_entries))
+        for entry in index_entries:
+            for value in entry:
+                bit_io.write_varint(index, value)
+        index += index_offset.to_bytes(self.trailer_info['index_offset'], 'big')
+        index += self.INDEX_MARKER
+        return index
+
+    def extract_block_index(self, file_buffer, offset: int) -> (list, int):
+        """
+        Extract the index of a block format file
+        :param file_buffer: bytes-like object of the file
+        :param offset: Byte offset directly after the INDEX_BLOCK in file_buffer
+        :return index_entries: List of (symbol_count, block_length, table_distance) of each block in order
+        :return end: Byte offset directly after the trailer
+        """
+        entry_count, offset = bit_io.read_varint(file_buffer, offset)
+        index_entries = []
+        for i in range(entry_count):
+            symbol_count, offset = bit_io.read_varint(file_buffer, offset)
+            block_length, offset = bit_io.read_varint(file_buffer, offset)
+            table_distance, offset = bit_io.read_varint(file_buffer, offset)
+            index_entries.append((symbol_count, block_length, table_distance))
+        end = offset + sum(self.trailer_info.values())
+        if end > len(file_buffer) or bytes(file_buffer[end - self.trailer_info['marker']: end]) != self.INDEX_MARKER:
+            raise ValueError("Block index is corrupt")
+        return index_entries, end
+
+    def get_symbol_value(self, symbol) -> int:
+        """
+        :param symbol: Character or byte value being stored in a header
+        :return int: Integer value the symbol is stored and ordered by
+        """
+        return symbol if isinstance(symbol, int) else ord(symbol)
+
+    def get_symbol_from_value(self, value: int):
+        """
+        :param value: Integer value of a symbol stored in a header
+        :return symbol: Character represented by the value, or the byte value itself for binary data
+        """
+        return value if self.binary else chr(value)
+
+    def get_canonical_order(self, code_lengths: dict) -> list:
+        """
+        :param code_lengths: Dictionary of key symbol and item of code length
+        :return symbols: List of symbols sorted by code length and then symbol value - the order canonical codes are assigned in
+        """
+        return sorted(code_lengths, key=lambda symbol: (code_lengths[symbol], self.get_symbol_value(symbol)))
+
+    def generate_canonical_codes(self, code_lengths: dict) -> dict:
+        """
+        Generates canonical huffman codes from the code length of each symbol. Symbols are assigned consecutive codes
+        in canonical order, so the codes can be rebuilt from the lengths alone without any tree
+        :param code_lengths: Dictionary of key symbol and item of code length i.e {'a': 3}
+        :return codes: Dictionary of symbol to (code, length) pairs
+        """
+        codes = {}
+        code = previous_length = 0
+        for symbol in self.get_canonical_order(code_lengths):
+            length = code_lengths[symbol]
+            code <<= length - previous_length
+            codes[symbol] = (code, length)
+            code += 1
+            previous_length = length
+        return codes
+
+    def get_table_fingerprint(self, code_lengths: dict) -> bytes:
+        """
+        :param code_lengths: Dictionary of key symbol and item of code length
+        :return fingerprint: Hash of the serialized code length table and the flags, which decide the type of the symbols
+        """
+        return huffman_cache.TableCache.fingerprint(bytes([self.get_flags()]) + self.generate_code_length_table(code_lengths))
+
+    def get_cached_codes(self, code_lengths: dict) -> dict:
+        """
+        Get the canonical codes for code lengths from the process wide cache, generating them if they are not cached.
+        The codes are shared, so must not be changed
+        :param code_lengths: Dictionary of key symbol and item of code length
+        :return codes: Dictionary of symbol to (code, length) pairs
+        """
+        return huffman_cache.cache.get(('codes', self.get_table_fingerprint(code_lengths)),
+                                       lambda: self.generate_canonical_codes(code_lengths))
+
+    def get_cached_decoder(self, code_lengths: dict) -> huffman_decoder.HuffmanDecoder:
+        """
+        Get the decoder for code lengths from the process wide cache, building it if it is not cached
+        :param code_lengths: Dictionary of key symbol and item of code length
+        :return decoder: HuffmanDecoder for the canonical codes of the code lengths
+        """
+        return huffman_cache.cache.get(('decoder', self.get_table_fingerprint(code_lengths)),
+                                       lambda: huffman_decoder.HuffmanDecoder(self.get_cached_codes(code_lengths)))
+
+    def get_cached_context_decoder(self, table: huffman_context.ContextTable) -> huffman_decoder.ContextDecoder:
+        """
+        Get the decoder for the tables of a context block, with the decoder of each table from the process wide cache
+        :param table: ContextTable of the block
+        :return decoder: ContextDecoder for the tables
+        """
+        return huffman_decoder.ContextDecoder(self.get_cached_decoder(table.fallback),
+                                              {context: self.get_cached_decoder(code_lengths)
+                                               for context, code_lengths in table.tables.items()})
+
+    def get_cached_lz77_decoder(self, table: huffman_lz77.LZ77Table) -> huffman_lz77.LZ77Decoder:
+        """
+        Get the decoder for the tables of an LZ77 block, with the decoder of each table from the process wide cache
+        :param table: LZ77Table of the block
+        :return decoder: LZ77Decoder for the tables
+        """
+        lz77_tools = self.get_lz77_tools()
+        distance_decoder = lz77_tools.get_cached_decoder(table.distance_lengths) if table.distance_lengths else None
+        return huffman_lz77.LZ77Decoder(lz77_tools.get_cached_decoder(table.literal_lengths), distance_decoder)
+
+    def get_table_decoder(self, code_lengths) -> huffman_decoder.HuffmanDecoder:
+        """
+        :param code_lengths: Code lengths a block is encoded with, the ContextTable of a context block or the
+                             LZ77Table of an LZ77 block
+        :return decoder: HuffmanDecoder, ContextDecoder for a context block or LZ77Decoder for an LZ77 block, from
+                         the process wide cache
+        """
+        if isinstance(code_lengths, huffman_context.ContextTable):
+            return self.get_cached_context_decoder(code_lengths)
+        if isinstance(code_lengths, huffman_lz77.LZ77Table):
+            return self.get_cached_lz77_decoder(code_lengths)
+        return self.get_cached_decoder(code_lengths)
+
+    def get_cached_tree_decoder(self, postorder_tree_list: list) -> huffman_decoder.HuffmanDecoder:
+        """
+        Get the decoder for a huffman tree stored in the header of an original format file from the process wide
+        cache, only building the tree if it is not cached
+        :param postorder_tree_list: list of nodes of the huffman tree in postorder format, from the file header
+        :return decoder: HuffmanDecoder for the codes represented by the tree
+        """
+        # The tree in the string format of tree.get_tree_postorder
+        postorder = "".join('0' if node is None else '1' + node for node in postorder_tree_list)
+        return huffman_cache.cache.get(('tree', huffman_cache.TableCache.fingerprint(postorder.encode())),
+                                       lambda: huffman_decoder.HuffmanDecoder.from_tree(tree.construct_tree_from_postorder(postorder_tree_list)))
+
+    def generate_code_length_table(self, code_lengths: dict) -> bytearray:
+        """
+        Serializes code lengths for a file header as packed bits - the longest code length, the number of symbols with
+        each length, then the value of each symbol in canonical order. Counts and symbols are written with just enough
+        bits for the largest of them, i.e 7 bits per symbol for 7bit ascii
+        :param code_lengths: Dictionary of key symbol and item of code length
+        :return table: bytearray of the serialized code lengths, padded to a whole number of bytes
+        """
+        max_length = max(code_lengths.values(), default=0)
+        if max_length >= 1 << self.table_info['max_length']:
+            raise ValueError("Code lengths are too long to be stored in the file header")
+        length_counts = collections.Counter(code_lengths.values())
+        # Canonical order, with the value of each symbol found once rather than for every comparison
+        symbol_values = [value for length, value in sorted((length, symbol if isinstance(symbol, int) else ord(symbol))
+                                                          for symbol, length in code_lengths.items())]
+        count_width = max(length_counts.values(), default=0).bit_length()
+        symbol_width = max(symbol_values, default=0).bit_length()
+
+        writer = bit_io.BitWriter()
+        writer.write(max_length, self.table_info['max_length'])
+        writer.write(count_width, self.table_info['width'])
+        for length in range(1, max_length + 1):
+            writer.write(length_counts[length], count_width)
+        writer.write(symbol_width, self.table_info['width'])
+        for value in symbol_values:
+            writer.write(value, symbol_width)
+        writer.pad()
+        return writer.getvalue()
+
+    def extract_code_length_table(self, file_buffer, offset: int) -> (dict, int):
+        """
+        Reads code lengths serialized by generate_code_length_table
+        :param file_buffer: bytes-like object of the file
+        :param offset: Byte offset of the table in file_buffer
+        :return code_lengths: Dictionary of key symbol and item of code length
+        :return offset: Byte offset directly after the table
+        """
+        reader = bit_io.BitReader(file_buffer, offset * 8)
+        max_length = reader.read(self.table_info['max_length'])
+        count_width = reader.read(self.table_info['width'])
+        length_counts = [reader.read(count_width) for length in range(max_length)]
+        symbol_width = reader.read(self.table_info['width'])
+
+        code_lengths = {}
+        for length, count in enumerate(length_counts, start=1):
+            for i in range(count):
+                code_lengths[self.get_symbol_from_value(reader.read(symbol_width))] = length
+        return code_lengths, reader.byte_offset
+
+    def generate_canonical_file_header(self, text_length: int, code_lengths: dict, flags=0) -> bytearray:
+        """
+        Generates the header of a canonical (version 1) file - the version marker, format version, flags, length of
+        the text and the code length table
+        :param text_length: Number of symbols in the body of the file
+        :param code_lengths: Dictionary of key symbol and item of code length
+        :param flags: Integer of bit flags describing the body
+        :return header: bytearray of the header
+        """
+        header = bytearray(self.VERSION_MARKER)
+        header.append(self.CANONICAL_VERSION)
+        header.append(flags)
+        bit_io.write_varint(header, text_length)
+        header += self.generate_code_length_table(code_lengths)
+        return header
+
+    def get_file_version(self, file_buffer) -> int:
+        """
+        :param file_buffer: bytes-like object of the file
+        :return version: Format version of the file - LEGACY_VERSION for files without a version marker
+        """
+        if bytes(file_buffer[:len(self.VERSION_MARKER)]) != self.VERSION_MARKER:
+            return self.LEGACY_VERSION
+        if len(file_buffer) <= len(self.VERSION_MARKER):
+            raise ValueError("Unexpected end of compressed data")
+        version = file_buffer[len(self.VERSION_MARKER)]
+        if version not in self.FORMAT_VERSIONS:
+            raise ValueError("Unsupported file format version " + str(version))
+        return version
+
+    def extract_canonical_file_header(self, file_buffer) -> (int, dict, int, int):
+        """
+        Extract the header information from a canonical (version 1) file
+        :param file_buffer: bytes-like object of the full file
+        :return text_length: Number of symbols in the body of the file
+        :return code_lengths: Dictionary of key symbol and item of code length
+        :return flags: Integer of bit flags describing the body
+        :return body_offset: Byte offset of the body in file_buffer
+        """
+        offset = len(self.VERSION_MARKER) + 1
+        if len(file_buffer) <= offset:
+            raise ValueError("Unexpected end of compressed data")
+        flags = file_buffer[offset]
+        self.set_flags(flags)
+        text_length, offset = bit_io.read_varint(file_buffer, offset + 1)
+        code_lengths, offset = self.extract_code_length_table(file_buffer, offset)
+        return text_length, code_lengths, flags, offset
@@ -0,0 +1,52 @@
+class ContextTable:
+    """
+    Code length tables of an order-1 context block, where the code of each symbol depends on the symbol before it -
+    its context. Common contexts each have a table of their own, while rare contexts are clustered together with the
+    first symbol of the block into one fallback table
+    """
+
+    def __init__(self, fallback: dict, tables: dict):
+        """
+        :param fallback: Code lengths of the symbols of every context without a table of its own
+        :param tables: Dictionary of key context symbol and item of the code lengths used after it
+        """
+        self.fallback = fallback
+        self.tables = tables
+
+    def __str__(self):
+        return "<%s contexts=%d>" % ("ContextTable", len(self.tables))
+
+    def get_tables(self) -> list:
+        """
+        :return tables: List of every code length table, the fallback table first
+        """
+        return [self.fallback] + list(self.tables.values())
+
+    def get_symbols(self) -> set:
+        """
+        :return symbols: Every symbol that has a code in any of the tables
+        """
+        symbols = set(self.fallback)
+        for code_lengths in self.tables.values():
+            symbols.update(code_lengths)
+        return symbols
+
+
+class ContextCodes(dict):
+    """
+    Codes of every (context, symbol) pair of a context block, for writing each symbol with the code of the symbol
+    before it. Only contexts with a table of their own have entries - every other context shares the fallback codes,
+    which are looked up when a pair is missing rather than being copied for each context
+    """
+
+    def __init__(self, fallback_codes: dict, context_codes: dict):
+        """
+        :param fallback_codes: Dictionary of symbol to (code, length) pairs of the fallback table
+        :param context_codes: Dictionary of key context symbol and item of the codes used after it
+        """
+        super().__init__(((context, symbol), code) for context, codes in context_codes.items()
+                         for symbol, code in codes.items())
+        self.fallback_codes = fallback_codes
+
+    def __missing__(self, pair):
+        return self.fallback_codes[pair[1]]
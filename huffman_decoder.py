@@ -0,0 +1,248 @@
+import tree
+
+
+class HuffmanDecoder:
+    """
+    Table driven decoder for Huffman compressed data. Lookup tables are precomputed from the compression codes
+    so that each step resolves up to PRIMARY_BITS bits of the packed bytes at once, rather than walking the
+    huffman tree one bit at a time. Codes longer than PRIMARY_BITS are resolved through a secondary table
+    belonging to their first PRIMARY_BITS bits. When no code is longer than SINGLE_TABLE_BITS, i.e for length limited
+    codes, a single table covers every code.
+    """
+
+    PRIMARY_BITS = 10
+    SINGLE_TABLE_BITS = 12
+
+    def __init__(self, codes: dict):
+        """
+        :param codes: Dictionary of symbol to (code, length) pairs where code is the integer value of the code's
+                      bits, i.e {'a': (0b010, 3)}
+        """
+        if not codes:
+            raise ValueError("Unable to build a decoder without any compression codes")
+        self.codes = codes
+        self.max_length = max(length for code, length in codes.values())
+        self.primary_bits = self.max_length if self.max_length <= self.SINGLE_TABLE_BITS else self.PRIMARY_BITS
+
+        table_size = 1 << self.primary_bits
+        self.symbols = [None] * table_size
+        self.lengths = [0] * table_size
+        self.subtables = [None] * table_size
+
+        long_codes = {}
+        for symbol, (code, length) in codes.items():
+            if length <= self.primary_bits:
+                # Every index starting with this code decodes to the symbol
+                spread = 1 << (self.primary_bits - length)
+                start = code << (self.primary_bits - length)
+                self.symbols[start: start + spread] = [symbol] * spread
+                self.lengths[start: start + spread] = [length] * spread
+            else:
+                prefix = code >> (length - self.primary_bits)
+                long_codes.setdefault(prefix, []).append((symbol, code, length))
+
+        for prefix, entries in long_codes.items():
+            width = max(length for symbol, code, length in entries) - self.primary_bits
+            sub_symbols = [None] * (1 << width)
+            sub_lengths = [0] * (1 << width)
+            for symbol, code, length in entries:
+                extra_bits = length - self.primary_bits
+                spread = 1 << (width - extra_bits)
+                start = (code & ((1 << extra_bits) - 1)) << (width - extra_bits)
+                sub_symbols[start: start + spread] = [symbol] * spread
+                sub_lengths[start: start + spread] = [length] * spread
+            self.subtables[prefix] = (width, sub_symbols, sub_lengths)
+
+    @classmethod
+    def from_tree(cls, huffman_tree: tree.Tree) -> object:
+        """
+        Build a decoder from a huffman tree, as stored in the header of a file
+        :param huffman_tree: Root tree object of the huffman tree
+        :return decoder: HuffmanDecoder for the codes represented by the tree
+        """
+        codes = {}
+        stack = [(huffman_tree, 0, 0)]
+        while stack:
+            node, code, length = stack.pop()
+            if node.left is None and node.right is None:
+                codes[node.symbol] = (code, length)
+                continue
+            if node.right is not None:
+                stack.append((node.right, (code << 1) | 1, length + 1))
+            if node.left is not None:
+                stack.append((node.left, code << 1, length + 1))
+        return cls(codes)
+
+    def decode(self, data, count: int, bit_offset=0, previous=None) -> (list, int):
+        """
+        Decode a number of symbols from packed bytes
+        :param data: bytes-like object containing the compressed bits, most significant bit first
+        :param count: Number of symbols to decode
+        :param bit_offset: Bit position in data to start decoding from
+        :param previous: Symbol before the first one decoded - not needed here, but taken so this decoder is used the
+                         same way as a ContextDecoder
+        :return symbols: List of decoded symbols
+        :return bit_offset: Bit position in data directly after the last decoded symbol
+        """
+        primary_bits = self.primary_bits
+        primary_mask = (1 << primary_bits) - 1
+        max_length = self.max_length
+        symbols, lengths, subtables = self.symbols, self.lengths, self.subtables
+
+        position = bit_offset >> 3
+        accumulator = available = 0
+        if bit_offset & 7:
+            available = 8 - (bit_offset & 7)
+            accumulator = data[position] & ((1 << available) - 1)
+            position += 1
+
+        output = []
+        append = output.append
+        for _ in range(count):
+            if available < max_length:
+                # Refill the accumulator 8 bytes at a time, reading zeros past the end of the data
+                chunk = data[position: position + 8]
+                accumulator = (((accumulator & ((1 << available) - 1)) << 64)
+                               | (int.from_bytes(chunk, 'big') << (64 - 8 * len(chunk))))
+                available += 64
+                position += 8
+
+            index = (accumulator >> (available - primary_bits)) & primary_mask
+            length = lengths[index]
+            if length:
+                append(symbols[index])
+            else:
+                subtable = subtables[index]
+                if subtable is None:
+                    raise ValueError("Invalid code found in compressed data")
+                width, sub_symbols, sub_lengths = subtable
+                index = (accumulator >> (available - primary_bits - width)) & ((1 << width) - 1)
+                length = sub_lengths[index]
+                if not length:
+                    raise ValueError("Invalid code found in compressed data")
+                append(sub_symbols[index])
+            available -= length
+
+        bit_offset = position * 8 - available
+        if bit_offset > len(data) * 8:
+            raise ValueError("Compressed data ended before all symbols were decoded")
+        return output, bit_offset
+
+    def decode_text(self, data, count: int, bit_offset=0) -> str:
+        """
+        Decode a number of characters from packed bytes into a string
+        :param data: bytes-like object containing the compressed bits
+        :param count: Number of characters to decode
+        :param bit_offset: Bit position in data to start decoding from
+        :return text: Decoded text
+        """
+        return "".join(self.decode(data, count, bit_offset)[0])
+
+    def decode_bytes(self, data, count: int, bit_offset=0) -> bytes:
+        """
+        Decode a number of byte values from packed bytes
+        :param data: bytes-like object containing the compressed bits
+        :param count: Number of bytes to decode
+        :param bit_offset: Bit position in data to start decoding from
+        :return data: Decoded bytes
+        """
+        return bytes(self.decode(data, count, bit_offset)[0])
+
+
+class ContextDecoder:
+    """
+    Table driven decoder for order-1 context blocks, where the code of each symbol depends on the symbol before it.
+    Each context has the lookup tables of its own HuffmanDecoder, and decoding switches tables one symbol at a time
+    """
+
+    def __init__(self, fallback: HuffmanDecoder, decoders: dict):
+        """
+        :param fallback: HuffmanDecoder for the first symbol and every context without a decoder of its own
+        :param decoders: Dictionary of key context symbol and item of the HuffmanDecoder used after it
+        """
+        self.fallback = fallback
+        self.decoders = decoders
+        self.max_length = max(decoder.max_length for decoder in [fallback, *decoders.values()])
+        self.fallback_tables = self.get_tables(fallback)
+        self.context_tables = {context: self.get_tables(decoder) for context, decoder in decoders.items()}
+
+    def get_tables(self, decoder: HuffmanDecoder) -> tuple:
+        """
+        :param decoder: HuffmanDecoder of a context
+        :return tables: The decoder's primary bits and lookup tables, unpacked once per symbol while decoding
+        """
+        return decoder.primary_bits, decoder.symbols, decoder.lengths, decoder.subtables
+
+    def decode(self, data, count: int, bit_offset=0, previous=None) -> (list, int):
+        """
+        Decode a number of symbols from packed bytes
+        :param data: bytes-like object containing the compressed bits, most significant bit first
+        :param count: Number of symbols to decode
+        :param bit_offset: Bit position in data to start decoding from
+        :param previous: Symbol before the first one decoded, None at the start of a block
+        :return symbols: List of decoded symbols
+        :return bit_offset: Bit position in data directly after the last decoded symbol
+        """
+        max_length = self.max_length
+        context_tables, fallback_tables = self.context_tables, self.fallback_tables
+
+        position = bit_offset >> 3
+        accumulator = available = 0
+        if bit_offset & 7:
+            available = 8 - (bit_offset & 7)
+            accumulator = data[position] & ((1 << available) - 1)
+            position += 1
+
+        output = []
+        append = output.append
+        for _ in range(count):
+            if available < max_length:
+                # Refill the accumulator 8 bytes at a time, reading zeros past the end of the data
+                chunk = data[position: position + 8]
+                accumulator = (((accumulator & ((1 << available) - 1)) << 64)
+                               | (int.from_bytes(chunk, 'big') << (64 - 8 * len(chunk))))
+                available += 64
+                position += 8
+
+            primary_bits, symbols, lengths, subtables = context_tables.get(previous, fallback_tables)
+            index = (accumulator >> (available - primary_bits)) & ((1 << primary_bits) - 1)
+            length = lengths[index]
+            if length:
+                previous = symbols[index]
+            else:
+                subtable = subtables[index]
+                if subtable is None:
+                    raise ValueError("Invalid code found in compressed data")
+                width, sub_symbols, sub_lengths = subtable
+                index = (accumulator >> (available - primary_bits - width)) & ((1 << width) - 1)
+                length = sub_lengths[index]
+                if not length:
+                    raise ValueError("Invalid code found in compressed data")
+                previous = sub_symbols[index]
+            append(previous)
+            available -= length
+
+        bit_offset = position * 8 - available
+        if bit_offset > len(data) * 8:
+            raise ValueError("Compressed data ended before all symbols were decoded")
+        return output, bit_offset
+
+    def decode_text(self, data, count: int, bit_offset=0) -> str:
+        """
+        Decode a number of characters from packed bytes into a string
+        :param data: bytes-like object containing the compressed bits
+        :param count: Number of characters to decode
+        :param bit_offset: Bit position in data to start decoding from
+        :return text: Decoded text
+        """
+        return "".join(self.decode(data, count, bit_offset)[0])
+
+    def decode_bytes(self, data, count: int, bit_offset=0) -> bytes:
+        """
+        Decode a number of byte values from packed bytes
+        :param data: bytes-like object containing the compressed bits
+        :param count: Number of bytes to decode
+        :param bit_offset: Bit position in data to start decoding from
+        :return data: Decoded bytes
+        """
+        return bytes(self.decode(data, count, bit_offset)[0])
@@ -0,0 +1,157 @@
+import huffman_compression_tools
+import huffman_decoder
+import collections
+import hashlib
+import os
+import threading
+import _io
+
+
+class HuffmanDictionary(huffman_compression_tools.HuffmanTools):
+    """
+    Code length table trained once from a sample corpus and shared between many compressed files. Files compressed
+    with a dictionary store its table id in place of a table, which for short records is often larger than the
+    compressed text itself. The canonical codes and the decoder are only built once per dictionary
+    """
+
+    DICTIONARY_MARKER = b'HDCT'
+    FILE_EXTENSION = '.hdict'
+
+    def __init__(self, code_lengths: dict, binary=False):
+        """
+        :param code_lengths: Dictionary of key symbol and item of code length
+        :param binary: True if the symbols are byte values rather than characters
+        """
+        super().__init__()
+        if len(code_lengths) == 0:
+            raise ValueError("Unable to build a dictionary without any symbols")
+        self.binary = binary
+        self.code_lengths = code_lengths
+        self.codes = self.generate_canonical_codes(code_lengths)
+        self.table = bytes([self.get_flags()]) + bytes(self.generate_code_length_table(code_lengths))
+        self.table_id = hashlib.blake2b(self.table, digest_size=self.DICTIONARY_ID_LENGTH).digest()
+        self.decoder: huffman_decoder.HuffmanDecoder = None
+
+    def __str__(self):
+        return "<%s id=\'%s\' symbols=%d>" % ("HuffmanDictionary", self.table_id.hex(), len(self.code_lengths))
+
+    @classmethod
+    def train(cls, samples, alphabet=(), max_code_length=None) -> object:
+        """
+        Build a dictionary from the combined symbol frequencies of a sample corpus
+        :param samples: Iterable of strings of text, or of bytes-like objects to train a dictionary for binary data
+        :param alphabet: Extra symbols given a code even if they do not appear in the samples, i.e every byte value,
+                         so that files containing them can still use the dictionary
+        :param max_code_length: Longest code length of the dictionary, None for no limit
+        :return dictionary: HuffmanDictionary trained from the samples
+        """
+        tools = huffman_compression_tools.HuffmanTools()
+        tools.max_code_length = max_code_length
+        frequency = collections.Counter()
+        binary = None
+        for sample in samples:
+            if binary is None:
+                binary = not isinstance(sample, str)
+            frequency.update(tools.generate_frequency_table(sample))
+        for symbol in alphabet:
+            if binary is None:
+                binary = isinstance(symbol, int)
+            frequency[symbol] += 0
+        # Symbols that only come from the alphabet still need a frequency for a code to be made
+        frequency = {symbol: count or 1 for symbol, count in frequency.items()}
+        return cls(tools.generate_code_lengths(frequency), bool(binary))
+
+    def get_decoder(self) -> huffman_decoder.HuffmanDecoder:
+        """
+        :return decoder: HuffmanDecoder for the dictionary, built the first time it is needed
+        """
+        if self.decoder is None:
+            self.decoder = huffman_decoder.HuffmanDecoder(self.codes)
+        return self.decoder
+
+    def save(self, file_object: _io.BufferedWriter) -> None:
+        """
+        Write the dictionary to a binary file object
+        :param file_object: Binary file object opened for writing
+        """
+        file_object.write(self.DICTIONARY_MARKER + self.table)
+
+    @classmethod
+    def load(cls, file_object: _io.BufferedReader) -> object:
+        """
+        Read a dictionary written by save()
+        :param file_object: Binary file object opened for reading
+        :return dictionary: HuffmanDictionary read from the file
+        """
+        data = file_object.read()
+        if data[:len(cls.DICTIONARY_MARKER)] != cls.DICTIONARY_MARKER or len(data) <= len(cls.DICTIONARY_MARKER):
+            raise ValueError("File is not a huffman dictionary")
+        tools = huffman_compression_tools.HuffmanTools()
+        tools.set_flags(data[len(cls.DICTIONARY_MARKER)])
+        code_lengths, offset = tools.extract_code_length_table(data, len(cls.DICTIONARY_MARKER) + 1)
+        return cls(code_lengths, tools.binary)
+
+
+class DictionaryRegistry:
+    """
+    Thread safe registry of dictionaries by table id. Dictionaries are registered directly or loaded on demand
+    from directories of saved dictionaries, named by their table id, and kept so each is only loaded once
+    """
+
+    def __init__(self):
+        self.dictionaries = {}
+        self.directories = []
+        self.lock = threading.Lock()
+
+    def register(self, dictionary: HuffmanDictionary) -> bytes:
+        """
+        :param dictionary: HuffmanDictionary to make available for decompression
+        :return table_id: Table id of the dictionary
+        """
+        with self.lock:
+            self.dictionaries.setdefault(dictionary.table_id, dictionary)
+        return dictionary.table_id
+
+    def add_directory(self, directory: str) -> None:
+        """
+        Add a directory that dictionaries are loaded from when they are not registered
+        :param directory: Path to a directory of dictionaries written by save_dictionary()
+        """
+        with self.lock:
+            self.directories.append(directory)
+
+    def save_dictionary(self, dictionary: HuffmanDictionary, directory: str) -> str:
+        """
+        Save a dictionary to a directory under the name add_directory() will look for, and register it
+        :param dictionary: HuffmanDictionary to save
+        :param directory: Path to the directory to save the dictionary to
+        :return path: Path the dictionary was saved to
+        """
+        path = os.path.join(directory, dictionary.table_id.hex() + HuffmanDictionary.FILE_EXTENSION)
+        with open(path, 'wb') as file_object:
+            dictionary.save(file_object)
+        self.register(dictionary)
+        return path
+
+    def get(self, table_id: bytes) -> HuffmanDictionary:
+        """
+        :param table_id: Table id stored in a compressed file
+        :return dictionary: The registered HuffmanDictionary with the table id
+        """
+        with self.lock:
+            if table_id in self.dictionaries:
+                return self.dictionaries[table_id]
+            for directory in self.directories:
+                path = os.path.join(directory, table_id.hex() + HuffmanDictionary.FILE_EXTENSION)
+                if os.path.exists(path):
+                    with open(path, 'rb') as file_object:
+                        dictionary = HuffmanDictionary.load(file_object)
+                    if dictionary.table_id != table_id:
+                        raise ValueError("Dictionary " + path + " does not match its table id")
+                    self.dictionaries[table_id] = dictionary
+                    return dictionary
+        raise ValueError("Unknown dictionary " + table_id.hex() + " - register it or add its directory to the registry")
+
+
+# Registry used by files unless they are given their own
+registry = DictionaryRegistry()
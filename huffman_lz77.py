@@ -0,0 +1,248 @@
+import huffman_decoder
+import bit_io
+import bisect
+
+
+# Shortest and longest match, and the furthest back a match can start, the same as DEFLATE
+MIN_MATCH = 3
+MAX_MATCH = 258
+WINDOW_SIZE = 1 << 15
+# Literals are symbols 0-255 of the literal/length alphabet and match lengths start at 257, as in DEFLATE
+LENGTH_SYMBOL_OFFSET = 257
+# Smallest length of each length symbol and the number of extra bits after it
+LENGTH_BASES = [3, 4, 5, 6, 7, 8, 9, 10, 11, 13, 15, 17, 19, 23, 27, 31, 35, 43, 51, 59, 67, 83, 99, 115, 131, 163,
+                195, 227, 258]
+LENGTH_EXTRA_BITS = [0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 2, 2, 2, 2, 3, 3, 3, 3, 4, 4, 4, 4, 5, 5, 5, 5, 0]
+# Smallest distance of each distance symbol and the number of extra bits after it
+DISTANCE_BASES = [1, 2, 3, 4, 5, 7, 9, 13, 17, 25, 33, 49, 65, 97, 129, 193, 257, 385, 513, 769, 1025, 1537, 2049,
+                  3073, 4097, 6145, 8193, 12289, 16385, 24577]
+DISTANCE_EXTRA_BITS = [0, 0, 0, 0, 1, 1, 2, 2, 3, 3, 4, 4, 5, 5, 6, 6, 7, 7, 8, 8, 9, 9, 10, 10, 11, 11, 12, 12, 13, 13]
+# Number of candidates searched for each match, the match length that ends the search early and the match length
+# below which the next position is checked for a longer match (0 to never check), for each compression level - the
+# same as zlib
+COMPRESSION_LEVELS = {1: (4, 8, 0), 2: (8, 16, 0), 3: (32, 32, 0), 4: (16, 16, 4), 5: (32, 32, 16), 6: (128, 128, 16),
+                      7: (256, 128, 32), 8: (1024, 258, 128), 9: (4096, 258, 258)}
+DEFAULT_LEVEL = 6
+# Text is matched as utf-8 bytes - surrogates are let through so any string can be stored
+TEXT_ENCODING = 'utf-8'
+TEXT_ERRORS = 'surrogatepass'
+
+
+def get_length_symbol(length: int) -> (int, int, int):
+    """
+    :param length: Match length, from MIN_MATCH to MAX_MATCH
+    :return symbol: Literal/length symbol of the length
+    :return extra_value: Value of the extra bits
+    :return extra_bits: Number of extra bits
+    """
+    index = bisect.bisect_right(LENGTH_BASES, length) - 1
+    return LENGTH_SYMBOL_OFFSET + index, length - LENGTH_BASES[index], LENGTH_EXTRA_BITS[index]
+
+
+# Symbol and extra bits of every match length, as lengths are looked up for every match
+LENGTH_SYMBOLS = [None] * MIN_MATCH + [get_length_symbol(length) for length in range(MIN_MATCH, MAX_MATCH + 1)]
+
+
+def get_match_length(data: bytes, candidate: int, position: int, limit: int) -> int:
+    """
+    :param data: bytes being matched
+    :param candidate: Earlier position whose first MIN_MATCH bytes are the same as the bytes at position
+    :param position: Position being matched
+    :param limit: Longest match allowed
+    :return length: Number of bytes that are the same at both positions, at most limit
+    """
+    if data[candidate: candidate + limit] == data[position: position + limit]:
+        return limit
+    # Binary search on slices, which compare many bytes at once, rather than comparing a byte at a time
+    low, high = MIN_MATCH, limit
+    while high - low > 1:
+        middle = (low + high) // 2
+        if data[candidate + low: candidate + middle] == data[position + low: position + middle]:
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+def tokenize(data: bytes, level=DEFAULT_LEVEL) -> (list, list, list):
+    """
+    Finds repeated strings with hash chains over a sliding window, splitting data into literals and matches. Every
+    position is chained by its first MIN_MATCH bytes, and the chain is searched from the nearest position back
+    :param data: bytes to find matches in
+    :param level: Compression level from 1 - fastest to 9 - searches the most for the longest matches
+    :return literal_symbols: List of the literal/length symbol of each literal and match, in order
+    :return distance_symbols: List of the distance symbol of each match, in order
+    :return extra_bits: List of (value, number of bits) of the extra bits of each match's length then distance
+    """
+    if level not in COMPRESSION_LEVELS:
+        raise ValueError("Compression level must be from 1 to 9")
+    max_chain, nice_length, max_lazy = COMPRESSION_LEVELS[level]
+    size = len(data)
+    heads = {}
+    previous = [-1] * size
+    literal_symbols, distance_symbols, extra_bits = [], [], []
+
+    def insert(position):
+        key = data[position: position + MIN_MATCH]
+        previous[position] = heads.get(key, -1)
+        heads[key] = position
+
+    def find_match(position):
+        limit = min(MAX_MATCH, size - position)
+        best_length, best_distance = MIN_MATCH - 1, 0
+        candidate = heads.get(data[position: position + MIN_MATCH], -1)
+        chain = max_chain
+        while candidate >= 0 and position - candidate <= WINDOW_SIZE and chain > 0:
+            # A candidate can only be longer if it matches the byte after the best match so far
+            if best_length < limit and data[candidate + best_length] == data[position + best_length]:
+                length = get_match_length(data, candidate, position, limit)
+                if length > best_length:
+                    best_length, best_distance = length, position - candidate
+                    if length >= nice_length or length == limit:
+                        break
+            candidate = previous[candidate]
+            chain -= 1
+        return best_length, best_distance
+
+    position = 0
+    pending = None
+    last_match = size - MIN_MATCH
+    while position < size:
+        if position > last_match:
+            literal_symbols.append(data[position])
+            position += 1
+            continue
+        length, distance = pending if pending is not None else find_match(position)
+        pending = None
+        insert(position)
+        if length < MIN_MATCH:
+            literal_symbols.append(data[position])
+            position += 1
+            continue
+        if length < max_lazy and position + 1 <= last_match:
+            # Put the match off by a literal if the next position has a longer one
+            next_match = find_match(position + 1)
+            if next_match[0] > length:
+                literal_symbols.append(data[position])
+                position += 1
+                pending = next_match
+                continue
+
+        symbol, extra_value, extra_length = LENGTH_SYMBOLS[length]
+        literal_symbols.append(symbol)
+        index = bisect.bisect_right(DISTANCE_BASES, distance) - 1
+        distance_symbols.append(index)
+        extra_bits.append((extra_value, extra_length))
+        extra_bits.append((distance - DISTANCE_BASES[index], DISTANCE_EXTRA_BITS[index]))
+        # Faster levels only chain the start of each match
+        if max_lazy:
+            for matched in range(position + 1, min(position + length, last_match + 1)):
+                insert(matched)
+        position += length
+    return literal_symbols, distance_symbols, extra_bits
+
+
+class LZ77Table:
+    """
+    Code length tables of an LZ77 block - one for the literal/length symbols and one for the distance symbols
+    """
+
+    def __init__(self, literal_lengths: dict, distance_lengths: dict):
+        """
+        :param literal_lengths: Dictionary of key literal/length symbol and item of code length
+        :param distance_lengths: Dictionary of key distance symbol and item of code length - empty without matches
+        """
+        self.literal_lengths = literal_lengths
+        self.distance_lengths = distance_lengths
+
+    def __str__(self):
+        return "<%s symbols=%d distances=%d>" % ("LZ77Table", len(self.literal_lengths), len(self.distance_lengths))
+
+    def get_tables(self) -> list:
+        """
+        :return tables: List of both code length tables
+        """
+        return [self.literal_lengths, self.distance_lengths]
+
+    def get_symbols(self) -> set:
+        """
+        :return symbols: Every literal byte value that has a code
+        """
+        return {symbol for symbol in self.literal_lengths if symbol < LENGTH_SYMBOL_OFFSET}
+
+
+class LZ77Decoder:
+    """
+    Decoder for the body of an LZ77 block - the number of tokens, the codes of every literal/length symbol, the
+    codes of every distance symbol, then the extra bits of each match. Matches can reach back anywhere in the block,
+    so a block is always decoded whole
+    """
+
+    def __init__(self, literal_decoder: huffman_decoder.HuffmanDecoder, distance_decoder: huffman_decoder.HuffmanDecoder):
+        """
+        :param literal_decoder: HuffmanDecoder of the literal/length symbols
+        :param distance_decoder: HuffmanDecoder of the distance symbols, None if the block has no matches
+        """
+        self.literal_decoder = literal_decoder
+        self.distance_decoder = distance_decoder
+
+    def decode_data(self, data, bit_offset=0) -> bytearray:
+        """
+        :param data: bytes-like object of the block body
+        :param bit_offset: Bit position in data where the body starts - always on a byte boundary
+        :return data: Decoded bytes of the block
+        """
+        token_count, offset = bit_io.read_varint(data, bit_offset >> 3)
+        literal_symbols, bit_offset = self.literal_decoder.decode(data, token_count, offset * 8)
+        match_count = sum(1 for symbol in literal_symbols if symbol >= LENGTH_SYMBOL_OFFSET)
+        distance_symbols = []
+        if match_count:
+            if self.distance_decoder is None:
+                raise ValueError("Invalid code found in compressed data")
+            distance_symbols, bit_offset = self.distance_decoder.decode(data, match_count, bit_offset)
+        reader = bit_io.BitReader(data, bit_offset)
+
+        output = bytearray()
+        literals = bytearray()
+        distances = iter(distance_symbols)
+        for symbol in literal_symbols:
+            if symbol < LENGTH_SYMBOL_OFFSET:
+                literals.append(symbol)
+                continue
+            if literals:
+                output += literals
+                literals = bytearray()
+            index = symbol - LENGTH_SYMBOL_OFFSET
+            if index >= len(LENGTH_BASES):
+                raise ValueError("Invalid code found in compressed data")
+            length = LENGTH_BASES[index] + (reader.read(LENGTH_EXTRA_BITS[index]) if LENGTH_EXTRA_BITS[index] else 0)
+            index = next(distances)
+            distance = DISTANCE_BASES[index] + (reader.read(DISTANCE_EXTRA_BITS[index]) if DISTANCE_EXTRA_BITS[index] else 0)
+            if distance > len(output):
+                raise ValueError("Match reaches back before the start of the block")
+            start = len(output) - distance
+            if distance >= length:
+                output += output[start: start + length]
+            else:
+                # The match overlaps the bytes it produces, so the repeating part is copied as many times as needed
+                output += (output[start:] * (length // distance + 1))[:length]
+        output += literals
+        return output
+
+    def decode_text(self, data, count: int, bit_offset=0) -> str:
+        """
+        :param data: bytes-like object of the block body
+        :param count: Number of characters wanted - the block is still decoded whole
+        :param bit_offset: Bit position in data where the body starts
+        :return text: First count characters of the block
+        """
+        return self.decode_data(data, bit_offset).decode(TEXT_ENCODING, TEXT_ERRORS)[:count]
+
+    def decode_bytes(self, data, count: int, bit_offset=0) -> bytes:
+        """
+        :param data: bytes-like object of the block body
+        :param count: Number of bytes wanted - the block is still decoded whole
+        :param bit_offset: Bit position in data where the body starts
+        :return data: First count bytes of the block
+        """
+        return bytes(self.decode_data(data, bit_offset)[:count])
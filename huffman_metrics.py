@@ -0,0 +1,187 @@
+import huffman_context
+import huffman_lz77
+import contextlib
+import math
+import time
+import tracemalloc
+
+
+# Used in place of a stage timer when metrics are disabled, so timing a stage costs next to nothing
+NULL_STAGE = contextlib.nullcontext()
+
+
+class StageTimer:
+    """
+    Context manager adding the wall time of a stage to a CompressionMetrics object
+    """
+
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name: str):
+        self.metrics = metrics
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        stage_seconds = self.metrics.stage_seconds
+        stage_seconds[self.name] = stage_seconds.get(self.name, 0.0) + time.perf_counter() - self.start
+
+
+class CompressionMetrics:
+    """
+    Metrics of one compress or decompress call of a HuffmanFile, given to its metrics callback when the call
+    finishes. Time spent in worker processes is counted in the stage that waits for them, and peak memory only
+    counts this process
+    """
+
+    def __init__(self, operation: str, file_path=None, track_memory=False):
+        """
+        :param operation: Name of the call being measured, i.e compress or decompress
+        :param file_path: Path of the compressed file
+        :param track_memory: If True peak memory is measured with tracemalloc, which slows the call down a lot
+        """
+        self.operation = operation
+        self.file_path = file_path
+        self.track_memory = track_memory
+        self.stage_seconds = {}
+        self.seconds = 0.0
+        # Characters or bytes of uncompressed text, and bytes of compressed data
+        self.text_size = 0
+        self.compressed_size = 0
+        self.header_size = 0
+        self.alphabet = set()
+        self.tree_depth = 0
+        self.symbol_count = 0
+        self.encoded_bits = 0
+        # Only known when compressing, as the frequency of each symbol is needed
+        self.entropy_bits: float = None
+        self.peak_memory: int = None
+        self.started_tracing = False
+        self.start_time = 0.0
+
+    def __str__(self):
+        return "<%s operation=\'%s\' seconds=%.6f>" % ("CompressionMetrics", self.operation, self.seconds)
+
+    def stage(self, name: str) -> StageTimer:
+        """
+        :param name: Name of the stage, i.e encode
+        :return timer: Context manager that adds the time spent inside it to the stage
+        """
+        return StageTimer(self, name)
+
+    def start(self) -> None:
+        """
+        Start measuring the call
+        """
+        if self.track_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+            tracemalloc.reset_peak()
+        self.start_time = time.perf_counter()
+
+    def finish(self) -> None:
+        """
+        Stop measuring the call
+        """
+        self.seconds = time.perf_counter() - self.start_time
+        if self.track_memory:
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            if self.started_tracing:
+                tracemalloc.stop()
+
+    def add_table(self, symbol_count: int, code_lengths: dict, frequency_table=None, encoded_bits=None) -> None:
+        """
+        Add the table of a block, or of a whole file, to the statistics
+        :param symbol_count: Number of symbols encoded with the table
+        :param code_lengths: Dictionary of key symbol and item of code length, or the ContextTable or LZ77Table of a block
+        :param frequency_table: Dictionary of the frequency of each symbol, when compressing
+        :param encoded_bits: Number of bits of the encoded symbols, if not calculated from the frequency table
+        """
+        self.symbol_count += symbol_count
+        structured = isinstance(code_lengths, (huffman_context.ContextTable, huffman_lz77.LZ77Table))
+        tables = code_lengths.get_tables() if structured else [code_lengths]
+        for table in tables:
+            if table:
+                self.tree_depth = max(self.tree_depth, max(table.values()))
+        if frequency_table is not None:
+            self.alphabet.update(frequency_table)
+            if encoded_bits is None:
+                encoded_bits = sum(frequency * code_lengths[symbol] for symbol, frequency in frequency_table.items())
+            self.entropy_bits = (self.entropy_bits or 0.0) + sum(frequency * math.log2(symbol_count / frequency)
+                                                                 for frequency in frequency_table.values())
+        else:
+            self.alphabet.update(code_lengths.get_symbols() if structured else code_lengths)
+        self.encoded_bits += encoded_bits or 0
+
+    @property
+    def alphabet_size(self) -> int:
+        return len(self.alphabet)
+
+    @property
+    def average_code_length(self) -> float:
+        """
+        Average number of bits per symbol - when decompressing this includes padding
+        """
+        return self.encoded_bits / self.symbol_count if self.symbol_count else None
+
+    @property
+    def entropy(self) -> float:
+        """
+        Entropy in bits per symbol of the symbol frequencies of each table - the shortest average code length possible
+        without context modeling
+        """
+        return self.entropy_bits / self.symbol_count if self.entropy_bits is not None and self.symbol_count else None
+
+    @property
+    def ratio(self) -> float:
+        """
+        Compressed size as a fraction of the text size - None for ranges, as the compressed size is not known
+        """
+        return self.compressed_size / self.text_size if self.text_size and self.compressed_size else None
+
+    def as_dict(self) -> dict:
+        """
+        :return metrics: Dictionary of every metric, i.e for logging as JSON
+        """
+        return {'operation': self.operation, 'file_path': self.file_path, 'seconds': self.seconds,
+                'stage_seconds': dict(self.stage_seconds), 'text_size': self.text_size,
+                'compressed_size': self.compressed_size, 'ratio': self.ratio, 'header_size': self.header_size,
+                'alphabet_size': self.alphabet_size, 'tree_depth': self.tree_depth, 'symbol_count': self.symbol_count,
+                'average_code_length': self.average_code_length, 'entropy': self.entropy, 'peak_memory': self.peak_memory}
+
+
+class MetricsCollector:
+    """
+    Metrics callback that keeps the metrics of every call
+    """
+
+    def __init__(self, track_memory=False):
+        """
+        :param track_memory: If True peak memory is measured for each call, which slows calls down a lot
+        """
+        self.track_memory = track_memory
+        self.calls = []
+
+    def __call__(self, metrics: CompressionMetrics) -> None:
+        self.calls.append(metrics)
+
+
+def print_metrics(metrics: CompressionMetrics) -> None:
+    """
+    Metrics callback that prints a summary of each call
+    :param metrics: Metrics of the call
+    """
+    stages = ", ".join("%s %.6fs" % (name, seconds) for name, seconds in metrics.stage_seconds.items())
+    print("%s %s: %.6fs (%s)" % (metrics.operation, metrics.file_path, metrics.seconds, stages))
+    print("  %d -> %d bytes, header %d bytes, %d symbols, depth %d" % (
+        metrics.text_size, metrics.compressed_size, metrics.header_size, metrics.alphabet_size, metrics.tree_depth))
+    if metrics.average_code_length is not None:
+        entropy = " (entropy %.3f)" % metrics.entropy if metrics.entropy is not None else ""
+        print("  %.3f bits per symbol%s" % (metrics.average_code_length, entropy))
+    if metrics.peak_memory is not None:
+        print("  peak memory %d bytes" % metrics.peak_memory)
@@ -0,0 +1,88 @@
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Number of symbols encoded at once, bounding the memory used when codes are expanded into individual bits
+PACK_CHUNK_SYMBOLS = 1 << 16
+
+
+def get_symbol_array(symbols):
+    """
+    :param symbols: String of text, or a bytes-like object of binary data
+    :return values: numpy array of the code point of each character, or of each byte value
+    """
+    if isinstance(symbols, str):
+        return numpy.frombuffer(symbols.encode('utf-32-le', 'surrogatepass'), dtype='<u4')
+    return numpy.frombuffer(symbols, dtype=numpy.uint8)
+
+
+def generate_frequency_table(symbols) -> dict:
+    """
+    Generates a dictionary of the frequencies of each symbol by counting the code points with numpy.bincount,
+    without sorting the symbols. Symbols are in order of first appearance, the same as
+    HuffmanTools.generate_frequency_table, so the same tree is built
+    :param symbols: String of text, or a bytes-like object of binary data
+    :return frequency: Dictionary of frequency of each character, or byte value
+    """
+    values = get_symbol_array(symbols)
+    if len(values) == 0:
+        return {}
+    counts = numpy.bincount(values)
+    alphabet = numpy.flatnonzero(counts)
+    # The smallest position of each symbol is where it first appears
+    first_index = numpy.full(len(counts), len(values), dtype=numpy.int64)
+    numpy.minimum.at(first_index, values, numpy.arange(len(values)))
+    alphabet = alphabet[numpy.argsort(first_index[alphabet], kind='stable')]
+    counts = counts[alphabet].tolist()
+    alphabet = alphabet.tolist()
+    if isinstance(symbols, str):
+        alphabet = [chr(value) for value in alphabet]
+    return dict(zip(alphabet, counts))
+
+
+def pack_symbols(symbols, codes: dict, full_byte_when_aligned=False) -> bytearray:
+    """
+    Encodes each symbol with its code and packs the codes into bytes, the same as HuffmanTools.pack_symbols.
+    Codes and lengths are looked up for every symbol at once, the bit offset of each code comes from a cumulative
+    sum of the lengths, and the codes are expanded into bits and packed with numpy.packbits
+    :param symbols: String of text, or a bytes-like object of binary data
+    :param codes: Dictionary of symbol to (code, length) pairs
+    :param full_byte_when_aligned: Pad with a whole byte when the codes end on a byte boundary
+    :return bytestream: bytearray of the packed codes
+    """
+    values = get_symbol_array(symbols)
+    table = sorted((symbol if isinstance(symbol, int) else ord(symbol), code, length) for symbol, (code, length) in codes.items())
+    alphabet = numpy.array([value for value, code, length in table], dtype=numpy.uint32)
+    code_table = numpy.array([code for value, code, length in table], dtype=numpy.uint64)
+    length_table = numpy.array([length for value, code, length in table], dtype=numpy.int64)
+
+    bytestream = bytearray()
+    # Bits left over after the last whole byte of the previous chunk
+    carry = numpy.zeros(0, dtype=numpy.uint8)
+    for start in range(0, len(values), PACK_CHUNK_SYMBOLS):
+        chunk = values[start: start + PACK_CHUNK_SYMBOLS]
+        positions = numpy.minimum(numpy.searchsorted(alphabet, chunk), len(alphabet) - 1)
+        if numpy.any(alphabet[positions] != chunk):
+            raise KeyError("Symbol has no compression code")
+        lengths = length_table[positions]
+        ends = numpy.cumsum(lengths)
+
+        # Index of the symbol each output bit belongs to, and the position of the bit within its code
+        owner = numpy.repeat(numpy.arange(len(chunk)), lengths)
+        bit_in_code = numpy.arange(ends[-1]) - (ends - lengths)[owner]
+        shifts = (lengths[owner] - 1 - bit_in_code).astype(numpy.uint64)
+        bits = ((code_table[positions][owner] >> shifts) & numpy.uint64(1)).astype(numpy.uint8)
+
+        bits = numpy.concatenate((carry, bits))
+        whole_bits = len(bits) - len(bits) % 8
+        bytestream += numpy.packbits(bits[:whole_bits]).tobytes()
+        carry = bits[whole_bits:]
+
+    if len(carry) > 0:
+        # packbits pads the last byte with 0's
+        bytestream += numpy.packbits(carry).tobytes()
+    elif full_byte_when_aligned:
+        bytestream.append(0)
+    return bytestream
@@ -0,0 +1,197 @@
+"""
+Tests of the decoders, every file format and the file, in memory, async and command line interfaces
+
+    python -m pytest -q
+"""
+import HuffmanCoding
+import huffman_async
+import huffman_cli
+import huffman_compression_tools
+import huffman_decoder
+import huffman_dictionary
+import tree
+import asyncio
+import io
+import os
+import random
+import pytest
+
+
+TEXT = "".join("line %d: %s\n" % (i, "xyz"[i % 3] * (i % 7)) for i in range(500))
+NON_ASCII_TEXT = "héllo wörld ☃ 中文 😀\n" * 200
+BINARY_DATA = bytes(random.Random(1).choice(b"\x00\x01\x02\xfe\xff") for _ in range(5000)) + bytes(range(256))
+# Files written by the original code, before any of the newer formats existed
+LEGACY_FILES = {
+    'abracadabra': bytes.fromhex('0000000b000fe1e3e47179006e8adc'),
+    'The quick brown fox jumps over the lazy dog.\nThe dog sleeps.\n': bytes.fromhex(
+        '0000003d005afaf974395e7a9ea79783b39039eb915e3d238fadc5ee77733e3a83b7d9e9c277a800509f32e7a29f5336bb3dbb77bd78'
+        '353ee259f213dd9803dfb08c9427bf61d1c4b52320'),
+}
+
+
+def compress_to_file(path, data, **options) -> bytes:
+    """
+    :param path: Path of the .bin file to write
+    :param data: String of text or bytes of binary data
+    :param options: Keyword arguments of HuffmanFile
+    :return compressed: bytes of the written file
+    """
+    with HuffmanCoding.HuffmanFile(str(path), 'wb', **options) as huffman_file:
+        huffman_file.write_from_string(data)
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+@pytest.mark.parametrize('text', [TEXT, NON_ASCII_TEXT, "a", "ab" * 1000])
+def test_decoder_matches_bitstream_walk(text):
+    tools = huffman_compression_tools.HuffmanTools()
+    huffman_tree = tools.merge_trees(tools.plant_forest(tools.generate_frequency_table(text)))
+    huffman_tree.depth = tree.tree_depth(huffman_tree) - 1
+    tools.generate_compression_codes(huffman_tree, [None] * huffman_tree.depth)
+    body = tools.generate_file_bytestream(text)
+    bitstream = "".join("{0:08b}".format(byte) for byte in body)
+
+    decoder = huffman_decoder.HuffmanDecoder.from_tree(huffman_tree)
+    assert decoder.decode_text(body, len(text)) == tools.decompress_bitstream(huffman_tree, len(text), bitstream) == text
+
+
+@pytest.mark.parametrize('version', HuffmanCoding.HuffmanFile.FORMAT_VERSIONS)
+@pytest.mark.parametrize('data', ["", TEXT, NON_ASCII_TEXT, b"", BINARY_DATA], ids=['empty', 'ascii', 'non-ascii',
+                                                                                     'empty-binary', 'binary'])
+def test_round_trip(tmp_path, version, data):
+    path = tmp_path / 'file.bin'
+    if version == HuffmanCoding.HuffmanFile.LEGACY_VERSION and data == "":
+        pytest.skip("The original format has no tree to store for empty text")
+    if version == HuffmanCoding.HuffmanFile.LEGACY_VERSION and (isinstance(data, bytes) or data == NON_ASCII_TEXT):
+        # The original format only stores 7bit ascii text
+        with pytest.raises(ValueError):
+            compress_to_file(path, data, version=version)
+        return
+    compress_to_file(path, data, version=version)
+    with HuffmanCoding.HuffmanFile(str(path), 'rb') as huffman_file:
+        assert huffman_file.read() == data
+    with HuffmanCoding.HuffmanFile(str(path), 'rb') as huffman_file:
+        assert huffman_file.read(0) == data[:0]
+        assert huffman_file.read(100) == data[:100]
+        assert huffman_file.read_range(1000, 300) == data[1000: 1300]
+        assert huffman_file.read() == data[100:]
+        assert huffman_file.read(10) == data[:0]
+
+
+@pytest.mark.parametrize('options', [{'context': True}, {'lz77_level': 1}, {'lz77_level': 9}, {'max_code_length': 8},
+                                     {'block_size': 100, 'index': False}])
+@pytest.mark.parametrize('data', [TEXT, NON_ASCII_TEXT, BINARY_DATA], ids=['ascii', 'non-ascii', 'binary'])
+def test_block_options_round_trip(options, data):
+    options = dict({'block_size': 1000}, **options)
+    compressed = HuffmanCoding.compress(data, **options)
+    assert HuffmanCoding.decompress(compressed) == data
+
+
+@pytest.mark.parametrize('text, compressed', LEGACY_FILES.items())
+def test_legacy_output_unchanged(tmp_path, text, compressed):
+    assert compress_to_file(tmp_path / 'file.bin', text, version=HuffmanCoding.HuffmanFile.LEGACY_VERSION) == compressed
+    with HuffmanCoding.HuffmanFile(io.BytesIO(compressed), 'rb') as huffman_file:
+        assert huffman_file.read() == text
+
+
+@pytest.mark.parametrize('options', [{}, {'context': True}, {'lz77_level': 6}])
+@pytest.mark.parametrize('data', [TEXT * 20, BINARY_DATA * 20], ids=['text', 'binary'])
+def test_parallel_output_matches_serial(options, data):
+    serial = HuffmanCoding.compress(data, block_size=5000, workers=1, **options)
+    parallel = HuffmanCoding.compress(data, block_size=5000, workers=2, **options)
+    assert parallel == serial
+    assert HuffmanCoding.decompress(parallel, workers=2) == data
+
+
+def test_dictionary_round_trip():
+    records = ['{"id": %d, "ok": %s}' % (i, "true" if i % 2 else "false") for i in range(50)]
+    dictionary = huffman_dictionary.HuffmanDictionary.train(records, alphabet=[chr(i) for i in range(128)])
+    for record in records:
+        compressed = HuffmanCoding.compress(record, dictionary=dictionary)
+        assert HuffmanCoding.decompress(compressed) == record
+        # Only the file header, a block header with the dictionary id and the end block are added
+        assert len(compressed) <= len(record) + 6
+
+
+def test_append(tmp_path):
+    path = str(tmp_path / 'file.bin')
+    compress_to_file(path, TEXT)
+    with HuffmanCoding.HuffmanFile(path, 'ab') as huffman_file:
+        huffman_file.write_from_string(NON_ASCII_TEXT)
+    with HuffmanCoding.HuffmanFile(path, 'rb') as huffman_file:
+        assert huffman_file.read() == TEXT + NON_ASCII_TEXT
+
+
+def test_failed_append_leaves_file_unchanged(tmp_path):
+    path = str(tmp_path / 'file.bin')
+    original = compress_to_file(path, TEXT)
+    with pytest.raises(ValueError):
+        # Too short for every symbol to have a code
+        with HuffmanCoding.HuffmanFile(path, 'ab', max_code_length=2) as huffman_file:
+            huffman_file.write_from_string(NON_ASCII_TEXT)
+    with open(path, 'rb') as file:
+        assert file.read() == original
+
+
+def test_in_memory_buffers():
+    compressed = HuffmanCoding.compress(TEXT)
+    output = bytearray(len(compressed))
+    assert HuffmanCoding.compress(TEXT, output) == len(compressed) and output == compressed
+    assert HuffmanCoding.decompress(memoryview(compressed)) == TEXT
+    with pytest.raises(ValueError):
+        HuffmanCoding.compress(TEXT, bytearray(10))
+
+
+def test_async_reads_follow_position(tmp_path):
+    path = str(tmp_path / 'file.bin')
+    compress_to_file(path, TEXT, block_size=1000)
+
+    async def read():
+        async with huffman_async.AsyncHuffmanFile(path, 'rb') as huffman_file:
+            assert await huffman_file.read(9) == TEXT[:9]
+            assert await huffman_file.readline() == TEXT[9: TEXT.index("\n", 9) + 1]
+            assert await huffman_file.read() == TEXT[TEXT.index("\n", 9) + 1:]
+            assert await huffman_file.readline() == ""
+        async with huffman_async.AsyncHuffmanFile(path, 'rb') as huffman_file:
+            assert await huffman_file.read() == TEXT
+            assert await huffman_file.read(5) == ""
+    asyncio.run(read())
+
+
+def test_async_compress_and_decompress_files(tmp_path):
+    paths = [str(tmp_path / ('%d.bin' % i)) for i in range(5)]
+    texts = [TEXT[i * 100: (i + 1) * 100] for i in range(5)]
+
+    async def run():
+        await huffman_async.compress_files(zip(paths, texts), max_concurrency=2)
+        return await huffman_async.decompress_files(paths, max_concurrency=2)
+    assert asyncio.run(run()) == texts
+
+
+def test_cli_round_trip(tmp_path):
+    source = tmp_path / 'in'
+    source.mkdir()
+    (source / 'a.txt').write_text(NON_ASCII_TEXT, encoding='utf-8')
+    (source / 'b.dat').write_bytes(BINARY_DATA)
+    assert huffman_cli.main(['compress', str(source), '-o', str(tmp_path / 'z'), '-w', '1', '-q']) == 0
+    assert huffman_cli.main(['decompress', str(tmp_path / 'z'), '-o', str(tmp_path / 'out'), '-w', '1', '-q']) == 0
+    assert (tmp_path / 'out' / 'a.txt').read_text(encoding='utf-8') == NON_ASCII_TEXT
+    assert (tmp_path / 'out' / 'b.dat').read_bytes() == BINARY_DATA
+
+
+def test_cli_failed_job_leaves_no_output(tmp_path):
+    compressed = tmp_path / 'z'
+    compressed.mkdir()
+    (compressed / 'a.txt.bin').write_bytes(HuffmanCoding.compress(TEXT)[:20])
+    output = tmp_path / 'out'
+    for run in range(2):
+        # The failed file is not skipped as up to date on the second run
+        assert huffman_cli.main(['decompress', str(compressed), '-o', str(output), '-w', '1', '-q']) == 1
+        assert not output.exists() or os.listdir(output) == []
+
+
+def test_cli_missing_path_only_fails_that_path(tmp_path):
+    (tmp_path / 'a.txt').write_text(TEXT)
+    assert huffman_cli.main(['compress', str(tmp_path / 'a.txt'), str(tmp_path / 'missing'), '-w', '1', '-q']) == 1
+    with HuffmanCoding.HuffmanFile(str(tmp_path / 'a.txt.bin'), 'rb') as huffman_file:
+        assert huffman_file.read() == TEXT
@@ -1,5 +1,8 @@
 class Tree:
     """ Object for representing tree data structure """
+    # Nodes are created for every symbol in the text, so avoid a __dict__ per node
+    __slots__ = ('symbol', 'frequency', 'left', 'right', 'depth')
+
     def __init__(self, symbol, frequency=None, left=None, right=None):
         """
         :param symbol: character the node in the tree represents
@@ -23,36 +26,81 @@ def print_tree_indented(tree: Tree, level=0):
     :param tree: tree to be displayed
     :param level: leave blank, for method computation
     """
-    if tree is None:
-        return 
-    print_tree_indented(tree.right, level+1)
-    if tree.symbol == None:
-        print("      " * level + str(tree.frequency))
-    else:
-        if tree.symbol in ['\n', '\r', '\t', '\b', '\f']:
+    # Right subtree, then the node, then the left subtree - pushed in reverse as the stack is last in first out
+    stack = [(tree, level, False)]
+    while stack:
+        tree, level, visited = stack.pop()
+        if tree is None:
+            continue
+        if not visited:
+            stack += [(tree.left, level+1, False), (tree, level, True), (tree.right, level+1, False)]
+        elif tree.symbol == None:
+            print("      " * level + str(tree.frequency))
+        elif tree.symbol in ['\n', '\r', '\t', '\b', '\f']:
             print("      " * level + 'escape character , ' + str(tree.frequency))
         else:
             print("      " * level + str(tree.symbol), ',', str(tree.frequency))
-    print_tree_indented(tree.left, level+1)
 
 
 def get_tree_preorder(tree, preorder=''):
     """
     Returns a string of the given tree in preorder
     :param tree: Tree object to traverse
-    :param preorder: Leave blank, for function computation
+    :param preorder: String the tree is added to the end of
     :return preorder: String of tree in preorder
     """
-    if tree is None:
-        return preorder
-    preorder = get_tree_preorder(tree.left, preorder)
-    # Payload here
-    if tree.symbol:
-        preorder += "1" + str(tree.symbol)
-    else:
-        preorder += "0"
-    preorder = get_tree_preorder(tree.right, preorder)
-    return preorder
+    parts = [preorder]
+    # Left subtree, then the node, then the right subtree
+    stack = [(tree, False)]
+    while stack:
+        tree, visited = stack.pop()
+        if tree is None:
+            continue
+        if not visited:
+            stack += [(tree.right, False), (tree, True), (tree.left, False)]
+        elif tree.symbol:
+            parts.append("1" + str(tree.symbol))
+        else:
+            parts.append("0")
+    return "".join(parts)
+
+
+def walk_tree(tree) -> (str, dict, dict):
+    """
+    Walks the tree once, without recursion, collecting everything the compression needs from it
+    :param tree: Root tree object
+    :return postorder: String of the tree in postorder, the same as get_tree_postorder
+    :return codes: Dictionary of key character and item of code i.e {'a': '010'}
+    :return stats: Dictionary of the depth of the deepest leaf, the number of leaves and nodes and the number of
+                   codes of each length i.e {'depth': 3, 'leaves': 5, 'nodes': 9, 'length_counts': {2: 3, 3: 2}}
+    """
+    parts = []
+    codes = {}
+    stats = {'depth': 0, 'leaves': 0, 'nodes': 0, 'length_counts': {}}
+    length_counts = stats['length_counts']
+    stack = [(tree, "", False)]
+    while stack:
+        node, code, visited = stack.pop()
+        if node is None:
+            continue
+        if not visited:
+            # Left subtree, then the right subtree, then the node
+            stack += [(node, code, True), (node.right, code + "1", False), (node.left, code + "0", False)]
+            continue
+        stats['nodes'] += 1
+        if node.symbol != None:
+            # Represents a leaf node
+            parts.append("1" + str(node.symbol))
+        else:
+            # Represents an internal node
+            parts.append("0")
+        if node.left is None and node.right is None:
+            codes[node.symbol] = code
+            stats['leaves'] += 1
+            length_counts[len(code)] = length_counts.get(len(code), 0) + 1
+            if len(code) > stats['depth']:
+                stats['depth'] = len(code)
+    return "".join(parts), codes, stats
 
 
 def get_tree_postorder(tree, postorder=''):
@@ -61,20 +109,10 @@ def get_tree_postorder(tree, postorder=''):
     This is what is used in the compression algorithm and what is stored in the
     file header
     :param tree: Tree object to traverse
-    :param postorder: Leave blank, for function computation
+    :param postorder: String the tree is added to the end of
     :return postorder: String of the tree in postorder
     """
-    if tree is None:
-        return postorder
-    postorder = get_tree_postorder(tree.left, postorder)
-    postorder = get_tree_postorder(tree.right, postorder)
-    if tree.symbol != None:
-        # Represents a leaf node
-        postorder += "1" + str(tree.symbol)
-    else:
-        # Represents an internal node
-        postorder += "0"
-    return postorder
+    return postorder + walk_tree(tree)[0]
 
 
 def construct_tree_from_postorder(postorder: list) -> Tree:
@@ -112,12 +150,11 @@ def tree_depth(tree):
     :param tree: Root tree object
     :return int: depth of the tree
     """
-    if tree is None:
-        return 0
-    else:
-        # Compute the depth of each subnode
-        left_depth = tree_depth(tree.left)
-        right_depth = tree_depth(tree.right)
-
-        # Return the larger value
-        return left_depth + 1 if left_depth > right_depth else right_depth + 1
+    depth = 0
+    stack = [(tree, 1)]
+    while stack:
+        tree, layer = stack.pop()
+        if tree is not None:
+            depth = max(depth, layer)
+            stack += [(tree.left, layer + 1), (tree.right, layer + 1)]
+    return depth